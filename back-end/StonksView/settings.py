@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,15 +42,23 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # arquivos do collectstatic saem antes de tudo (usuarios/estaticos.py)
+    'usuarios.middleware.EstaticosMiddleware',
+    # primeiro dos demais para medir também os outros middlewares
+    'usuarios.middleware.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'usuarios.middleware.ShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fração das requisições medidas pela InstrumentacaoMiddleware (Server-Timing e /metrics).
+INSTRUMENTACAO_AMOSTRAGEM = 1.0
+
 ROOT_URLCONF = 'StonksView.urls'
 
 TEMPLATES = [
@@ -73,11 +82,79 @@ WSGI_APPLICATION = 'StonksView.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil de produção do SQLite (usuarios/banco.py), pelo ambiente:
+#   STONKS_CONN_MAX_AGE=600: a conexão (e o cache de páginas dela) vale por
+#     vários requests no WSGI; sob ASGI cada request roda noutra thread e abre
+#     a sua de qualquer forma;
+#   STONKS_SQLITE_TRANSACTION_MODE=IMMEDIATE: a transação pega o lock de
+#     escrita já no início e espera o busy_timeout; no DEFERRED ela começa
+#     lendo e, ao tentar escrever com outro escritor ativo, falha na hora com
+#     "database is locked".
+# Sem elas fica o padrão do Django (uma conexão por request, DEFERRED).
+_MODO_TRANSACAO = os.environ.get('STONKS_SQLITE_TRANSACTION_MODE')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('STONKS_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'transaction_mode': _MODO_TRANSACAO} if _MODO_TRANSACAO else {},
+        # banco de teste em arquivo: o SQLite em memória compartilhada trava por
+        # tabela e falha na hora, o que quebra os testes com várias threads
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Aliases em uso, na ordem: o usuário vai para SHARDS_USUARIOS[id % len]. Vazio
+# deixa tudo no default. Vêm do ambiente, ex.: STONKS_SHARDS_USUARIOS=shard_0,shard_1.
+# Um alias que sai da lista passa para STONKS_SHARDS_ANTIGOS até o
+# ``manage.py rebalancear_shards`` tirar os usuários dele. Depois de mudar, rode
+# ``manage.py migrate --database`` em cada alias novo e o rebalancear_shards.
+SHARDS_USUARIOS = [alias for alias in os.environ.get('STONKS_SHARDS_USUARIOS', '').split(',') if alias]
+SHARDS_ANTIGOS = [alias for alias in os.environ.get('STONKS_SHARDS_ANTIGOS', '').split(',') if alias]
+
+# Só esses entram em DATABASES (usuarios/shards.py): mesma configuração do
+# default, um arquivo por shard.
+for _alias in [*SHARDS_USUARIOS, *SHARDS_ANTIGOS]:
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db_{_alias}.sqlite3',
+        'TEST': {'NAME': BASE_DIR / f'test_db_{_alias}.sqlite3'},
     }
+
+DATABASE_ROUTERS = ['usuarios.shards.RoteadorShards']
+
+# PRAGMAs aplicados a cada conexão SQLite nova (usuarios/banco.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,            # ms
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -32000,            # negativo = KiB (32 MiB)
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'respostas' guarda os JSON de listagem por usuário (usuarios/cache_respostas.py).
+# Para compartilhar entre processos sem serviço externo, troque por
+# 'usuarios.cache_respostas.FileBasedCacheContado' com LOCATION apontando para uma pasta.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'respostas': {
+        'BACKEND': 'usuarios.cache_respostas.LocMemCacheContado',
+        'LOCATION': 'stonks-respostas',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
 }
 
 
@@ -90,6 +167,24 @@ AUTH_PASSWORD_VALIDATORS = [
     }
 ]
 
+# O primeiro hasher grava as senhas novas; os outros só verificam hashes antigos.
+# Mudar PBKDF2_ITERACOES (ou pôr outro hasher na frente) refaz o hash de cada
+# usuário no próximo login.
+PASSWORD_HASHERS = [
+    'usuarios.hashers.PBKDF2IteracoesHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PBKDF2_ITERACOES = 1_000_000
+
+# Limite de tentativas de login/cadastro/recuperação (usuarios/limites.py).
+# Sobrescreve LIMITES_PADRAO por escopo, ex.: {'login': {'capacidade': 10, 'por_minuto': 5}}.
+LIMITES_AUTENTICACAO = {}
+# Alias de CACHES para guardar os baldes fora do processo (None = memória local).
+LIMITES_AUTENTICACAO_CACHE = None
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -111,6 +206,17 @@ LOGIN_URL = 'login'
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "usuarios" / "static" ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # collectstatic grava nomes com hash e versões .gz/.br (usuarios/estaticos.py)
+    'staticfiles': {
+        'BACKEND': 'usuarios.estaticos.ArmazenamentoComprimido',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
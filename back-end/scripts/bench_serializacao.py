@@ -0,0 +1,126 @@
+"""
+Micro-benchmark da serialização das listagens (usuarios/serializacao.py).
+
+Compara o caminho antigo (instâncias do modelo + strftime + float(Decimal) +
+porcentagem em Python + JsonResponse) com o atual (values_list convertido no
+banco + json_bytes) em um banco de teste em memória:
+
+    cd back-end
+    python scripts/bench_serializacao.py --linhas 20000 --repeticoes 5
+
+Mostra o melhor tempo, o custo por linha e o pico de alocação (tracemalloc).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'StonksView.settings')
+
+
+def antes_transacoes(qs):
+    from django.http import JsonResponse
+    data = [
+        {
+            'id': t.id,
+            'data': t.data.strftime('%Y-%m-%d'),
+            'descricao': t.descricao,
+            'valor': float(t.valor),
+            'tipo': t.tipo,
+        }
+        for t in qs
+    ]
+    return JsonResponse({'transacoes': data}).content
+
+
+def antes_metas(qs):
+    from django.http import JsonResponse
+    data = [
+        {
+            'id': m.id,
+            'nome': m.nome,
+            'valor': float(m.valor),
+            'valor_atual': float(m.valor_atual),
+            'data_inicial': m.data_inicial.strftime('%Y-%m-%d'),
+            'data_final': m.data_final.strftime('%Y-%m-%d'),
+            'status': m.status,
+            'porcentagem': round((m.valor_atual / m.valor) * 100, 1) if m.valor > 0 else 0
+        }
+        for m in qs
+    ]
+    return JsonResponse({'metas': data}).content
+
+
+def depois(nome):
+    from usuarios import serializacao
+    return lambda qs: serializacao.json_bytes({nome: serializacao.listar(nome, qs)})
+
+
+def medir(funcao, qs, repeticoes):
+    # qs.all() a cada rodada: um queryset já avaliado devolveria o cache de instâncias
+    melhor = min(_cronometrar(funcao, qs.all()) for _ in range(repeticoes))
+    tracemalloc.start()
+    funcao(qs.all())
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return melhor, pico
+
+
+def _cronometrar(funcao, qs):
+    inicio = time.perf_counter()
+    funcao(qs)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=20000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.db import connection
+    from usuarios.models import CustomUser, MetaFinanceira, Transacao
+
+    connection.creation.create_test_db(verbosity=0)
+    usuario = CustomUser.objects.create_user('bench@stonks.local', 'Bench@123', 'Bench')
+    hoje = date(2025, 1, 1)
+    Transacao.objects.bulk_create([
+        Transacao(usuario=usuario, data=hoje + timedelta(days=i % 700), descricao=f'Item {i}',
+                  valor=Decimal(i % 5000) / 4, tipo='expense')
+        for i in range(args.linhas)
+    ], batch_size=2000)
+    MetaFinanceira.objects.bulk_create([
+        MetaFinanceira(usuario=usuario, nome=f'Meta {i}', valor=1000 + i % 7, valor_atual=i % 900,
+                       data_inicial=hoje, data_final=hoje + timedelta(days=365))
+        for i in range(args.linhas)
+    ], batch_size=2000)
+
+    casos = [
+        ('transacoes', Transacao.objects.filter(usuario=usuario).order_by('-data', '-id'), antes_transacoes),
+        ('metas', MetaFinanceira.objects.filter(usuario=usuario).order_by('-data_criacao'), antes_metas),
+    ]
+    resultado = {}
+    for nome, qs, antes in casos:
+        t_antes, m_antes = medir(antes, qs, args.repeticoes)
+        t_depois, m_depois = medir(depois(nome), qs, args.repeticoes)
+        resultado[nome] = {
+            'linhas': args.linhas,
+            'antes': {'ms': round(t_antes * 1000, 1), 'us_por_linha': round(t_antes / args.linhas * 1e6, 2),
+                      'pico_kib': m_antes // 1024},
+            'depois': {'ms': round(t_depois * 1000, 1), 'us_por_linha': round(t_depois / args.linhas * 1e6, 2),
+                       'pico_kib': m_depois // 1024},
+            'ganho': round(t_antes / t_depois, 2),
+        }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Compara a vazão da API assíncrona sob ASGI com as views síncronas sob WSGI.
+
+Sobe um uvicorn (StonksView.asgi) e um gunicorn com threads (StonksView.wsgi)
+apontando para o mesmo banco, autentica um usuário de carga e dispara
+requisições concorrentes contra a mesma listagem nos dois servidores:
+
+    cd back-end
+    python manage.py migrate
+    python scripts/carga_asgi_wsgi.py --concorrencia 64 --duracao 15
+
+Requer ``uvicorn`` e ``gunicorn`` instalados. O resultado sai em JSON.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'StonksView.settings')
+
+ROTAS = {
+    'lembretes': ('/api/lembretes/', '/lembretes/'),
+    'metas': ('/api/metas/', '/metas/listar/'),
+    'transacoes': ('/api/transacoes/', '/transacoes/'),
+}
+EMAIL_CARGA = 'carga@stonks.local'
+
+
+def preparar_usuario(linhas):
+    import django
+    django.setup()
+    from datetime import date, timedelta
+    from django.test import Client
+    from usuarios.models import CustomUser, Lembrete, MetaFinanceira, Transacao
+
+    usuario = CustomUser.objects.filter(email=EMAIL_CARGA).first()
+    if usuario is None:
+        usuario = CustomUser.objects.create_user(EMAIL_CARGA, 'Carga@123', 'Carga')
+        hoje = date.today()
+        Transacao.objects.bulk_create([
+            Transacao(usuario=usuario, data=hoje - timedelta(days=i), descricao=f'Item {i}',
+                      valor=i % 500 + 1, tipo='expense')
+            for i in range(linhas)
+        ])
+        Lembrete.objects.bulk_create([
+            Lembrete(usuario=usuario, nome=f'Lembrete {i}', data=hoje + timedelta(days=i)) for i in range(linhas)
+        ])
+        MetaFinanceira.objects.bulk_create([
+            MetaFinanceira(usuario=usuario, nome=f'Meta {i}', valor=1000, data_inicial=hoje,
+                           data_final=hoje + timedelta(days=365))
+            for i in range(min(linhas, 50))
+        ])
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente.cookies['sessionid'].value
+
+
+def esperar_porta(porta, limite=20):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            socket.create_connection(('127.0.0.1', porta), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"servidor não respondeu na porta {porta}")
+
+
+def iniciar_servidores(args):
+    asgi = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'StonksView.asgi:application', '--port', str(args.porta_asgi),
+         '--log-level', 'warning', '--no-access-log'],
+        cwd=BASE_DIR,
+    )
+    wsgi = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'StonksView.wsgi:application', '-b', f'127.0.0.1:{args.porta_wsgi}',
+         '--threads', str(args.threads_wsgi), '--workers', '1', '--log-level', 'warning'],
+        cwd=BASE_DIR,
+    )
+    esperar_porta(args.porta_asgi)
+    esperar_porta(args.porta_wsgi)
+    return asgi, wsgi
+
+
+def disparar(porta, caminho, sessao, concorrencia, duracao):
+    latencias, erros = [], [0]
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+    cabecalhos = {'Cookie': f'sessionid={sessao}'}
+
+    def trabalhador():
+        conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+        minhas, meus_erros = [], 0
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            try:
+                conexao.request('GET', caminho, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+                if resposta.status != 200:
+                    meus_erros += 1
+            except (OSError, http.client.HTTPException):
+                meus_erros += 1
+                conexao.close()
+                conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+                continue
+            minhas.append(time.perf_counter() - inicio)
+        with lock:
+            latencias.extend(minhas)
+            erros[0] += meus_erros
+
+    threads = [threading.Thread(target=trabalhador) for _ in range(concorrencia)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+
+    def pct(p):
+        return round(latencias[min(int(len(latencias) * p), len(latencias) - 1)] * 1000, 2) if latencias else None
+
+    return {
+        'requisicoes': len(latencias),
+        'erros': erros[0],
+        'req_por_s': round(len(latencias) / decorrido, 1),
+        'latencia_ms': {
+            'media': round(statistics.fmean(latencias) * 1000, 2) if latencias else None,
+            'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rota', choices=sorted(ROTAS), default='lembretes')
+    parser.add_argument('--concorrencia', type=int, default=32)
+    parser.add_argument('--duracao', type=float, default=10)
+    parser.add_argument('--linhas', type=int, default=200, help="linhas por tabela do usuário de carga")
+    parser.add_argument('--threads-wsgi', type=int, default=8)
+    parser.add_argument('--porta-asgi', type=int, default=8101)
+    parser.add_argument('--porta-wsgi', type=int, default=8102)
+    parser.add_argument('--com-cache', action='store_true',
+                        help="usa a URL padrão (servida do cache); sem isso a query string força o banco")
+    args = parser.parse_args()
+
+    sessao = preparar_usuario(args.linhas)
+    caminho_asgi, caminho_wsgi = ROTAS[args.rota]
+    sufixo = '' if args.com_cache else '?carga=1'
+    asgi, wsgi = iniciar_servidores(args)
+    try:
+        resultado = {
+            'rota': args.rota,
+            'concorrencia': args.concorrencia,
+            'duracao_s': args.duracao,
+            'asgi': disparar(args.porta_asgi, caminho_asgi + sufixo, sessao, args.concorrencia, args.duracao),
+            'wsgi': disparar(args.porta_wsgi, caminho_wsgi + sufixo, sessao, args.concorrencia, args.duracao),
+        }
+    finally:
+        for processo in (asgi, wsgi):
+            processo.terminate()
+            processo.wait()
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Carga de escrita e leitura em vários processos sobre o mesmo SQLite.
+
+Compara o perfil padrão do Django (journal DELETE, transações DEFERRED,
+conexão nova a cada requisição) com o perfil de produção de
+``StonksView/settings.py`` (WAL, synchronous=NORMAL, busy_timeout, mmap,
+BEGIN IMMEDIATE e ``CONN_MAX_AGE``). Cada processo simula um worker: um
+usuário próprio, requisições pelo test client com ``close_old_connections``
+em volta (como o handler de verdade), uma fração delas criando transações.
+Com ``--ler-antes`` as escritas leem antes de escrever na mesma transação
+(o caso que o DEFERRED transforma em "database is locked" sem esperar o
+busy_timeout). Com ``--shards 0,2,4`` compara, no perfil de produção, os
+dados por usuário num arquivo só e espalhados por N shards (usuarios/shards.py).
+Mostra requisições por segundo, latência e erros de lock:
+
+    cd back-end
+    python scripts/carga_sqlite.py --processos 8 --segundos 10 --escritas 0.3
+    python scripts/carga_sqlite.py --processos 8 --segundos 10 --escritas 0.3 --ler-antes
+    python scripts/carga_sqlite.py --processos 8 --segundos 10 --escritas 1 --shards 0,2,4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'StonksView.settings')
+
+PERFIS = {
+    'padrao': {'CONN_MAX_AGE': 0, 'OPTIONS': {}, 'SQLITE_PRAGMAS': {'journal_mode': 'DELETE'}},
+    # os PRAGMAs de settings, com o que o ambiente de produção liga (ver settings.DATABASES)
+    'producao': {'CONN_MAX_AGE': 600, 'OPTIONS': {'transaction_mode': 'IMMEDIATE'}, 'SQLITE_PRAGMAS': None},
+}
+
+
+def configurar(banco, perfil, shards=0):
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.DATABASES['default']['NAME'] = banco
+    settings.DATABASES['default']['CONN_MAX_AGE'] = PERFIS[perfil]['CONN_MAX_AGE']
+    settings.DATABASES['default']['OPTIONS'] = PERFIS[perfil]['OPTIONS']
+    if PERFIS[perfil]['SQLITE_PRAGMAS'] is not None:
+        settings.SQLITE_PRAGMAS = PERFIS[perfil]['SQLITE_PRAGMAS']
+    # antes da primeira conexão: o django.db lê DATABASES uma vez só
+    settings.SHARDS_USUARIOS = [f'shard_{n}' for n in range(shards)]
+    for alias in settings.SHARDS_USUARIOS:
+        settings.DATABASES[alias] = {**settings.DATABASES['default'], 'NAME': f'{banco}.{alias}'}
+
+
+class _Resposta:
+    def __init__(self, status_code, content=b''):
+        self.status_code, self.content = status_code, content
+
+
+def escrever_depois_de_ler(usuario, data):
+    """Lê e depois escreve na mesma transação, como o save do admin e de ModelForms."""
+    from django.db import OperationalError
+    from usuarios import operacoes, shards
+    from usuarios.models import Transacao
+
+    try:
+        with shards.atomico(usuario):
+            Transacao.objects.filter(usuario=usuario, data=data).exists()
+            operacoes.criar_transacao(usuario, data, 'Carga', Decimal('9.90'), 'extra')
+    except OperationalError as e:
+        return _Resposta(500, str(e).encode())
+    return _Resposta(200)
+
+
+def worker(banco, perfil, shards, email, segundos, escritas, ler_antes, semente, largada, fila):
+    configurar(banco, perfil, shards)
+    from django.db import close_old_connections
+    from django.test import Client
+    from django.urls import reverse
+    from usuarios.benchmark import _host
+    from usuarios.models import CustomUser
+
+    usuario = CustomUser.objects.get(email=email)
+    cliente = Client(HTTP_HOST=_host(), raise_request_exception=False)
+    cliente.force_login(usuario)
+    close_old_connections()
+    largada.wait()  # o login também escreve: ninguém começa a medir antes de todos logarem
+    rng = random.Random(semente)
+    latencias, erros, travados = [], 0, 0
+    fim = time.monotonic() + segundos
+    while time.monotonic() < fim:
+        inicio = time.perf_counter()
+        close_old_connections()  # request_started
+        try:
+            escrita = rng.random() < escritas
+            if escrita and ler_antes:
+                r = escrever_depois_de_ler(usuario, date(2025, 6, rng.randint(1, 28)))
+            elif escrita:
+                r = cliente.post(reverse('adicionar_transacao'), json.dumps({
+                    'data': '2025-06-%02d' % rng.randint(1, 28), 'descricao': 'Carga',
+                    'valor': '9.90', 'tipo': 'extra',
+                }), content_type='application/json')
+            else:
+                r = cliente.get(reverse('listar_transacoes'))
+            if r.status_code >= 400:
+                erros += 1
+                travados += b'locked' in r.content
+        except Exception as e:
+            erros += 1
+            travados += 'locked' in str(e)
+        finally:
+            close_old_connections()  # request_finished
+        latencias.append(time.perf_counter() - inicio)
+    fila.put({'requisicoes': len(latencias), 'erros': erros, 'travados': travados, 'latencias': latencias})
+
+
+def rodar(banco, perfil, shards, emails, segundos, escritas, ler_antes):
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    largada = contexto.Barrier(len(emails))
+    processos = [
+        contexto.Process(target=worker, args=(banco, perfil, shards, email, segundos, escritas, ler_antes, i, largada,
+                                              fila))
+        for i, email in enumerate(emails)
+    ]
+    for p in processos:
+        p.start()
+    resultados = [fila.get() for _ in processos]
+    for p in processos:
+        p.join()
+    latencias = sorted(x for r in resultados for x in r['latencias'])
+    total = sum(r['requisicoes'] for r in resultados)
+    erros = sum(r['erros'] for r in resultados)
+    return {
+        'requisicoes': total,
+        'req_por_s': round(total / segundos, 1),
+        'ok_por_s': round((total - erros) / segundos, 1),
+        'erros': erros,
+        'database_is_locked': sum(r['travados'] for r in resultados),
+        'latencia_ms': {
+            'p50': round(statistics.median(latencias) * 1000, 2),
+            'p95': round(latencias[int(len(latencias) * 0.95)] * 1000, 2),
+            'max': round(latencias[-1] * 1000, 2),
+        },
+    }
+
+
+def preparar(banco, perfil, shards, processos, transacoes, fila):
+    configurar(banco, perfil, shards)
+    from django.conf import settings
+    from django.core.management import call_command
+    from usuarios import sementes
+
+    for alias in ['default', *settings.SHARDS_USUARIOS]:
+        call_command('migrate', database=alias, verbosity=0)
+    sementes.semear(processos, transacoes, prefixo='carga')
+    fila.put([f'carga{n}@{sementes.DOMINIO}' for n in range(processos)])
+
+
+def semear_em_processo(banco, perfil, shards, processos, transacoes):
+    # processo próprio: cada rodada configura o django.db do zero
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=preparar, args=(banco, perfil, shards, processos, transacoes, fila))
+    processo.start()
+    emails = fila.get()
+    processo.join()
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processos', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--escritas', type=float, default=0.3, help="Fração das requisições que escrevem.")
+    parser.add_argument('--ler-antes', action='store_true',
+                        help="Escritas leem antes de escrever na mesma transação (admin, ModelForm).")
+    parser.add_argument('--transacoes', type=int, default=2000, help="Histórico semeado por usuário.")
+    parser.add_argument('--shards', help="Quantidades de shards a comparar no perfil de produção, ex.: 0,2,4.")
+    args = parser.parse_args()
+
+    if args.shards:
+        rodadas = [(f'shards_{n}', 'producao', n) for n in map(int, args.shards.split(','))]
+    else:
+        rodadas = [(perfil, perfil, 0) for perfil in PERFIS]
+    resultado = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, perfil, shards in rodadas:
+            # banco novo por rodada: o journal_mode fica gravado no arquivo
+            banco = str(Path(pasta) / f'{nome}.sqlite3')
+            emails = semear_em_processo(banco, perfil, shards, args.processos, args.transacoes)
+            resultado[nome] = rodar(banco, perfil, shards, emails, args.segundos, args.escritas, args.ler_antes)
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Stress de progresso simultâneo numa mesma meta (usuarios/operacoes.py).
+
+Várias threads somam 1 à mesma meta ao mesmo tempo, primeiro com o caminho
+antigo (lê a meta, aplica a regra em Python e faz ``save()`` de todas as
+colunas) e depois com o ``UPDATE`` condicional. Mostra incrementos perdidos,
+erros de lock e atualizações por segundo:
+
+    cd back-end
+    python scripts/stress_progresso.py --threads 8 --incrementos 200
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'StonksView.settings')
+
+
+def antigo(usuario_id, meta_id, valor):
+    from usuarios.models import MetaFinanceira
+    meta = MetaFinanceira.objects.get(id=meta_id, usuario_id=usuario_id)
+    meta.valor_atual += valor
+    if meta.valor_atual <= 0:
+        meta.valor_atual = 0
+    if meta.valor_atual >= meta.valor:
+        meta.valor_atual = meta.valor
+        meta.status = "Concluída"
+    elif meta.valor_atual > 0:
+        meta.status = "Em andamento"
+    else:
+        meta.status = "Pendente"
+    meta.save()
+
+
+def rodar(funcao, usuario, threads, incrementos):
+    from django.db import connections
+    from usuarios.models import MetaFinanceira
+
+    meta = MetaFinanceira.objects.create(usuario=usuario, nome='Stress', valor=Decimal('10000000'),
+                                         data_inicial=date.today(), data_final=date.today())
+    erros = []
+
+    def trabalhar():
+        try:
+            for _ in range(incrementos):
+                try:
+                    funcao(usuario.id, meta.id, Decimal('1'))
+                except Exception as e:
+                    erros.append(type(e).__name__)
+        finally:
+            connections.close_all()
+
+    grupo = [threading.Thread(target=trabalhar) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for t in grupo:
+        t.start()
+    for t in grupo:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+    meta.refresh_from_db()
+    aplicados = threads * incrementos - len(erros)
+    return {
+        'esperado': threads * incrementos,
+        'valor_final': int(meta.valor_atual),
+        'perdidos': aplicados - int(meta.valor_atual),
+        'erros': len(erros),
+        'atualizacoes_por_s': round(aplicados / decorrido, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--incrementos', type=int, default=200)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.db import connection
+    from usuarios import operacoes
+    from usuarios.models import CustomUser
+
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        usuario = CustomUser.objects.create_user('stress@stonks.local', 'Stress@123', 'Stress')
+        resultado = {
+            'antigo': rodar(antigo, usuario, args.threads, args.incrementos),
+            'update_condicional': rodar(operacoes.adicionar_progresso, usuario, args.threads, args.incrementos),
+        }
+    finally:
+        connection.creation.destroy_test_db(connection.settings_dict['NAME'], verbosity=0)
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,193 @@
-from django.contrib import admin
-from .models import Transacao, MetaFinanceira, Lembrete
+"""
+Admin, pensado para tabelas com milhões de linhas.
+
+As listagens não contam a tabela inteira: ``PaginadorLimitado`` conta até
+``LIMITE_CONTAGEM`` linhas (um ``COUNT`` sobre um ``LIMIT``) e a paginação
+para aí; o que estiver além se acha filtrando. A ordem das listagens e os
+filtros laterais (tipo e data das transações, status das metas) seguem
+índices próprios (ver models.py), então cada página lê só as linhas que
+mostra; as colunas não são ordenáveis por clique, o que pediria ordenar a
+tabela toda.
+
+O que cada página mostra dos outros bancos vem em lote, por ``completar``:
+o dono das transações, metas e lembretes numa consulta só (um JOIN não serve,
+os usuários ficam no default e os dados podem estar num shard) e os totais
+de cada usuário numa consulta agrupada ao ``ResumoMensal`` por banco.
 
-admin.site.register(Transacao)
-admin.site.register(MetaFinanceira)
-admin.site.register(Lembrete)
+Com shards ligados, o filtro "banco" escolhe de onde a listagem lê (padrão:
+o default); a página de edição herda a escolha pelos filtros preservados.
+"""
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Transacao, MetaFinanceira, Lembrete, CustomUser
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Sum
+from django.http import QueryDict
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+
+from . import resumo, shards
+from .models import CustomUser, Lembrete, MetaFinanceira, ResumoMensal, Transacao
+from .sync import proximo_seq
+
+LIMITE_CONTAGEM = 10_000
+
+
+# =========================
+# LISTAGENS GRANDES
+# =========================
+class PaginadorLimitado(Paginator):
+    @cached_property
+    def count(self):
+        # SELECT COUNT(*) FROM (... LIMIT n): lê no máximo n entradas do índice
+        return self.object_list.order_by()[:LIMITE_CONTAGEM].count()
+
+
+class ListaDaPagina(ChangeList):
+    """Changelist que passa os objetos da página ao ``completar`` do admin."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_list = list(self.result_list)
+        self.model_admin.completar(request, self.result_list)
+
+
+class AdminGrande(admin.ModelAdmin):
+    list_per_page = 50
+    paginator = PaginadorLimitado
+    show_full_result_count = False
+    sortable_by = ()
+
+    def get_changelist(self, request, **kwargs):
+        return ListaDaPagina
+
+    def completar(self, request, objetos):
+        pass
+
+
+# =========================
+# DADOS POR USUÁRIO
+# =========================
+def banco_escolhido(request):
+    """Banco pedido em ``?banco=`` (ou nos filtros preservados da listagem); padrão: o default."""
+    banco = request.GET.get('banco') or QueryDict(request.GET.get('_changelist_filters', '')).get('banco')
+    return banco if banco in settings.SHARDS_USUARIOS else DEFAULT_DB_ALIAS
+
+
+class FiltroBanco(admin.SimpleListFilter):
+    title = 'banco'
+    parameter_name = 'banco'
+
+    def lookups(self, request, model_admin):
+        # sem shards não há o que escolher e o filtro nem aparece
+        return [(alias, alias) for alias in settings.SHARDS_USUARIOS]
+
+    def choices(self, changelist):
+        todos, *shards_ = super().choices(changelist)
+        return [{**todos, 'display': DEFAULT_DB_ALIAS}, *shards_]
 
+    def queryset(self, request, queryset):
+        return queryset  # aplicado no get_queryset de DadosUsuarioAdmin
+
+
+class DadosUsuarioAdmin(AdminGrande):
+    # o dono vem por ``completar``: com 'usuario' no list_display o Django faria um JOIN
+    list_select_related = False
+    raw_id_fields = ('usuario',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(banco_escolhido(request))
+
+    # a exclusão vira tombstone, como nas views, para o /sync/ reportá-la: um
+    # UPDATE e um seq novo por usuário afetado, em vez de um save por linha
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, type(obj).objects.using(obj._state.db).filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(using=queryset.db):
+            for usuario_id in set(queryset.values_list('usuario_id', flat=True)):
+                seq = proximo_seq(usuario_id, queryset.db)
+                queryset.filter(usuario_id=usuario_id).update(excluido=True, seq=seq)
+
+    def completar(self, request, objetos):
+        donos = CustomUser.objects.in_bulk({obj.usuario_id for obj in objetos})
+        banco = banco_escolhido(request)
+        for obj in objetos:
+            if obj.usuario_id in donos:
+                obj.usuario = donos[obj.usuario_id]
+            filtro = {'usuario__id__exact': obj.usuario_id}
+            if banco != DEFAULT_DB_ALIAS:
+                filtro['banco'] = banco
+            obj.filtro_dono = urlencode(filtro)
+
+    @admin.display(description='Usuário')
+    def dono(self, obj):
+        rotulo = obj.usuario if type(obj).usuario.is_cached(obj) else f"#{obj.usuario_id} (excluído)"
+        return format_html('<a href="?{}">{}</a>', obj.filtro_dono, rotulo)
+
+
+@admin.register(Transacao)
+class TransacaoAdmin(DadosUsuarioAdmin):
+    list_display = ('id', 'data', 'descricao', 'valor', 'tipo', 'dono')
+    list_filter = (FiltroBanco, 'tipo', 'data')
+    ordering = ('-data', '-id')
+
+    # o ResumoMensal acompanha as edições e exclusões feitas aqui, como nas views
+    # (delete_model passa pelo delete_queryset)
+    def save_model(self, request, obj, form, change):
+        with shards.atomico(obj.usuario_id):
+            antes = None
+            if change:
+                antes = Transacao.todos.filter(pk=obj.pk).values_list('usuario_id', 'data', 'tipo', 'valor').first()
+            super().save_model(request, obj, form, change)
+            if antes:
+                usuario_id, data, tipo, valor = antes
+                with shards.usuario(usuario_id):
+                    resumo.registrar(usuario_id, data, tipo, -valor, -1)
+            resumo.registrar(obj.usuario_id, obj.data, obj.tipo, obj.valor)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(using=queryset.db):
+            por_usuario = defaultdict(list)
+            for usuario_id, *item in queryset.values_list('usuario_id', 'data', 'tipo', 'valor'):
+                por_usuario[usuario_id].append(item)
+            for usuario_id, itens in por_usuario.items():
+                with shards.usuario(usuario_id):
+                    resumo.registrar_lote(usuario_id, itens, sinal=-1)
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(MetaFinanceira)
+class MetaFinanceiraAdmin(DadosUsuarioAdmin):
+    list_display = ('id', 'nome', 'valor', 'valor_atual', 'status', 'data_final', 'dono')
+    list_filter = (FiltroBanco, 'status')
+    ordering = ('-id',)
+
+
+@admin.register(Lembrete)
+class LembreteAdmin(DadosUsuarioAdmin):
+    list_display = ('id', 'nome', 'data', 'enviado', 'dono')
+    # sem filtro por data: um índice (data, id) concorreria com o lembrete_pendente do worker
+    list_filter = (FiltroBanco,)
+    ordering = ('-id',)
+
+
+# =========================
+# USUÁRIOS
+# =========================
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(AdminGrande, UserAdmin):
     model = CustomUser
-    list_display = ('email', 'first_name', 'is_staff', 'is_active')
+    list_display = ('email', 'first_name', 'is_staff', 'is_active', 'transacoes', 'saldo')
     list_filter = ('is_staff', 'is_active')
     search_fields = ('email', 'first_name')
     ordering = ('email',)
+    sortable_by = ('email',)
     fieldsets = (
         (None, {'fields': ('email', 'first_name', 'password')}),
         ('Permissions', {'fields': ('is_staff', 'is_active', 'is_superuser', 'groups', 'user_permissions')}),
@@ -26,3 +199,30 @@ class CustomUserAdmin(UserAdmin):
             'fields': ('email', 'first_name', 'password1', 'password2', 'is_staff', 'is_active')}
         ),
     )
+
+    def completar(self, request, usuarios):
+        """Totais de cada usuário da página: uma consulta agrupada ao ``ResumoMensal`` por banco."""
+        por_banco = defaultdict(list)
+        for u in usuarios:
+            por_banco[shards.banco(u.shard)].append(u.pk)
+        por_tipo, quantidades = defaultdict(dict), defaultdict(int)
+        for banco, ids in por_banco.items():
+            linhas = (
+                ResumoMensal.objects.using(banco).filter(usuario_id__in=ids)
+                .values('usuario_id', 'tipo')
+                .annotate(soma=Sum('total'), quantidade=Sum('quantidade'))
+                .values_list('usuario_id', 'tipo', 'soma', 'quantidade')
+            )
+            for usuario_id, tipo, soma, quantidade in linhas:
+                por_tipo[usuario_id][tipo] = soma
+                quantidades[usuario_id] += quantidade
+        for u in usuarios:
+            u.totais = {**resumo.saldo(por_tipo[u.pk]), 'transacoes': quantidades[u.pk]}
+
+    @admin.display(description='Transações')
+    def transacoes(self, u):
+        return u.totais['transacoes']
+
+    @admin.display(description='Saldo')
+    def saldo(self, u):
+        return f"{u.totais['saldo']:.2f}"
@@ -0,0 +1,113 @@
+"""
+Séries dos gráficos do dashboard (``/analytics/``).
+
+O SQLite agrupa as transações do período por dia e tipo (índice
+``transacao_usuario_dia_tipo``, sem ler a tabela) e as linhas agrupadas vão
+por ``values_list`` para arrays NumPy. Saldo diário, totais por mês e tipo
+e médias móveis saem de ``bincount``, ``cumsum`` e ``convolve``, sem laço
+por transação. O saldo parte do acumulado antes do período, lido do
+``ResumoMensal`` mais os dias do mês inicial.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ResumoMensal, Transacao
+from .resumo import TIPOS_GANHO
+
+TIPOS = [tipo for tipo, _ in Transacao.TIPO_CHOICES]
+JANELAS = (30, 90)
+DIAS_PADRAO = 365
+DIAS_MAX = 366 * 5
+
+_SINAIS = np.array([1.0 if tipo in TIPOS_GANHO else -1.0 for tipo in TIPOS])
+_GANHO = _SINAIS > 0
+
+
+def periodo(params):
+    """``(inicio, fim)`` de ``date_from``/``date_to``; o padrão são os últimos ``DIAS_PADRAO`` dias."""
+    datas = {}
+    for param in ('date_from', 'date_to'):
+        valor = params.get(param)
+        if valor:
+            datas[param] = parse_date(valor)
+            if datas[param] is None:
+                raise ValueError(f"{param} inválido")
+    fim = datas.get('date_to') or timezone.localdate()
+    inicio = datas.get('date_from') or fim - timedelta(days=DIAS_PADRAO - 1)
+    if inicio > fim:
+        raise ValueError("date_from depois de date_to")
+    if (fim - inicio).days >= DIAS_MAX:
+        raise ValueError(f"Período maior que {DIAS_MAX} dias")
+    return inicio, fim
+
+
+def variante(request):
+    """Parte do ETag de ``/analytics/``: sem ``date_to`` o período termina hoje e muda a cada dia."""
+    return None if request.GET.get('date_to') else timezone.localdate().isoformat()
+
+
+def _saldo_antes(usuario, inicio):
+    """Ganhos menos gastos de tudo antes de ``inicio``: meses fechados do resumo mais os dias do mês."""
+    mes = inicio.replace(day=1)
+    linhas = list(
+        ResumoMensal.objects.filter(usuario=usuario, mes__lt=mes)
+        .values('tipo').annotate(soma=Sum('total')).order_by().values_list('tipo', 'soma')
+    )
+    if inicio > mes:
+        linhas += (
+            Transacao.objects.filter(usuario=usuario, data__gte=mes, data__lt=inicio)
+            .values('tipo').annotate(soma=Sum('valor')).order_by().values_list('tipo', 'soma')
+        )
+    return sum(float(soma) * (1 if tipo in TIPOS_GANHO else -1) for tipo, soma in linhas if soma)
+
+
+def media_movel(serie, janela):
+    """Média dos últimos ``janela`` pontos; no começo da série, dos que existirem."""
+    somas = np.convolve(serie, np.ones(janela))[:len(serie)]
+    return somas / np.minimum(np.arange(1, len(serie) + 1), janela)
+
+
+def series(usuario, inicio, fim):
+    """Saldo diário com médias móveis e totais mensais por tipo, de ``inicio`` a ``fim`` (inclusive)."""
+    dias = np.arange(np.datetime64(inicio, 'D'), np.datetime64(fim, 'D') + 1)
+    linhas = list(
+        Transacao.objects.filter(usuario=usuario, data__gte=inicio, data__lte=fim)
+        .values('data', 'tipo').annotate(soma=Sum('valor')).order_by()
+        .values_list('data', 'tipo', 'soma')
+    )
+    datas, tipos, somas = zip(*linhas) if linhas else ((), (), ())
+    indice_dia = (np.array(datas, dtype='datetime64[D]') - dias[0]).astype(np.int64)
+    valores = np.array(somas, dtype=float)
+    tipos = np.array(tipos, dtype=object)
+    # tipo fora da lista conta como "other", como no resumo
+    indice_tipo = np.full(len(tipos), TIPOS.index('other'))
+    for i, tipo in enumerate(TIPOS):
+        indice_tipo[tipos == tipo] = i
+
+    # saldo corrente por dia
+    fluxo = np.bincount(indice_dia, weights=valores * _SINAIS[indice_tipo], minlength=len(dias))
+    saldo = _saldo_antes(usuario, inicio) + np.cumsum(fluxo)
+
+    # totais por mês e tipo: uma célula por (mês, tipo) no bincount
+    meses_dias = dias.astype('datetime64[M]')
+    meses = np.unique(meses_dias)
+    indice_mes = (meses_dias[indice_dia] - meses[0]).astype(np.int64)
+    por_mes = np.bincount(
+        indice_mes * len(TIPOS) + indice_tipo, weights=valores, minlength=len(meses) * len(TIPOS)
+    ).reshape(len(meses), len(TIPOS))
+
+    return {
+        'date_from': inicio.isoformat(),
+        'date_to': fim.isoformat(),
+        'dias': dias.astype(str).tolist(),
+        'saldo': saldo.round(2).tolist(),
+        'media_movel': {str(j): media_movel(saldo, j).round(2).tolist() for j in JANELAS},
+        'meses': meses.astype(str).tolist(),
+        'por_tipo': {tipo: por_mes[:, i].round(2).tolist() for i, tipo in enumerate(TIPOS)},
+        'ganhos': por_mes[:, _GANHO].sum(axis=1).round(2).tolist(),
+        'gastos': por_mes[:, ~_GANHO].sum(axis=1).round(2).tolist(),
+    }
@@ -0,0 +1,189 @@
+"""
+API JSON assíncrona (``/api/...``), para servir pelo StonksView.asgi.
+
+Mesmos formatos das views JSON de ``views.py``, com o ORM assíncrono nas
+leituras (``aget``, ``alistar``) e ``request.auser()``. Toda escrita avança
+o seq e grava a linha na mesma transação; ``transaction.atomic`` ainda não
+funciona em código assíncrono, então as escritas rodam o helper síncrono de
+``operacoes`` num único ``sync_to_async``.
+O ``/api/eventos/`` mantém a conexão aberta e avisa as mudanças por SSE
+(usuarios/eventos.py).
+"""
+import json
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from . import cache_respostas, consultas, eventos, lote, operacoes, serializacao
+from .decorators import versionado_por_usuario
+from .models import Lembrete, MetaFinanceira, Transacao
+from .serializacao import lembrete_dict, meta_dict, progresso_dict, transacao_dict
+
+
+def _metodo_invalido():
+    return JsonResponse({'error': "Método inválido"}, status=405)
+
+
+async def _obter(modelo, usuario, id):
+    try:
+        return await modelo.objects.aget(id=id, usuario=usuario)
+    except modelo.DoesNotExist:
+        raise Http404
+
+
+# =========================
+# TRANSAÇÕES
+# =========================
+@login_required
+@versionado_por_usuario
+async def listar_transacoes(request):
+    usuario = await request.auser()
+
+    async def gerar():
+        transacoes, limite = consultas.consulta_pagina(request.GET, usuario)
+        pagina, proximo = consultas.fechar_pagina(await serializacao.alistar('transacoes', transacoes), limite)
+        return {'transacoes': pagina, 'proximo': proximo, 'seq': usuario.sync_seq}
+
+    try:
+        return await cache_respostas.aresposta_json(request, usuario, 'transacoes', gerar)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@csrf_exempt
+@login_required
+async def adicionar_transacao(request):
+    if request.method != "POST":
+        return _metodo_invalido()
+    usuario = await request.auser()
+    try:
+        campos = lote.campos_criacao('transacao', json.loads(request.body))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    t = await sync_to_async(operacoes.criar_transacao)(usuario, **campos)
+    return JsonResponse({'status': 'ok', 'transacao': transacao_dict(t), 'seq': t.seq})
+
+
+@csrf_exempt
+@login_required
+async def excluir_transacao(request, transacao_id):
+    if request.method != "DELETE":
+        return _metodo_invalido()
+    t = await _obter(Transacao, await request.auser(), transacao_id)
+    await sync_to_async(operacoes.excluir_transacao)(t)
+    return JsonResponse({'status': 'ok', 'seq': t.seq})
+
+
+# =========================
+# METAS FINANCEIRAS
+# =========================
+@login_required
+@versionado_por_usuario
+async def listar_metas(request):
+    usuario = await request.auser()
+
+    async def gerar():
+        metas = MetaFinanceira.objects.filter(usuario=usuario).order_by('-data_criacao')
+        return {'metas': await serializacao.alistar('metas', metas), 'seq': usuario.sync_seq}
+
+    return await cache_respostas.aresposta_json(request, usuario, 'metas', gerar)
+
+
+@csrf_exempt
+@login_required
+async def adicionar_meta(request):
+    if request.method != "POST":
+        return _metodo_invalido()
+    usuario = await request.auser()
+    try:
+        campos = lote.campos_criacao('meta', json.loads(request.body))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    meta = await sync_to_async(operacoes.criar_meta)(usuario, **campos)
+    return JsonResponse({'status': 'ok', 'meta': meta_dict(meta), 'seq': meta.seq})
+
+
+@csrf_exempt
+@login_required
+async def adicionar_progresso_meta(request, meta_id):
+    if request.method != "POST":
+        return _metodo_invalido()
+    try:
+        valor = Decimal(str(json.loads(request.body).get('valor', 0)))
+    except (InvalidOperation, TypeError, ValueError, AttributeError):
+        return JsonResponse({'error': "Valor inválido"}, status=400)
+    if valor <= 0:
+        return JsonResponse({'error': "Valor inválido"}, status=400)
+    usuario = await request.auser()
+    try:
+        progresso = await sync_to_async(operacoes.adicionar_progresso)(usuario.id, meta_id, valor)
+    except MetaFinanceira.DoesNotExist:
+        raise Http404
+    return JsonResponse({'status': 'ok', 'nova_meta': progresso_dict(progresso), 'seq': progresso['seq']})
+
+
+@csrf_exempt
+@login_required
+async def excluir_meta(request, meta_id):
+    if request.method != "DELETE":
+        return _metodo_invalido()
+    meta = await _obter(MetaFinanceira, await request.auser(), meta_id)
+    await sync_to_async(operacoes.excluir_meta)(meta)
+    return JsonResponse({'status': 'ok', 'seq': meta.seq})
+
+
+# =========================
+# LEMBRETES
+# =========================
+@login_required
+@versionado_por_usuario
+async def listar_lembretes(request):
+    usuario = await request.auser()
+
+    async def gerar():
+        lembretes = Lembrete.objects.filter(usuario=usuario).order_by('data')
+        return {'lembretes': await serializacao.alistar('lembretes', lembretes), 'seq': usuario.sync_seq}
+
+    return await cache_respostas.aresposta_json(request, usuario, 'lembretes', gerar)
+
+
+@csrf_exempt
+@login_required
+async def adicionar_lembrete(request):
+    if request.method != "POST":
+        return _metodo_invalido()
+    usuario = await request.auser()
+    try:
+        campos = lote.campos_criacao('lembrete', json.loads(request.body))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    l = await sync_to_async(operacoes.criar_lembrete)(usuario, **campos)
+    return JsonResponse({'status': 'ok', 'lembrete': lembrete_dict(l), 'seq': l.seq})
+
+
+@csrf_exempt
+@login_required
+async def excluir_lembrete(request, lembrete_id):
+    if request.method != "DELETE":
+        return _metodo_invalido()
+    l = await _obter(Lembrete, await request.auser(), lembrete_id)
+    await sync_to_async(operacoes.excluir_lembrete)(l)
+    return JsonResponse({'status': 'ok', 'seq': l.seq})
+
+
+# =========================
+# EVENTOS (SSE)
+# =========================
+@login_required
+async def eventos_usuario(request):
+    usuario = await request.auser()
+    if eventos.broker().conexoes(usuario.id) >= eventos.MAX_CONEXOES:
+        return JsonResponse({'error': "Conexões demais abertas"}, status=429)
+    resposta = StreamingHttpResponse(eventos.fluxo(usuario.id, usuario.sync_seq), content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'  # nginx: não segurar os eventos no buffer
+    return resposta
+
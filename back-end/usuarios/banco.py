@@ -0,0 +1,36 @@
+"""
+Ajustes das conexões SQLite.
+
+``configurar_sqlite`` roda no ``connection_created`` e aplica
+``settings.SQLITE_PRAGMAS`` em cada conexão nova:
+
+- ``journal_mode=WAL``: leitores não bloqueiam o escritor nem o contrário;
+- ``synchronous=NORMAL``: sob WAL só perde a última transação numa queda de
+  energia, nunca corrompe o arquivo, e evita um fsync por commit;
+- ``busy_timeout``: quem encontra o banco travado espera em vez de falhar
+  na hora com "database is locked";
+- ``mmap_size`` e ``cache_size``: páginas quentes lidas da memória.
+
+Com ``CONN_MAX_AGE`` (a conexão, e o cache dela, sobrevive entre
+requisições) e ``transaction_mode: IMMEDIATE``, ligados pelo ambiente
+(``STONKS_CONN_MAX_AGE`` e ``STONKS_SQLITE_TRANSACTION_MODE``, ver settings),
+forma o perfil de produção medido em ``scripts/carga_sqlite.py``.
+"""
+from django.conf import settings
+
+
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # direto na conexão do driver: PRAGMA não entra na contagem de consultas
+    for nome, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {nome} = {valor}')
+
+
+def pragmas(connection):
+    """Valores em uso na conexão, para conferir a configuração."""
+    connection.ensure_connection()
+    return {
+        nome: connection.connection.execute(f'PRAGMA {nome}').fetchone()[0]
+        for nome in getattr(settings, 'SQLITE_PRAGMAS', {})
+    }
@@ -0,0 +1,386 @@
+"""
+Benchmark das rotas de ``usuarios/urls.py`` (``manage.py bench``).
+
+Cada cenário monta uma requisição (método, caminho, corpo) a partir do
+contexto do usuário de carga: ids existentes para progresso e exclusão, o seq
+atual para o ``/sync/`` e assim por diante. Os cenários rodam um de cada vez,
+com ``concorrencia`` threads dividindo ``requisicoes`` chamadas, pelo test
+client (no processo) ou contra um servidor já no ar (``--url``).
+
+O resultado é um JSON com chaves estáveis (uma entrada por cenário com vazão,
+percentis de latência e consultas por requisição, estas lidas do cabeçalho
+``Server-Timing``), pensado para ser guardado e comparado entre execuções.
+"""
+import http.client
+import json
+import platform
+import random
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client
+from django.urls import get_resolver, reverse
+
+from . import shards, sync
+from .models import CustomUser, Lembrete, MetaFinanceira, Transacao
+
+VERSAO = 1
+EMAIL_STAFF = 'bench-staff@stonks.local'
+_CONSULTAS = re.compile(r'db;[^,]*desc="(\d+) consultas"')
+
+# rotas de usuarios/urls.py que os cenários deixam de fora de propósito
+FORA_DO_BENCH = {
+    'login': "POST limitado por IP (limites.py); o GET é o cenário 'pagina_login'",
+    'sair': "encerraria a sessão do usuário de carga",
+    'api_eventos': "conexão SSE que não termina; o custo é medido em EventosTests",
+}
+
+
+# =========================
+# CONTEXTO E CENÁRIOS
+# =========================
+class Contexto:
+    """Estado compartilhado pelos cenários: usuário, ids disponíveis e sorteios."""
+
+    def __init__(self, usuario, semente=42):
+        self.usuario = usuario
+        self.rng = random.Random(semente)
+        self._lock = threading.Lock()
+        with shards.usuario(usuario):
+            self.metas = list(MetaFinanceira.objects.filter(usuario=usuario).values_list('id', flat=True)[:200])
+        # ids criados pelos cenários de "adicionar", consumidos pelos de "excluir"
+        self.criados = {'transacao': deque(), 'meta': deque(), 'lembrete': deque()}
+
+    def sortear(self, sequencia):
+        with self._lock:
+            return self.rng.choice(sequencia)
+
+    def data(self):
+        with self._lock:
+            return (date.today() - timedelta(days=self.rng.randrange(365))).isoformat()
+
+    def criado(self, modelo, dados):
+        self.criados[modelo].append(dados[modelo]['id'])
+
+    def proximo_criado(self, modelo):
+        try:
+            return self.criados[modelo].popleft()
+        except IndexError:
+            return None
+
+
+def _get(nome, query=''):
+    return lambda ctx: ('GET', reverse(nome) + query, None)
+
+
+def _post(nome, corpo, *args):
+    return lambda ctx: ('POST', reverse(nome, args=[a(ctx) for a in args]), corpo(ctx))
+
+
+def _excluir(nome, modelo):
+    def montar(ctx):
+        id = ctx.proximo_criado(modelo)
+        return ('DELETE', reverse(nome, args=[id]), None) if id else None
+    return montar
+
+
+def _transacao(ctx):
+    return {'data': ctx.data(), 'descricao': 'Bench', 'valor': '12.34', 'tipo': ctx.sortear(['income', 'extra'])}
+
+
+def _meta(ctx):
+    return {'nome': 'Bench', 'valor': 1000, 'data_inicial': ctx.data(), 'data_final': date.today().isoformat()}
+
+
+def _lembrete(ctx):
+    return {'nome': 'Bench', 'data': ctx.data()}
+
+
+def _lote(ctx):
+    return {'operacoes': [{'op': 'criar', 'modelo': 'lembrete', 'dados': _lembrete(ctx)} for _ in range(10)]}
+
+
+def _importacao(ctx):
+    linhas = ''.join(f"{ctx.data()};Bench {i};-{i + 1},50\n" for i in range(100))
+    return {'arquivo': ('bench.csv', 'data;descricao;valor\n' + linhas)}
+
+
+def _sync(ctx):
+    return ('GET', reverse('sincronizar') + f'?since={max(sync.seq_atual(ctx.usuario.id) - 50, 0)}', None)
+
+
+def _progresso(ctx):
+    return {'valor': 10}
+
+
+# (nome, url name, montar(ctx) -> (método, caminho, corpo) ou None, staff, guarda o objeto criado em)
+CENARIOS = [
+    ('pagina_login', 'login', _get('login'), False, None),
+    ('pagina_cadastro', 'cadastro', _get('cadastro'), False, None),
+    ('pagina_recuperar', 'recuperar', _get('recuperar'), False, None),
+    ('pagina_reset_invalido', 'password_reset_confirm',
+     lambda ctx: ('GET', reverse('password_reset_confirm', args=['MQ', 'invalido']), None), False, None),
+    ('perfil', 'perfil', _get('perfil'), False, None),
+    ('dashboard', 'dashboard', _get('dashboard'), False, None),
+    ('resumo', 'resumo_financeiro', _get('resumo_financeiro'), False, None),
+    ('analise_ano', 'analise_financeira', _get('analise_financeira'), False, None),
+    ('transacoes', 'listar_transacoes', _get('listar_transacoes'), False, None),
+    ('transacoes_200', 'listar_transacoes', _get('listar_transacoes', '?limit=200'), False, None),
+    ('transacao_adicionar', 'adicionar_transacao', _post('adicionar_transacao', _transacao), False, 'transacao'),
+    ('transacao_excluir', 'excluir_transacao', _excluir('excluir_transacao', 'transacao'), False, None),
+    ('transacoes_exportar_mes', 'exportar_transacoes',
+     lambda ctx: ('GET', reverse('exportar_transacoes')
+                  + f'?formato=ndjson&date_from={(date.today() - timedelta(days=30)).isoformat()}', None),
+     False, None),
+    ('transacoes_importar_100', 'importar_transacoes', _post('importar_transacoes', _importacao), False, None),
+    ('pagina_metas', 'listar_metas', _get('listar_metas'), False, None),
+    ('metas', 'listar_metas_json', _get('listar_metas_json'), False, None),
+    ('meta_adicionar', 'adicionar_meta', _post('adicionar_meta', _meta), False, 'meta'),
+    ('meta_progresso', 'adicionar_progresso_meta',
+     _post('adicionar_progresso_meta', _progresso, lambda ctx: ctx.sortear(ctx.metas)), False, None),
+    ('meta_excluir', 'excluir_meta', _excluir('excluir_meta', 'meta'), False, None),
+    ('lembretes', 'listar_lembretes', _get('listar_lembretes'), False, None),
+    ('lembrete_adicionar', 'adicionar_lembrete', _post('adicionar_lembrete', _lembrete), False, 'lembrete'),
+    ('lembrete_excluir', 'excluir_lembrete', _excluir('excluir_lembrete', 'lembrete'), False, None),
+    ('lote_10_lembretes', 'aplicar_lote', _post('aplicar_lote', _lote), False, None),
+    ('sync_ultimas_50', 'sincronizar', _sync, False, None),
+    ('cache_estatisticas', 'estatisticas_cache', _get('estatisticas_cache'), True, None),
+    ('metricas_json', 'metricas_processo', _get('metricas_processo'), True, None),
+    ('metricas_prometheus', 'metricas_prometheus', _get('metricas_prometheus'), True, None),
+    ('api_transacoes', 'api_listar_transacoes', _get('api_listar_transacoes'), False, None),
+    ('api_transacao_adicionar', 'api_adicionar_transacao', _post('api_adicionar_transacao', _transacao), False,
+     'transacao'),
+    ('api_transacao_excluir', 'api_excluir_transacao', _excluir('api_excluir_transacao', 'transacao'), False, None),
+    ('api_metas', 'api_listar_metas', _get('api_listar_metas'), False, None),
+    ('api_meta_adicionar', 'api_adicionar_meta', _post('api_adicionar_meta', _meta), False, 'meta'),
+    ('api_meta_progresso', 'api_adicionar_progresso_meta',
+     _post('api_adicionar_progresso_meta', _progresso, lambda ctx: ctx.sortear(ctx.metas)), False, None),
+    ('api_meta_excluir', 'api_excluir_meta', _excluir('api_excluir_meta', 'meta'), False, None),
+    ('api_lembretes', 'api_listar_lembretes', _get('api_listar_lembretes'), False, None),
+    ('api_lembrete_adicionar', 'api_adicionar_lembrete', _post('api_adicionar_lembrete', _lembrete), False,
+     'lembrete'),
+    ('api_lembrete_excluir', 'api_excluir_lembrete', _excluir('api_excluir_lembrete', 'lembrete'), False, None),
+]
+
+
+def rotas_sem_cenario():
+    nomes = {p.name for p in get_resolver('usuarios.urls').url_patterns if p.name}
+    cobertas = {url for _, url, *_ in CENARIOS}
+    return sorted(nomes - cobertas - set(FORA_DO_BENCH))
+
+
+# =========================
+# CLIENTES
+# =========================
+def _sessao(usuario):
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente.cookies['sessionid'].value
+
+
+def _host():
+    # o 'testserver' padrão do Client só passa no ALLOWED_HOSTS dos testes
+    host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    return host.lstrip('.')
+
+
+class ClienteInterno:
+    """Test client do Django: não precisa de servidor, mede a pilha inteira no processo."""
+
+    def __init__(self, usuario):
+        self.cliente = Client(HTTP_HOST=_host(), raise_request_exception=False)
+        self.cliente.force_login(usuario)
+
+    def enviar(self, metodo, caminho, corpo):
+        if metodo == 'GET':
+            r = self.cliente.get(caminho)
+        elif metodo == 'DELETE':
+            r = self.cliente.delete(caminho)
+        elif 'arquivo' in (corpo or {}):
+            nome, conteudo = corpo['arquivo']
+            r = self.cliente.post(caminho, {'arquivo': SimpleUploadedFile(nome, conteudo.encode())})
+        else:
+            r = self.cliente.post(caminho, json.dumps(corpo), content_type='application/json')
+        conteudo = b''.join(r.streaming_content) if r.streaming else r.content
+        return r.status_code, r.get('Server-Timing', ''), conteudo
+
+    def fechar(self):
+        connections.close_all()
+
+
+class ClienteHttp:
+    """Conexão keep-alive com um servidor já no ar (runserver, gunicorn, uvicorn)."""
+
+    def __init__(self, usuario, url):
+        partes = urlsplit(url)
+        self.host, self.porta = partes.hostname, partes.port or 80
+        self.cookie = f'sessionid={_sessao(usuario)}'
+        self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=60)
+
+    def enviar(self, metodo, caminho, corpo):
+        cabecalhos = {'Cookie': self.cookie}
+        dados = None
+        if corpo is not None and 'arquivo' in corpo:
+            fronteira = uuid.uuid4().hex
+            nome, conteudo = corpo['arquivo']
+            dados = (
+                f'--{fronteira}\r\nContent-Disposition: form-data; name="arquivo"; filename="{nome}"\r\n'
+                f'Content-Type: text/csv\r\n\r\n{conteudo}\r\n--{fronteira}--\r\n'
+            ).encode()
+            cabecalhos['Content-Type'] = f'multipart/form-data; boundary={fronteira}'
+        elif corpo is not None:
+            dados = json.dumps(corpo).encode()
+            cabecalhos['Content-Type'] = 'application/json'
+        try:
+            self.conexao.request(metodo, caminho, body=dados, headers=cabecalhos)
+            r = self.conexao.getresponse()
+            return r.status, r.getheader('Server-Timing', ''), r.read()
+        except (OSError, http.client.HTTPException):
+            self.conexao.close()
+            self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=60)
+            return 599, '', b''
+
+    def fechar(self):
+        self.conexao.close()
+        connections.close_all()
+
+
+# =========================
+# EXECUÇÃO
+# =========================
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return round(ordenadas[min(int(len(ordenadas) * p), len(ordenadas) - 1)] * 1000, 3)
+
+
+def _rodar_cenario(montar, guardar, ctx, fabrica, concorrencia, requisicoes):
+    latencias, consultas, status = [], [], {}
+    lock = threading.Lock()
+    restantes = [requisicoes]
+
+    def trabalhar():
+        cliente = fabrica()
+        try:
+            while True:
+                with lock:
+                    if restantes[0] <= 0:
+                        return
+                    restantes[0] -= 1
+                pedido = montar(ctx)
+                if pedido is None:
+                    continue
+                inicio = time.perf_counter()
+                codigo, timing, conteudo = cliente.enviar(*pedido)
+                duracao = time.perf_counter() - inicio
+                if guardar and codigo == 200:
+                    ctx.criado(guardar, json.loads(conteudo))
+                encontrado = _CONSULTAS.search(timing)
+                with lock:
+                    latencias.append(duracao)
+                    status[codigo] = status.get(codigo, 0) + 1
+                    if encontrado:
+                        consultas.append(int(encontrado.group(1)))
+        finally:
+            cliente.fechar()
+
+    threads = [threading.Thread(target=trabalhar) for _ in range(concorrencia)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'requisicoes': len(latencias),
+        'erros': sum(n for codigo, n in status.items() if codigo >= 400),
+        'status': {str(codigo): n for codigo, n in sorted(status.items())},
+        'req_por_s': round(len(latencias) / decorrido, 2) if decorrido else None,
+        'latencia_ms': {
+            'media': round(statistics.fmean(latencias) * 1000, 3) if latencias else None,
+            'p50': _percentil(latencias, 0.50),
+            'p95': _percentil(latencias, 0.95),
+            'p99': _percentil(latencias, 0.99),
+            'max': round(latencias[-1] * 1000, 3) if latencias else None,
+        },
+        'consultas_por_req': round(statistics.fmean(consultas), 2) if consultas else None,
+    }
+
+
+def _usuario_staff():
+    staff, _ = CustomUser.objects.get_or_create(email=EMAIL_STAFF, defaults={'first_name': 'Bench', 'is_staff': True})
+    return staff
+
+
+def executar(usuario, concorrencia=4, requisicoes=100, aquecimento=5, url=None, filtro=None, semente=42,
+             aviso=None):
+    """Roda os cenários (os que contêm ``filtro`` no nome, se dado) e devolve o relatório."""
+    ctx = Contexto(usuario, semente)
+    staff = _usuario_staff()
+    rotas = {}
+    for nome, _, montar, precisa_staff, guardar in CENARIOS:
+        if filtro and filtro not in nome:
+            continue
+        dono = staff if precisa_staff else usuario
+
+        def fabrica(dono=dono):
+            return ClienteHttp(dono, url) if url else ClienteInterno(dono)
+
+        if aquecimento:
+            _rodar_cenario(montar, guardar, ctx, fabrica, 1, aquecimento)
+        rotas[nome] = _rodar_cenario(montar, guardar, ctx, fabrica, concorrencia, requisicoes)
+        if aviso:
+            r = rotas[nome]
+            aviso(f"{nome}: {r['req_por_s']} req/s, p95 {r['latencia_ms']['p95']} ms")
+    return {
+        'versao': VERSAO,
+        'modo': 'http' if url else 'cliente',
+        'url': url,
+        'concorrencia': concorrencia,
+        'requisicoes_por_cenario': requisicoes,
+        'ambiente': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'usuario': usuario.email,
+            'transacoes_do_usuario': Transacao.objects.filter(usuario=usuario).count(),
+            'metas_do_usuario': MetaFinanceira.objects.filter(usuario=usuario).count(),
+            'lembretes_do_usuario': Lembrete.objects.filter(usuario=usuario).count(),
+        },
+        'rotas_sem_cenario': rotas_sem_cenario(),
+        'rotas': rotas,
+    }
+
+
+def _variacao(antes, depois):
+    if not antes or depois is None:
+        return None
+    return round((depois - antes) / antes * 100, 1)
+
+
+def comparar(anterior, atual):
+    """Variação percentual (positivo = aumentou) de vazão, p50, p95 e consultas por cenário em comum."""
+    comparacao = {}
+    for nome, depois in atual['rotas'].items():
+        antes = anterior.get('rotas', {}).get(nome)
+        if antes is None:
+            continue
+        comparacao[nome] = {
+            'req_por_s_pct': _variacao(antes['req_por_s'], depois['req_por_s']),
+            'p50_pct': _variacao(antes['latencia_ms']['p50'], depois['latencia_ms']['p50']),
+            'p95_pct': _variacao(antes['latencia_ms']['p95'], depois['latencia_ms']['p95']),
+            'consultas_por_req_pct': _variacao(antes['consultas_por_req'], depois['consultas_por_req']),
+        }
+    return comparacao
@@ -0,0 +1,181 @@
+"""
+Cache por usuário das respostas JSON e dos dados iniciais do perfil.
+
+As entradas ficam no alias ``respostas`` de ``CACHES`` (locmem ou arquivo,
+ver settings). Cada entrada guarda o ``sync_seq`` com que foi gerada; como
+toda escrita avança o seq, uma entrada de versão antiga nunca é servida.
+Além disso ``invalidar`` apaga as chaves do usuário assim que a escrita é
+confirmada, para não ocupar espaço com dados mortos.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from . import serializacao
+
+ALIAS = 'respostas'
+NOMES = ('transacoes', 'metas', 'lembretes', 'resumo', 'perfil', 'analise')
+# variantes guardadas por chave em obter_variante (as mais recentes ficam)
+VARIANTES_MAX = 8
+
+_lock = threading.Lock()
+_contadores = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+
+def _contar(nome, n=1):
+    with _lock:
+        _contadores[nome] += n
+
+
+def estatisticas():
+    with _lock:
+        dados = dict(_contadores)
+    consultas = dados['hits'] + dados['misses']
+    dados['hit_ratio'] = round(dados['hits'] / consultas, 4) if consultas else None
+    config = settings.CACHES.get(ALIAS, {})
+    dados['backend'] = config.get('BACKEND')
+    dados['max_entries'] = config.get('OPTIONS', {}).get('MAX_ENTRIES')
+    dados['timeout'] = config.get('TIMEOUT')
+    return dados
+
+
+def zerar_estatisticas():
+    with _lock:
+        for nome in _contadores:
+            _contadores[nome] = 0
+
+
+# =========================
+# BACKENDS COM CONTAGEM DE DESCARTES
+# =========================
+class LocMemCacheContado(LocMemCache):
+    """LocMemCache (LRU) que conta entradas descartadas por limite e por TTL."""
+
+    def _cull(self):
+        antes = len(self._cache)
+        super()._cull()
+        _contar('evictions', antes - len(self._cache))
+
+    def _delete(self, key):
+        # fora de delete(), o LocMemCache só chama _delete quando a entrada expirou
+        if key in self._cache and self._has_expired(key):
+            _contar('expirations')
+        return super()._delete(key)
+
+
+class FileBasedCacheContado(FileBasedCache):
+    """FileBasedCache que conta arquivos descartados por limite e por TTL."""
+
+    _descartando = False
+
+    def _cull(self):
+        self._descartando = True
+        try:
+            super()._cull()
+        finally:
+            self._descartando = False
+
+    def _delete(self, fname):
+        apagou = super()._delete(fname)
+        if apagou and self._descartando:
+            _contar('evictions')
+        return apagou
+
+    def _is_expired(self, f):
+        expirado = super()._is_expired(f)
+        if expirado:
+            _contar('expirations')
+        return expirado
+
+
+# =========================
+# LEITURA E INVALIDAÇÃO
+# =========================
+def _chave(usuario_id, nome):
+    return f"u{usuario_id}:{nome}"
+
+
+def _ler(usuario, nome):
+    entrada = caches[ALIAS].get(_chave(usuario.pk, nome))
+    if entrada is not None and entrada[0] == usuario.sync_seq:
+        _contar('hits')
+        return entrada[1]
+    _contar('misses')
+    return None
+
+
+def _guardar(usuario, nome, valor):
+    caches[ALIAS].set(_chave(usuario.pk, nome), (usuario.sync_seq, valor))
+
+
+def obter(usuario, nome, gerar):
+    """Devolve o valor em cache para a versão atual do usuário, gerando-o se preciso."""
+    valor = _ler(usuario, nome)
+    if valor is None:
+        valor = gerar()
+        _guardar(usuario, nome, valor)
+    return valor
+
+
+def obter_variante(usuario, nome, variante, gerar):
+    """
+    Como ``obter``, para respostas que dependem de parâmetros (ex.: período).
+
+    As variantes ficam num dicionário sob a chave ``nome``, com no máximo
+    ``VARIANTES_MAX`` delas: a chave por usuário continua uma só, e o
+    ``invalidar`` apaga todas de uma vez.
+    """
+    entrada = caches[ALIAS].get(_chave(usuario.pk, nome))
+    variantes = entrada[1] if entrada is not None and entrada[0] == usuario.sync_seq else {}
+    valor = variantes.get(variante)
+    if valor is not None:
+        _contar('hits')
+        return valor
+    _contar('misses')
+    valor = gerar()
+    variantes = {**variantes, variante: valor}
+    while len(variantes) > VARIANTES_MAX:
+        del variantes[next(iter(variantes))]
+    _guardar(usuario, nome, variantes)
+    return valor
+
+
+def resposta_json(request, nome, gerar):
+    """
+    Resposta JSON de ``gerar()`` com o corpo já serializado em cache.
+
+    Só a forma padrão (sem query string) é guardada: é a que as páginas pedem
+    a cada carga, e mantém um número fixo de chaves por usuário.
+    """
+    if request.GET:
+        corpo = serializacao.json_bytes(gerar())
+    else:
+        corpo = obter(request.user, nome, lambda: serializacao.json_bytes(gerar()))
+    return HttpResponse(corpo, content_type='application/json')
+
+
+async def aresposta_json(request, usuario, nome, gerar):
+    """Versão de ``resposta_json`` para views assíncronas (``gerar`` é uma corrotina)."""
+    # locmem/arquivo não fazem I/O de rede: chamar o backend direto evita
+    # o salto de thread do aget/aset padrão
+    if request.GET:
+        return HttpResponse(serializacao.json_bytes(await gerar()), content_type='application/json')
+    corpo = _ler(usuario, nome)
+    if corpo is None:
+        corpo = serializacao.json_bytes(await gerar())
+        _guardar(usuario, nome, corpo)
+    return HttpResponse(corpo, content_type='application/json')
+
+
+def invalidar(usuario_id):
+    caches[ALIAS].delete_many([_chave(usuario_id, nome) for nome in NOMES])
+    _contar('invalidations')
+
+
+def limpar():
+    caches[ALIAS].clear()
+    _contar('invalidations')
@@ -0,0 +1,59 @@
+"""Consultas de transações compartilhadas pelas views síncronas e pela API assíncrona."""
+from django.utils.dateparse import parse_date
+
+from .models import Transacao
+
+TRANSACOES_POR_PAGINA = 50
+TRANSACOES_POR_PAGINA_MAX = 200
+
+
+def filtrar_transacoes(params, transacoes):
+    """Aplica os filtros opcionais ``date_from``, ``date_to`` e ``tipo`` da query string."""
+    for param, lookup in (('date_from', 'data__gte'), ('date_to', 'data__lte')):
+        valor = params.get(param)
+        if valor:
+            data = parse_date(valor)
+            if data is None:
+                raise ValueError(f"{param} inválido")
+            transacoes = transacoes.filter(**{lookup: data})
+    tipo = params.get('tipo')
+    if tipo:
+        transacoes = transacoes.filter(tipo=tipo)
+    return transacoes
+
+
+def cursor(data, id):
+    """``data`` em ISO (``AAAA-MM-DD``), como sai do serializador."""
+    return f"{data}_{id}"
+
+
+def ler_cursor(texto):
+    data, _, id = texto.partition('_')
+    data = parse_date(data)
+    if data is None or not id.isdigit():
+        raise ValueError("Cursor inválido")
+    return data, int(id)
+
+
+def consulta_pagina(params, usuario):
+    """
+    Queryset da página pedida (keyset em ``(data, id)``) e o limite aplicado.
+
+    Traz uma linha a mais que o limite só para saber se existe próxima página;
+    ``fechar_pagina`` corta essa linha e monta o cursor.
+    """
+    limite = int(params.get('limit', TRANSACOES_POR_PAGINA))
+    limite = max(1, min(limite, TRANSACOES_POR_PAGINA_MAX))
+    transacoes = filtrar_transacoes(params, Transacao.objects.filter(usuario=usuario))
+    if params.get('before'):
+        data, id = ler_cursor(params['before'])
+        transacoes = transacoes.filter(data__lte=data).exclude(data=data, id__gte=id)
+    return transacoes.order_by('-data', '-id')[:limite + 1], limite
+
+
+def fechar_pagina(pagina, limite):
+    """Recebe as linhas já serializadas e devolve ``(linhas, cursor_da_proxima)``."""
+    if len(pagina) <= limite:
+        return pagina, None
+    pagina = pagina[:limite]
+    return pagina, cursor(pagina[-1]['data'], pagina[-1]['id'])
@@ -0,0 +1,74 @@
+import hashlib
+from functools import partial, wraps
+from inspect import iscoroutinefunction
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+
+def _etag(request, usuario, extra=None):
+    # a mesma versão serve para qualquer listagem; a URL completa separa as páginas/filtros
+    url = hashlib.blake2b(request.get_full_path().encode(), digest_size=8).hexdigest()
+    etag = f"{usuario.pk}-{usuario.sync_seq}-{url}"
+    return f"{etag}-{extra}" if extra else etag
+
+
+def versionado_por_usuario(view=None, *, variante=None):
+    """
+    ETag/Last-Modified a partir de ``CustomUser.sync_seq``, que toda escrita avança.
+
+    O usuário já vem carregado pelo AuthenticationMiddleware, então um
+    ``If-None-Match`` válido vira 304 sem nenhuma consulta extra ao banco.
+    ``no-cache`` faz o navegador revalidar a cada fetch em vez de usar cópia velha.
+
+    Se a resposta depende de algo além da URL e dos dados do usuário (a data
+    de hoje, por exemplo), ``variante(request)`` devolve esse algo, que entra
+    no ETag; enquanto ela não for ``None`` não há Last-Modified, que não
+    teria como mudar junto.
+    """
+    if view is None:
+        return partial(versionado_por_usuario, variante=variante)
+    if iscoroutinefunction(view):
+        return _versionado_async(view, variante)
+
+    def etag_usuario(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return None
+        return _etag(request, request.user, variante and variante(request))
+
+    def alterado_em_usuario(request, *args, **kwargs):
+        if not request.user.is_authenticated or (variante and variante(request) is not None):
+            return None
+        return request.user.sync_alterado_em
+
+    return cache_control(private=True, no_cache=True)(
+        condition(etag_func=etag_usuario, last_modified_func=alterado_em_usuario)(view)
+    )
+
+
+def _versionado_async(view, variante=None):
+    # o condition() chama etag_func de forma síncrona, e request.user faria
+    # consulta síncrona dentro do event loop; aqui o usuário vem de request.auser()
+    @wraps(view)
+    async def interna(request, *args, **kwargs):
+        usuario = await request.auser()
+        etag = alterado_em = None
+        if usuario.is_authenticated:
+            extra = variante(request) if variante else None
+            etag = quote_etag(_etag(request, usuario, extra))
+            if usuario.sync_alterado_em and extra is None:
+                alterado_em = int(usuario.sync_alterado_em.timestamp())
+        resposta = get_conditional_response(request, etag=etag, last_modified=alterado_em)
+        if resposta is None:
+            resposta = await view(request, *args, **kwargs)
+        if request.method in ("GET", "HEAD"):
+            if alterado_em and not resposta.has_header("Last-Modified"):
+                resposta.headers["Last-Modified"] = http_date(alterado_em)
+            if etag:
+                resposta.headers.setdefault("ETag", etag)
+        patch_cache_control(resposta, private=True, no_cache=True)
+        return resposta
+
+    return interna
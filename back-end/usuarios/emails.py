@@ -0,0 +1,108 @@
+"""
+Fila de e-mails de saída.
+
+As views só gravam um ``EmailPendente`` e respondem; o envio é feito pelo
+``manage.py enviar_emails``, que drena a fila em lotes por uma única conexão
+SMTP. Uma falha reagenda a mensagem com espera exponencial até
+``MAX_TENTATIVAS``; depois disso ela fica na tabela com o último erro.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import EmailPendente
+
+logger = logging.getLogger(__name__)
+
+LOTE_PADRAO = 50
+MAX_TENTATIVAS = 8
+ESPERA_INICIAL = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+# mensagens pegas por um worker ficam reservadas por este tempo; se ele morrer
+# no meio do lote, outro worker as retoma depois
+RESERVA = timedelta(minutes=5)
+
+
+def enfileirar(destinatario, assunto, corpo, remetente=''):
+    return EmailPendente.objects.create(destinatario=destinatario, assunto=assunto, corpo=corpo, remetente=remetente)
+
+
+def espera(tentativas):
+    """Tempo até a próxima tentativa depois de ``tentativas`` falhas (30s, 1min, 2min, ... até 1h)."""
+    return min(ESPERA_INICIAL * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+
+
+def pendentes(agora=None):
+    agora = agora or timezone.now()
+    return EmailPendente.objects.filter(
+        enviado_em__isnull=True, tentativas__lt=MAX_TENTATIVAS, proxima_tentativa__lte=agora,
+    )
+
+
+def _reservar(limite):
+    """Marca até ``limite`` mensagens vencidas como deste worker e as retorna."""
+    agora = timezone.now()
+    ids = list(pendentes(agora).order_by('proxima_tentativa', 'id').values_list('id', flat=True)[:limite])
+    # o filtro repetido no UPDATE descarta o que outro worker reservou no meio tempo
+    pendentes(agora).filter(id__in=ids).update(proxima_tentativa=agora + RESERVA)
+    return list(EmailPendente.objects.filter(id__in=ids, proxima_tentativa=agora + RESERVA).order_by('id'))
+
+
+def _reabrir(conexao):
+    # a falha pode ter derrubado a conexão: começa outra para o resto do lote
+    conexao.close()
+    try:
+        conexao.open()
+    except Exception as e:
+        # servidor fora do ar: cada envio do lote vai falhar e ser reagendado
+        logger.warning("Não foi possível abrir a conexão de e-mail: %s", e)
+
+
+def processar_lote(conexao, limite=LOTE_PADRAO):
+    """Envia um lote pela ``conexao`` já aberta. Retorna ``(enviados, falhas)``."""
+    mensagens = _reservar(limite)
+    enviados, falhas = [], []
+    for pendente in mensagens:
+        email = EmailMessage(
+            pendente.assunto,
+            pendente.corpo,
+            pendente.remetente or settings.DEFAULT_FROM_EMAIL,
+            [pendente.destinatario],
+            connection=conexao,
+        )
+        try:
+            email.send()
+        except Exception as e:
+            pendente.tentativas += 1
+            pendente.ultimo_erro = f"{type(e).__name__}: {e}"
+            pendente.proxima_tentativa = timezone.now() + espera(pendente.tentativas)
+            falhas.append(pendente)
+            logger.warning("Falha ao enviar e-mail %s (tentativa %s): %s", pendente.id, pendente.tentativas, e)
+            _reabrir(conexao)
+        else:
+            pendente.enviado_em = timezone.now()
+            enviados.append(pendente)
+    EmailPendente.objects.bulk_update(enviados, ['enviado_em'])
+    EmailPendente.objects.bulk_update(falhas, ['tentativas', 'ultimo_erro', 'proxima_tentativa'])
+    return len(enviados), len(falhas)
+
+
+def drenar(limite=LOTE_PADRAO, max_lotes=None, conexao=None):
+    """Envia lotes até a fila de mensagens vencidas esvaziar, reusando uma conexão."""
+    conexao = conexao or get_connection()
+    total_enviados = total_falhas = lotes = 0
+    _reabrir(conexao)
+    try:
+        while max_lotes is None or lotes < max_lotes:
+            enviados, falhas = processar_lote(conexao, limite)
+            if not enviados and not falhas:
+                break
+            total_enviados += enviados
+            total_falhas += falhas
+            lotes += 1
+    finally:
+        conexao.close()
+    return total_enviados, total_falhas
@@ -0,0 +1,150 @@
+"""
+Arquivos estáticos com hash no nome e versões pré-comprimidas.
+
+O ``collectstatic`` grava pelo ``ArmazenamentoComprimido``
+(``STORAGES['staticfiles']``): o ``ManifestStaticFilesStorage`` copia cada
+arquivo com o hash do conteúdo no nome e escreve o ``staticfiles.json``, que
+o ``{% static %}`` usa para apontar os templates para esses nomes. Depois
+disso cada arquivo de texto com hash ganha um ``.gz`` e, com o pacote
+``brotli`` instalado, um ``.br``, quando ficam menores que o original. Antes
+do primeiro ``collectstatic`` (desenvolvimento, testes) o ``{% static %}``
+devolve o nome sem hash, servido pelo runserver.
+
+O ``EstaticosMiddleware`` serve o ``STATIC_ROOT`` a partir de um índice
+montado uma vez por processo: nomes com hash vão com ``Cache-Control:
+immutable`` por um ano (o navegador nem revalida; um conteúdo novo tem outro
+nome), os demais revalidam pelo ETag, e a versão comprimida sai conforme o
+``Accept-Encoding``.
+"""
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só há .gz
+    brotli = None
+
+COMPRIMIR = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.html')
+# a versão comprimida só é gravada se tiver no máximo 95% do original
+GANHO_MINIMO = 0.95
+# em ordem de preferência
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+IMUTAVEL = 'public, max-age=31536000, immutable'
+REVALIDAR = 'public, max-age=0, must-revalidate'
+
+
+def comprimir(conteudo):
+    """``{extensão: bytes}`` das versões comprimidas que valem a pena."""
+    versoes = {'.gz': gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        versoes['.br'] = brotli.compress(conteudo, quality=11)
+    return {ext: dados for ext, dados in versoes.items() if len(dados) <= len(conteudo) * GANHO_MINIMO}
+
+
+class ArmazenamentoComprimido(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # ainda sem collectstatic: não há manifesto para consultar
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for original, nome in sorted(self.hashed_files.items()):
+            if not nome.endswith(COMPRIMIR):
+                continue
+            with self.open(nome) as arquivo:
+                conteudo = arquivo.read()
+            for ext, dados in comprimir(conteudo).items():
+                if self.exists(nome + ext):
+                    self.delete(nome + ext)
+                self._save(nome + ext, ContentFile(dados))
+                yield original, nome + ext, True
+
+
+# =========================
+# SERVIR O STATIC_ROOT
+# =========================
+class Arquivo:
+    __slots__ = ('caminho', 'tipo', 'etag', 'imutavel', 'variantes')
+
+    def __init__(self, caminho, tipo, etag, imutavel):
+        self.caminho = caminho
+        self.tipo = tipo
+        self.etag = etag
+        self.imutavel = imutavel
+        self.variantes = {}  # codificação -> caminho
+
+
+def indice():
+    """``{url: Arquivo}`` de tudo o que o ``collectstatic`` gravou; vazio sem manifesto."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if not hashed_files or not settings.STATIC_ROOT:
+        return {}
+    raiz = str(settings.STATIC_ROOT)
+    com_hash = set(hashed_files.values())
+    arquivos = {}
+    for pasta, _, nomes in os.walk(raiz):
+        for nome in nomes:
+            caminho = os.path.join(pasta, nome)
+            relativo = os.path.relpath(caminho, raiz).replace(os.sep, '/')
+            if relativo.endswith(tuple(ext for _, ext in CODIFICACOES)):
+                continue
+            info = os.stat(caminho)
+            tipo, _ = mimetypes.guess_type(nome)
+            arquivo = Arquivo(
+                caminho=caminho,
+                tipo=tipo or 'application/octet-stream',
+                etag=f'"{info.st_size:x}-{int(info.st_mtime):x}"',
+                imutavel=relativo in com_hash,
+            )
+            for codificacao, ext in CODIFICACOES:
+                if os.path.exists(caminho + ext):
+                    arquivo.variantes[codificacao] = caminho + ext
+            arquivos[settings.STATIC_URL + relativo] = arquivo
+    return arquivos
+
+
+def _aceitas(cabecalho):
+    aceitas = set()
+    for parte in cabecalho.split(','):
+        nome, _, parametros = parte.partition(';')
+        q = parametros.strip().replace(' ', '')
+        try:
+            if q.startswith('q=') and not float(q[2:]):
+                continue  # q=0: recusada
+        except ValueError:
+            continue
+        aceitas.add(nome.strip().lower())
+    return aceitas
+
+
+def responder(request, arquivo):
+    """Resposta do ``arquivo`` na melhor codificação aceita, com os cabeçalhos de cache."""
+    aceitas = _aceitas(request.headers.get('Accept-Encoding', ''))
+    codificacao = next((c for c, _ in CODIFICACOES if c in arquivo.variantes and c in aceitas), None)
+    caminho = arquivo.variantes[codificacao] if codificacao else arquivo.caminho
+    etag = arquivo.etag if not codificacao else f'{arquivo.etag[:-1]}-{codificacao}"'
+
+    if request.headers.get('If-None-Match') == etag:
+        resposta = HttpResponseNotModified()
+    else:
+        with open(caminho, 'rb') as f:
+            conteudo = f.read()
+        resposta = HttpResponse(b'' if request.method == 'HEAD' else conteudo, content_type=arquivo.tipo)
+        resposta['Content-Length'] = len(conteudo)
+        if codificacao:
+            resposta['Content-Encoding'] = codificacao
+    resposta['ETag'] = etag
+    resposta['Cache-Control'] = IMUTAVEL if arquivo.imutavel else REVALIDAR
+    if arquivo.variantes:
+        resposta['Vary'] = 'Accept-Encoding'
+    return resposta
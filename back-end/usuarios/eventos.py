@@ -0,0 +1,124 @@
+"""
+Avisos de mudança em tempo real (``/api/eventos/``, Server-Sent Events).
+
+Toda escrita que avança o seq de um usuário (``sync.avancar_seq``) publica,
+depois do commit, um aviso no broker. As conexões SSE do usuário acordam e
+mandam ``event: mudanca``; a página busca o que mudou no ``/sync/`` (ou
+recarrega a lista) com o último seq que viu. O primeiro evento de cada
+conexão traz o seq atual, então uma reconexão recupera o que passou enquanto
+ela esteve fora.
+
+O aviso não carrega dados, então avisos seguidos para uma conexão se fundem
+num só: uma conexão lenta nunca acumula fila. Uma conexão parada custa um
+``asyncio.Event`` e o gerador da resposta, sem consultar o banco; a cada
+``HEARTBEAT`` segundos ela manda um comentário para manter proxies abertos, e
+depois de ``DURACAO_MAX`` fecha para o navegador reconectar.
+
+O broker padrão (``BrokerLocal``) só alcança as conexões do próprio
+processo. Com vários workers, ``EVENTOS_BROKER`` aponta para uma subclasse
+cujo ``publicar`` manda o aviso para um barramento comum e cujo ouvinte chama
+``entregar`` em cada processo. Servir pelo StonksView.asgi: no WSGI cada
+conexão prenderia uma thread.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+HEARTBEAT = 15
+DURACAO_MAX = 30 * 60
+RECONEXAO_MS = 5000
+MAX_CONEXOES = 5  # por usuário, em cada processo
+
+
+class Assinatura:
+    """Uma conexão esperando avisos de um usuário."""
+
+    __slots__ = ('usuario_id', '_loop', '_evento')
+
+    def __init__(self, usuario_id):
+        self.usuario_id = usuario_id
+        self._loop = asyncio.get_running_loop()
+        self._evento = asyncio.Event()
+
+    def avisar(self):
+        # chamado da thread que fez o commit
+        try:
+            self._loop.call_soon_threadsafe(self._evento.set)
+        except RuntimeError:
+            pass  # loop já encerrado: a conexão acabou
+
+    async def esperar(self, segundos):
+        """``True`` se houve aviso desde a última espera, ``False`` se o tempo acabou."""
+        try:
+            await asyncio.wait_for(self._evento.wait(), segundos)
+        except TimeoutError:
+            return False
+        self._evento.clear()
+        return True
+
+
+class BrokerLocal:
+    def __init__(self):
+        self._assinaturas = defaultdict(set)
+        self._trava = threading.Lock()
+
+    def assinar(self, usuario_id):
+        assinatura = Assinatura(usuario_id)
+        with self._trava:
+            self._assinaturas[usuario_id].add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._trava:
+            assinaturas = self._assinaturas.get(assinatura.usuario_id)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._assinaturas[assinatura.usuario_id]
+
+    def conexoes(self, usuario_id):
+        return len(self._assinaturas.get(usuario_id, ()))
+
+    def entregar(self, usuario_id):
+        """Acorda as conexões do usuário neste processo."""
+        with self._trava:
+            assinaturas = list(self._assinaturas.get(usuario_id, ()))
+        for assinatura in assinaturas:
+            assinatura.avisar()
+
+    def publicar(self, usuario_id):
+        self.entregar(usuario_id)
+
+
+@lru_cache(maxsize=None)
+def broker():
+    return import_string(getattr(settings, 'EVENTOS_BROKER', 'usuarios.eventos.BrokerLocal'))()
+
+
+def publicar(usuario_id):
+    broker().publicar(usuario_id)
+
+
+def _evento(dados):
+    return f"event: mudanca\ndata: {json.dumps(dados)}\n\n"
+
+
+async def fluxo(usuario_id, seq):
+    """Corpo da resposta SSE: o seq atual, depois um evento por rodada de avisos e heartbeats."""
+    assinatura = broker().assinar(usuario_id)
+    try:
+        yield f"retry: {RECONEXAO_MS}\n" + _evento({'seq': seq})
+        loop = asyncio.get_running_loop()
+        fim = loop.time() + DURACAO_MAX
+        while (restante := fim - loop.time()) > 0:
+            if await assinatura.esperar(min(HEARTBEAT, restante)):
+                yield _evento({})
+            else:
+                yield ": ping\n\n"
+    finally:
+        broker().cancelar(assinatura)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from . import metricas
+
+
+class PBKDF2IteracoesHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 com o custo definido em ``settings.PBKDF2_ITERACOES``.
+
+    Usa o mesmo ``algorithm`` do hasher padrão, então os hashes já gravados
+    continuam válidos; quando o número de iterações muda, o Django refaz o
+    hash no próximo login bem-sucedido (``must_update``). O tempo gasto em
+    cada hash entra na métrica ``senha_hash``.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERACOES', PBKDF2PasswordHasher.iterations)
+
+    def encode(self, password, salt, iterations=None):
+        with metricas.cronometrar('senha_hash'):
+            return super().encode(password, salt, iterations)
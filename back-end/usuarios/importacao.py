@@ -0,0 +1,201 @@
+"""
+Importação em lote de extratos (CSV e OFX).
+
+Os arquivos são lidos linha a linha; cada linha é normalizada para
+``(data, descricao, valor, tipo)`` e acumulada num lote que é gravado com um
+único ``bulk_create`` dentro de uma transação. Linhas inválidas viram erros no
+resultado e não interrompem a importação.
+"""
+import csv
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from . import resumo, shards
+from .models import Transacao
+from .sync import proximo_seq
+
+LOTE_PADRAO = 1000
+MAX_ERROS = 100
+
+TIPOS = dict(Transacao.TIPO_CHOICES)
+TIPOS_POR_ROTULO = {rotulo.lower(): tipo for tipo, rotulo in Transacao.TIPO_CHOICES}
+VALOR_MAXIMO = Decimal('100000000')  # max_digits=10, decimal_places=2
+
+# nomes de coluna aceitos no cabeçalho do CSV
+COLUNAS = {
+    'data': 'data', 'date': 'data',
+    'descricao': 'descricao', 'descrição': 'descricao', 'description': 'descricao',
+    'historico': 'descricao', 'histórico': 'descricao', 'memo': 'descricao',
+    'valor': 'valor', 'value': 'valor', 'amount': 'valor',
+    'tipo': 'tipo', 'type': 'tipo', 'categoria': 'tipo',
+}
+FORMATOS_DATA = ('%d/%m/%Y', '%Y%m%d')  # além de AAAA-MM-DD
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.importadas = 0
+        self.total_erros = 0
+        self.erros = []
+        self.seq = None
+
+    def erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < MAX_ERROS:
+            self.erros.append({'linha': linha, 'erro': mensagem})
+
+    def como_dict(self):
+        return {
+            'importadas': self.importadas,
+            'total_erros': self.total_erros,
+            'erros': self.erros,
+            'seq': self.seq,
+        }
+
+
+# =========================
+# LEITORES
+# =========================
+def ler_csv(arquivo):
+    """Gera ``(numero_da_linha, campos)`` de um CSV com cabeçalho (vírgula ou ponto e vírgula)."""
+    cabecalho = arquivo.readline()
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    nomes = [n.strip().lower() for n in next(csv.reader([cabecalho], delimiter=delimitador))]
+    nomes = [COLUNAS.get(n, n) for n in nomes]
+    for numero, valores in enumerate(csv.reader(arquivo, delimiter=delimitador), start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, dict(zip(nomes, valores))
+
+
+_TAG_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def ler_ofx(arquivo):
+    """Gera ``(numero_da_linha, campos)`` para cada ``<STMTTRN>`` de um OFX (SGML ou XML)."""
+    atual, inicio = None, 0
+    for numero, texto in enumerate(arquivo, start=1):
+        for fechamento, tag, valor in _TAG_OFX.findall(texto):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if fechamento:
+                    if atual is not None:
+                        yield inicio, atual
+                    atual = None
+                else:
+                    atual, inicio = {}, numero
+            elif atual is not None and not fechamento:
+                valor = valor.strip()
+                if tag == 'DTPOSTED':
+                    atual['data'] = valor[:8]
+                elif tag == 'TRNAMT':
+                    atual['valor'] = valor
+                elif tag == 'MEMO' or (tag == 'NAME' and 'descricao' not in atual):
+                    atual['descricao'] = valor
+
+
+LEITORES = {'csv': ler_csv, 'ofx': ler_ofx}
+
+
+# =========================
+# NORMALIZAÇÃO
+# =========================
+def _valor(texto):
+    """
+    Aceita ``1.234,56`` e ``1,234.56``: o último de ``,`` e ``.`` separa os
+    centavos e o outro só pode agrupar milhares. ``1,500`` (mil e quinhentos
+    ou um e meio) é recusado.
+    """
+    texto = (texto or '').replace('R$', '').replace(' ', '').strip()
+    decimal = ',' if texto.rfind(',') > texto.rfind('.') else '.'
+    milhar = '.' if decimal == ',' else ','
+    if texto.count(decimal) > 1:
+        # "1.500.000": o único separador é o de milhar
+        decimal, milhar = None, decimal
+    inteiro, centavos = texto.rsplit(decimal, 1) if decimal and decimal in texto else (texto, None)
+    grupos = inteiro.split(milhar)
+    if any(len(grupo) != 3 for grupo in grupos[1:]):
+        raise ValueError(f"Valor inválido: {texto!r}")
+    if decimal == ',' and len(grupos) == 1 and centavos is not None and len(centavos) == 3:
+        raise ValueError(f"Valor ambíguo: {texto!r}")
+    try:
+        valor = Decimal(''.join(grupos) + ('' if centavos is None else '.' + centavos)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {texto!r}")
+    if abs(valor) >= VALOR_MAXIMO:
+        raise ValueError(f"Valor fora do limite: {texto!r}")
+    return valor
+
+
+def _data(texto):
+    texto = (texto or '').strip()
+    try:
+        return date.fromisoformat(texto)  # caminho rápido para AAAA-MM-DD
+    except ValueError:
+        pass
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data inválida: {texto!r}")
+
+
+def normalizar(campos):
+    """Converte os campos lidos em ``(data, descricao, valor, tipo)`` ou levanta ``ValueError``."""
+    data = _data(campos.get('data'))
+    valor = _valor(campos.get('valor'))
+    descricao = (campos.get('descricao') or '').strip()[:255]
+    if not descricao:
+        raise ValueError("Descrição vazia")
+    tipo = (campos.get('tipo') or '').strip()
+    if tipo:
+        tipo = tipo if tipo in TIPOS else TIPOS_POR_ROTULO.get(tipo.lower())
+        if tipo is None:
+            raise ValueError(f"Tipo inválido: {campos['tipo']!r}")
+    else:
+        # sem tipo: o sinal do valor decide (extratos trazem débito negativo)
+        tipo = 'expense' if valor < 0 else 'income'
+    return data, descricao, abs(valor), tipo
+
+
+# =========================
+# GRAVAÇÃO
+# =========================
+def _gravar_lote(usuario, lote):
+    with shards.atomico(usuario):
+        seq = proximo_seq(usuario.id)
+        Transacao.objects.bulk_create(
+            [
+                Transacao(usuario=usuario, data=data, descricao=descricao, valor=valor, tipo=tipo, seq=seq)
+                for data, descricao, valor, tipo in lote
+            ],
+            batch_size=len(lote),
+        )
+        resumo.registrar_lote(usuario.id, ((data, tipo, valor) for data, _, valor, tipo in lote))
+    return seq
+
+
+def importar(usuario, arquivo, formato, lote=LOTE_PADRAO):
+    """Importa um arquivo de texto já aberto. Cada lote é gravado na sua própria transação."""
+    resultado = ResultadoImportacao()
+    pendentes = []
+    for numero, campos in LEITORES[formato](arquivo):
+        try:
+            pendentes.append(normalizar(campos))
+        except ValueError as e:
+            resultado.erro(numero, str(e))
+            continue
+        if len(pendentes) >= lote:
+            resultado.seq = _gravar_lote(usuario, pendentes)
+            resultado.importadas += len(pendentes)
+            pendentes = []
+    if pendentes:
+        resultado.seq = _gravar_lote(usuario, pendentes)
+        resultado.importadas += len(pendentes)
+    return resultado
+
+
+def detectar_formato(nome_arquivo):
+    return 'ofx' if nome_arquivo.lower().endswith('.ofx') else 'csv'
@@ -0,0 +1,183 @@
+"""
+Avisos dos lembretes vencidos (``manage.py lembretes_worker``).
+
+Um lembrete vence às ``LEMBRETES_HORA`` horas (padrão: 8) do dia ``data``.
+O worker não varre a tabela: lê os pendentes em ordem de data pelo índice
+parcial ``lembrete_pendente`` (só ``enviado=False`` e não excluídos), até
+``CARGA`` linhas por banco de cada vez, e guarda os vencimentos num heap.
+Entre um vencimento e outro ele dorme; a cada ``intervalo`` lê só os
+lembretes criados desde a última leitura, por faixa da chave primária.
+
+Os vencidos saem em lotes para o destino (``LEMBRETES_DESTINO``, padrão
+:func:`destino_email`, que põe os avisos na fila de e-mails) e só depois
+são marcados ``enviado``: se o worker cair no meio de um lote, ele é
+reenviado na próxima rodada (pelo menos uma vez). Um destino que falha
+reagenda o lote para ``ESPERA_FALHA`` depois. Roda um worker por vez, e ele
+precisa ser reiniciado depois de um ``rebalancear_shards``.
+"""
+import heapq
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import CustomUser, EmailPendente, Lembrete
+
+logger = logging.getLogger(__name__)
+
+LOTE = 500
+CARGA = 50_000
+ESPERA_FALHA = timedelta(minutes=1)
+
+
+def vencimento(data):
+    return timezone.make_aware(datetime(data.year, data.month, data.day, getattr(settings, 'LEMBRETES_HORA', 8)))
+
+
+def pendentes(alias):
+    return Lembrete.objects.using(alias).filter(enviado=False)
+
+
+def destino_email(lembretes):
+    """Destino padrão: um e-mail na fila (``EmailPendente``) por lembrete, numa inserção só."""
+    EmailPendente.objects.bulk_create([
+        EmailPendente(
+            destinatario=l.usuario.email,
+            assunto=f"Lembrete: {l.nome}",
+            corpo=f"Olá, {l.usuario.first_name}!\n\n{l.nome} ({l.data:%d/%m/%Y})\n{l.descricao}".rstrip() + "\n",
+        )
+        for l in lembretes
+    ])
+
+
+def destino_configurado():
+    return import_string(getattr(settings, 'LEMBRETES_DESTINO', 'usuarios.lembretes.destino_email'))
+
+
+def enviar(alias, ids, destino):
+    """Passa ao ``destino`` os lembretes ``ids`` ainda pendentes e os marca como enviados. Retorna quantos."""
+    lembretes = list(pendentes(alias).filter(id__in=ids).order_by('data', 'id'))
+    usuarios = CustomUser.objects.in_bulk({l.usuario_id for l in lembretes})
+    avisos = []
+    for l in lembretes:
+        # sem usuário (excluído) não há a quem avisar: só marca
+        if l.usuario_id in usuarios:
+            l.usuario = usuarios[l.usuario_id]
+            avisos.append(l)
+    if avisos:
+        destino(avisos)
+    pendentes(alias).filter(id__in=[l.id for l in lembretes]).update(enviado=True)
+    return len(avisos)
+
+
+class Agenda:
+    """
+    Heap ``(vencimento, alias, id)`` dos lembretes pendentes de cada banco.
+
+    Cada banco é lido em páginas de datas inteiras: ``lido_ate[alias]`` é a
+    última data já no heap (``None``: tudo) e a próxima página só é lida
+    quando as entradas daquele banco acabam.
+    """
+
+    def __init__(self, aliases=None, carga=CARGA):
+        self.aliases = aliases or [DEFAULT_DB_ALIAS, *settings.SHARDS_USUARIOS]
+        self.carga = carga
+        self.heap = []
+        self.restantes = Counter()
+        self.lido_ate = {}
+        self.maior_id = {}
+        for alias in self.aliases:
+            self.maior_id[alias] = Lembrete.todos.using(alias).aggregate(maior=Max('id'))['maior'] or 0
+            self._carregar(alias)
+
+    def _empilhar(self, alias, linhas):
+        vencimentos = {data: vencimento(data) for data in {data for data, _ in linhas}}
+        self.heap.extend((vencimentos[data], alias, id) for data, id in linhas)
+        heapq.heapify(self.heap)
+        self.restantes[alias] += len(linhas)
+
+    def _carregar(self, alias):
+        consulta = pendentes(alias)
+        if alias in self.lido_ate:
+            consulta = consulta.filter(data__gt=self.lido_ate[alias])
+        linhas = list(consulta.order_by('data', 'id').values_list('data', 'id')[:self.carga + 1])
+        lido_ate = None
+        if len(linhas) > self.carga:
+            # a última data pode ter vindo pela metade: fica para a próxima página
+            lido_ate = linhas[-1][0]
+            completas = [linha for linha in linhas if linha[0] < lido_ate]
+            if completas:
+                linhas, lido_ate = completas, completas[-1][0]
+            else:
+                linhas = list(consulta.filter(data=lido_ate).order_by('id').values_list('data', 'id'))
+        self.lido_ate[alias] = lido_ate
+        self._empilhar(alias, linhas)
+
+    def revisar(self):
+        """Acrescenta os lembretes criados desde a última leitura (só ids novos, pela chave primária)."""
+        for alias in self.aliases:
+            novos = list(pendentes(alias).filter(id__gt=self.maior_id[alias]).values_list('data', 'id'))
+            if not novos:
+                continue
+            self.maior_id[alias] = max(id for _, id in novos)
+            # depois de lido_ate eles chegam com a página seguinte
+            lido_ate = self.lido_ate[alias]
+            self._empilhar(alias, [(data, id) for data, id in novos if lido_ate is None or data <= lido_ate])
+
+    def reagendar(self, alias, ids, quando):
+        for id in ids:
+            heapq.heappush(self.heap, (quando, alias, id))
+        self.restantes[alias] += len(ids)
+
+    def vencidos(self, agora):
+        """Tira do heap o que venceu até ``agora``: ``{alias: [ids]}``."""
+        por_banco = defaultdict(list)
+        while self.heap and self.heap[0][0] <= agora:
+            _, alias, id = heapq.heappop(self.heap)
+            por_banco[alias].append(id)
+            self.restantes[alias] -= 1
+            if not self.restantes[alias] and self.lido_ate[alias] is not None:
+                self._carregar(alias)
+        return por_banco
+
+    def proximo(self):
+        return self.heap[0][0] if self.heap else None
+
+
+def rodada(agenda, destino, agora=None, lote=LOTE):
+    """Envia em lotes tudo o que venceu até ``agora``. Retorna ``(enviados, falhas)``."""
+    agora = agora or timezone.now()
+    enviados = falhas = 0
+    for alias, ids in agenda.vencidos(agora).items():
+        for inicio in range(0, len(ids), lote):
+            bloco = ids[inicio:inicio + lote]
+            try:
+                enviados += enviar(alias, bloco, destino)
+            except Exception as e:
+                falhas += len(bloco)
+                logger.warning("Falha ao avisar %s lembretes de %s: %s", len(bloco), alias, e)
+                agenda.reagendar(alias, bloco, agora + ESPERA_FALHA)
+    return enviados, falhas
+
+
+def rodar(destino=None, intervalo=60, lote=LOTE, aviso=None, dormir=time.sleep, parar=None):
+    """Laço do worker: envia o que vence, revisa a cada ``intervalo`` segundos e dorme no meio."""
+    destino = destino or destino_configurado()
+    agenda = Agenda()
+    revisao = timezone.now() + timedelta(seconds=intervalo)
+    while not (parar and parar()):
+        agora = timezone.now()
+        if agora >= revisao:
+            agenda.revisar()
+            revisao = agora + timedelta(seconds=intervalo)
+        enviados, falhas = rodada(agenda, destino, agora, lote)
+        if aviso and (enviados or falhas):
+            aviso(enviados, falhas)
+        acordar = min(revisao, agenda.proximo() or revisao)
+        dormir(max((acordar - timezone.now()).total_seconds(), 0))
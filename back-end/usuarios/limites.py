@@ -0,0 +1,113 @@
+"""
+Limite de tentativas (token bucket) para login, cadastro e recuperação de senha.
+
+Cada escopo tem um balde por IP e outro por e-mail: a requisição só passa se
+os dois têm ficha, e é recusada com 429 antes de qualquer hash de senha ou
+consulta de usuário. Os baldes ficam num dict do processo; com
+``LIMITES_AUTENTICACAO_CACHE`` apontando um alias de ``CACHES`` eles passam
+a morar no cache (compartilhado entre processos se o backend for; a leitura
+e a gravação não são atômicas, então o limite vira aproximado).
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from . import metricas
+
+# capacidade = rajada permitida; por_minuto = fichas repostas por minuto
+LIMITES_PADRAO = {
+    'login': {'capacidade': 10, 'por_minuto': 5},
+    'cadastro': {'capacidade': 5, 'por_minuto': 2},
+    'recuperar': {'capacidade': 5, 'por_minuto': 1},
+}
+MAX_BALDES_LOCAIS = 10000
+
+_lock = threading.Lock()
+_baldes = OrderedDict()
+
+
+def _limite(escopo):
+    return {**LIMITES_PADRAO, **getattr(settings, 'LIMITES_AUTENTICACAO', {})}[escopo]
+
+
+def _reabastecer(estado, capacidade, por_segundo, agora):
+    if estado is None:
+        return capacidade
+    fichas, instante = estado
+    return min(capacidade, fichas + (agora - instante) * por_segundo)
+
+
+def _consumir(estados, capacidade, por_segundo, agora):
+    """Retorna ``(novos_estados, espera)``; com espera > 0 nenhum balde é alterado."""
+    fichas = {chave: _reabastecer(estado, capacidade, por_segundo, agora) for chave, estado in estados.items()}
+    falta = max(1 - f for f in fichas.values())
+    if falta > 0:
+        return None, falta / por_segundo
+    return {chave: (f - 1, agora) for chave, f in fichas.items()}, 0
+
+
+def tentar(escopo, chaves):
+    """Consome uma ficha de cada balde de ``chaves``. Retorna 0 ou os segundos até liberar."""
+    limite = _limite(escopo)
+    capacidade, por_segundo = limite['capacidade'], limite['por_minuto'] / 60
+    chaves = [f"limite:{escopo}:{chave}" for chave in chaves]
+    agora = time.time()
+    alias = getattr(settings, 'LIMITES_AUTENTICACAO_CACHE', None)
+
+    if alias:
+        cache = caches[alias]
+        novos, espera = _consumir({c: cache.get(c) for c in chaves}, capacidade, por_segundo, agora)
+        if novos:
+            # some sozinho quando o balde já estaria cheio de novo
+            cache.set_many(novos, timeout=ceil(capacidade / por_segundo))
+        return espera
+
+    with _lock:
+        novos, espera = _consumir({c: _baldes.get(c) for c in chaves}, capacidade, por_segundo, agora)
+        if novos:
+            for chave, estado in novos.items():
+                _baldes[chave] = estado
+                _baldes.move_to_end(chave)
+            while len(_baldes) > MAX_BALDES_LOCAIS:
+                _baldes.popitem(last=False)
+    return espera
+
+
+def limpar():
+    with _lock:
+        _baldes.clear()
+
+
+def _chaves(request):
+    chaves = [f"ip:{request.META.get('REMOTE_ADDR', '')}"]
+    email = (request.POST.get('email') or '').strip().lower()
+    if email:
+        chaves.append(f"email:{email}")
+    return chaves
+
+
+def limitar(escopo):
+    """Aplica o limite do ``escopo`` aos POSTs da view (os GETs só mostram o formulário)."""
+    def decorador(view):
+        @wraps(view)
+        def interna(request, *args, **kwargs):
+            if request.method == 'POST':
+                espera = tentar(escopo, _chaves(request))
+                if espera:
+                    metricas.contar('autenticacao_recusada', escopo=escopo)
+                    segundos = ceil(espera)
+                    resposta = HttpResponse(
+                        f"Muitas tentativas. Tente novamente em {segundos} segundos.",
+                        status=429, content_type='text/plain; charset=utf-8',
+                    )
+                    resposta['Retry-After'] = str(segundos)
+                    return resposta
+            return view(request, *args, **kwargs)
+        return interna
+    return decorador
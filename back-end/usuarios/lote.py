@@ -0,0 +1,177 @@
+"""
+Várias alterações numa requisição só (``/batch/``).
+
+O cliente manda uma lista ordenada de operações sobre transações, metas e
+lembretes. Tudo é validado antes de tocar no banco; depois as operações
+consecutivas do mesmo tipo são agrupadas (um ``bulk_create``, um ``UPDATE``
+de exclusão, um ``UPDATE`` condicional de progresso) e aplicadas numa única
+transação, com um seq novo por grupo.
+"""
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+
+from django.utils.dateparse import parse_date
+
+from . import operacoes, previsao, resumo, shards
+from .models import Lembrete, MetaFinanceira, Transacao
+from .serializacao import lembrete_dict, meta_dict, progresso_dict, transacao_dict
+from .sync import proximo_seq
+
+MAX_OPERACOES = 500
+
+MODELOS = {
+    'transacao': (Transacao, transacao_dict),
+    'meta': (MetaFinanceira, meta_dict),
+    'lembrete': (Lembrete, lembrete_dict),
+}
+OPERACOES = ('criar', 'excluir', 'progresso')
+TIPOS_TRANSACAO = dict(Transacao.TIPO_CHOICES)
+
+
+class ErroOperacao(Exception):
+    def __init__(self, indice, mensagem, status=400):
+        super().__init__(mensagem)
+        self.indice = indice
+        self.status = status
+
+
+# =========================
+# VALIDAÇÃO
+# =========================
+def _texto(dados, campo, obrigatorio=True):
+    valor = dados.get(campo, '')
+    if not isinstance(valor, str) or (obrigatorio and not valor.strip()):
+        raise ValueError(f"Campo '{campo}' inválido")
+    return valor
+
+
+def _data(dados, campo):
+    data = parse_date(str(dados.get(campo) or ''))
+    if data is None:
+        raise ValueError(f"Campo '{campo}' inválido")
+    return data
+
+
+def _decimal(dados, campo):
+    try:
+        return Decimal(str(dados[campo])).quantize(Decimal('0.01'))
+    except (KeyError, InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Campo '{campo}' inválido")
+
+
+def campos_criacao(modelo, dados):
+    if modelo == 'transacao':
+        tipo = dados.get('tipo')
+        if tipo not in TIPOS_TRANSACAO:
+            raise ValueError("Campo 'tipo' inválido")
+        return {
+            'data': _data(dados, 'data'),
+            'descricao': _texto(dados, 'descricao'),
+            'valor': _decimal(dados, 'valor'),
+            'tipo': tipo,
+        }
+    if modelo == 'meta':
+        return {
+            'nome': _texto(dados, 'nome'),
+            'valor': _decimal(dados, 'valor'),
+            'data_inicial': _data(dados, 'data_inicial'),
+            'data_final': _data(dados, 'data_final'),
+        }
+    return {
+        'nome': _texto(dados, 'nome'),
+        'descricao': _texto(dados, 'descricao', obrigatorio=False),
+        'data': _data(dados, 'data'),
+    }
+
+
+def validar(operacoes):
+    """Normaliza a lista recebida. Retorna ``(operacoes, erros)``; com erros nada deve ser aplicado."""
+    if not isinstance(operacoes, list) or not operacoes:
+        raise ValueError("Envie uma lista não vazia em 'operacoes'")
+    if len(operacoes) > MAX_OPERACOES:
+        raise ValueError(f"Máximo de {MAX_OPERACOES} operações por lote")
+
+    normalizadas, erros = [], []
+    for indice, op in enumerate(operacoes):
+        try:
+            if not isinstance(op, dict) or op.get('op') not in OPERACOES:
+                raise ValueError("Operação inválida")
+            modelo = 'meta' if op['op'] == 'progresso' else op.get('modelo')
+            if modelo not in MODELOS:
+                raise ValueError("Modelo inválido")
+            if op['op'] == 'criar':
+                carga = campos_criacao(modelo, op.get('dados') or {})
+            else:
+                if not isinstance(op.get('id'), int):
+                    raise ValueError("Campo 'id' inválido")
+                carga = op['id']
+                if op['op'] == 'progresso':
+                    valor = _decimal(op, 'valor')
+                    if valor <= 0:
+                        raise ValueError("Valor inválido")
+                    carga = (op['id'], valor)
+            normalizadas.append((indice, op['op'], modelo, carga))
+        except ValueError as e:
+            erros.append({'indice': indice, 'status': 'erro', 'error': str(e)})
+    return normalizadas, erros
+
+
+# =========================
+# APLICAÇÃO
+# =========================
+def _criar(usuario, modelo, grupo, seq):
+    classe, serializar = MODELOS[modelo]
+    objetos = classe.objects.bulk_create(
+        [classe(usuario=usuario, seq=seq, **campos) for _, _, _, campos in grupo]
+    )
+    if modelo == 'transacao':
+        resumo.registrar_lote(usuario.id, ((t.data, t.tipo, t.valor) for t in objetos))
+    elif modelo == 'meta':
+        alteradas = previsao.atualizar([usuario.id], seq=seq)
+        for meta in objetos:
+            for campo, valor in alteradas.get(meta.id, {}).items():
+                setattr(meta, campo, valor)
+    return [
+        {'indice': indice, 'status': 'ok', modelo: serializar(obj)}
+        for (indice, *_), obj in zip(grupo, objetos)
+    ]
+
+
+def _excluir(usuario, modelo, grupo, seq):
+    classe, _ = MODELOS[modelo]
+    ids = {id for _, _, _, id in grupo}
+    linhas = classe.objects.filter(usuario=usuario, id__in=ids)
+    encontrados = set(linhas.values_list('id', flat=True))
+    for indice, _, _, id in grupo:
+        if id not in encontrados:
+            raise ErroOperacao(indice, "Não encontrado", status=404)
+    if modelo == 'transacao':
+        resumo.registrar_lote(usuario.id, linhas.values_list('data', 'tipo', 'valor'), sinal=-1)
+    linhas.update(excluido=True, seq=seq)
+    return [{'indice': indice, 'status': 'ok', 'id': id} for indice, _, _, id in grupo]
+
+
+def _progresso(usuario, grupo, seq):
+    progressos = operacoes.somar_progresso(usuario.id, [carga for _, _, _, carga in grupo], seq)
+    resultados = []
+    for (indice, *_), progresso in zip(grupo, progressos):
+        if progresso is None:
+            raise ErroOperacao(indice, "Não encontrado", status=404)
+        resultados.append({'indice': indice, 'status': 'ok', 'nova_meta': progresso_dict(progresso)})
+    return resultados
+
+
+def aplicar(usuario, operacoes):
+    """Aplica operações já validadas. Qualquer ``ErroOperacao`` desfaz o lote inteiro."""
+    resultados, seq = [], None
+    with shards.atomico(usuario):
+        for (op, modelo), grupo in groupby(operacoes, key=lambda o: (o[1], o[2])):
+            grupo = list(grupo)
+            seq = proximo_seq(usuario.id)
+            if op == 'criar':
+                resultados += _criar(usuario, modelo, grupo, seq)
+            elif op == 'excluir':
+                resultados += _excluir(usuario, modelo, grupo, seq)
+            else:
+                resultados += _progresso(usuario, grupo, seq)
+    return resultados, seq
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios import benchmark
+from usuarios.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Mede vazão, latência e consultas de cada rota com um usuário gerado pelo seed_stonks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='seed0@stonks.local', help="Usuário de carga.")
+        parser.add_argument('--concorrencia', type=int, default=4, help="Threads por cenário.")
+        parser.add_argument('--requisicoes', type=int, default=100, help="Requisições por cenário.")
+        parser.add_argument('--aquecimento', type=int, default=5, help="Requisições descartadas antes de medir.")
+        parser.add_argument('--cenario', help="Só os cenários cujo nome contém este texto.")
+        parser.add_argument('--url', help="Servidor já no ar (ex.: http://127.0.0.1:8000); padrão: test client.")
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--saida', help="Grava o relatório JSON neste arquivo.")
+        parser.add_argument('--comparar', help="Relatório anterior para calcular a variação.")
+
+    def handle(self, *args, **options):
+        try:
+            usuario = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"Usuário {options['email']} não existe; rode antes o seed_stonks.")
+
+        relatorio = benchmark.executar(
+            usuario, concorrencia=options['concorrencia'], requisicoes=options['requisicoes'],
+            aquecimento=options['aquecimento'], url=options['url'], filtro=options['cenario'],
+            semente=options['semente'], aviso=lambda msg: self.stderr.write(msg),
+        )
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as f:
+                relatorio['comparacao'] = benchmark.comparar(json.load(f), relatorio)
+
+        texto = json.dumps(relatorio, indent=2, sort_keys=True, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                f.write(texto + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['saida']}."))
+        else:
+            self.stdout.write(texto)
+        if relatorio['rotas_sem_cenario']:
+            self.stderr.write(f"Rotas sem cenário: {', '.join(relatorio['rotas_sem_cenario'])}")
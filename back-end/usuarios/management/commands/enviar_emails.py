@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuarios import emails
+
+
+class Command(BaseCommand):
+    help = "Envia os e-mails da fila (EmailPendente) reusando uma conexão SMTP."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=emails.LOTE_PADRAO)
+        parser.add_argument('--max-lotes', type=int, help="Para depois de N lotes (padrão: até esvaziar).")
+        parser.add_argument('--continuo', action='store_true', help="Não sai quando a fila esvazia.")
+        parser.add_argument('--intervalo', type=float, default=5, help="Espera entre varreduras no modo contínuo.")
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, falhas = emails.drenar(limite=options['lote'], max_lotes=options['max_lotes'])
+            if enviados or falhas or not options['continuo']:
+                self.stdout.write(self.style.SUCCESS(f"{enviados} e-mails enviados, {falhas} falhas."))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios import importacao
+from usuarios.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Importa um extrato CSV ou OFX para as transações de um usuário."
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('arquivo')
+        parser.add_argument('--formato', choices=sorted(importacao.LEITORES))
+        parser.add_argument('--lote', type=int, default=importacao.LOTE_PADRAO)
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"Usuário {options['email']} não encontrado.")
+        formato = options['formato'] or importacao.detectar_formato(options['arquivo'])
+
+        inicio = time.perf_counter()
+        with open(options['arquivo'], encoding=options['encoding'], newline='') as arquivo:
+            resultado = importacao.importar(usuario, arquivo, formato, lote=options['lote'])
+        duracao = time.perf_counter() - inicio
+
+        for erro in resultado.erros:
+            self.stderr.write(f"linha {erro['linha']}: {erro['erro']}")
+        if resultado.total_erros > len(resultado.erros):
+            self.stderr.write(f"... e mais {resultado.total_erros - len(resultado.erros)} erros")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.importadas} transações importadas em {duracao:.1f}s "
+            f"({resultado.total_erros} linhas com erro)."
+        ))
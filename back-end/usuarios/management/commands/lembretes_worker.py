@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from usuarios import lembretes
+
+
+class Command(BaseCommand):
+    help = "Avisa os lembretes vencidos (fila de e-mails ou LEMBRETES_DESTINO), dormindo até o próximo vencimento."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=lembretes.LOTE)
+        parser.add_argument('--intervalo', type=float, default=60,
+                            help="Segundos entre as leituras de lembretes novos.")
+        parser.add_argument('--uma-vez', action='store_true', help="Envia o que já venceu e sai.")
+
+    def handle(self, *args, **options):
+        if options['uma_vez']:
+            enviados, falhas = lembretes.rodada(lembretes.Agenda(), lembretes.destino_configurado(),
+                                                lote=options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"{enviados} lembretes avisados, {falhas} falhas."))
+            return
+        lembretes.rodar(
+            intervalo=options['intervalo'], lote=options['lote'],
+            aviso=lambda enviados, falhas: self.stdout.write(f"{enviados} lembretes avisados, {falhas} falhas."),
+        )
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from usuarios import previsao
+from usuarios.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Recalcula a previsão de conclusão das metas (para rodar toda noite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*', help="Usuários a recalcular (padrão: todos).")
+
+    def handle(self, *args, **options):
+        usuario_ids = None
+        if options['emails']:
+            usuario_ids = list(
+                CustomUser.objects.filter(email__in=options['emails']).values_list('id', flat=True)
+            )
+        inicio = time.monotonic()
+        alteradas = 0
+        # cada banco calcula as metas de quem mora nele
+        for alias in [DEFAULT_DB_ALIAS, *settings.SHARDS_USUARIOS]:
+            alteradas += len(previsao.atualizar(usuario_ids, using=alias))
+        self.stdout.write(self.style.SUCCESS(
+            f"Previsões recalculadas em {time.monotonic() - inicio:.1f}s: {alteradas} metas alteradas."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from usuarios import shards
+from usuarios.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Move os dados de cada usuário para o shard dele segundo SHARDS_USUARIOS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*', help="Usuários a mover (padrão: todos).")
+        parser.add_argument('--simular', action='store_true', help="Só mostra o que seria movido.")
+
+    def handle(self, *args, **options):
+        usuario_ids = None
+        if options['emails']:
+            usuario_ids = list(
+                CustomUser.objects.filter(email__in=options['emails']).values_list('id', flat=True)
+            )
+        aviso = self.stdout.write if options['verbosity'] > 1 else None
+        movimentos = shards.rebalancear(usuario_ids, simular=options['simular'], aviso=aviso)
+        for (origem, destino), quantidade in sorted(movimentos.items()):
+            self.stdout.write(f"{origem} -> {destino}: {quantidade} usuários")
+        verbo = "seriam movidos" if options['simular'] else "movidos"
+        self.stdout.write(self.style.SUCCESS(f"{sum(movimentos.values())} usuários {verbo}."))
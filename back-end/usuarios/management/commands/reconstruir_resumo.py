@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from usuarios import resumo
+from usuarios.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Recalcula a tabela de resumo mensal a partir das transações."
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*', help="Usuários a recalcular (padrão: todos).")
+
+    def handle(self, *args, **options):
+        usuario_ids = None
+        if options['emails']:
+            usuario_ids = list(
+                CustomUser.objects.filter(email__in=options['emails']).values_list('id', flat=True)
+            )
+        linhas = resumo.reconstruir(usuario_ids)
+        self.stdout.write(self.style.SUCCESS(f"Resumo reconstruído: {linhas} linhas."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuarios import sementes
+
+
+class Command(BaseCommand):
+    help = "Gera usuários, transações, metas e lembretes sintéticos para testes de carga."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Usuários a criar.")
+        parser.add_argument('--transacoes', type=int, default=1000, help="Transações por usuário.")
+        parser.add_argument('--metas', type=int, default=5, help="Metas por usuário.")
+        parser.add_argument('--lembretes', type=int, default=10, help="Lembretes por usuário.")
+        parser.add_argument('--meses', type=int, default=12, help="Meses de histórico.")
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--prefixo', default='seed', help="E-mails viram {prefixo}{n}@stonks.local.")
+        parser.add_argument('--senha', default='Senha@123')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        contagem = sementes.semear(
+            options['users'], options['transacoes'], metas=options['metas'], lembretes=options['lembretes'],
+            meses=options['meses'], semente=options['semente'], prefixo=options['prefixo'],
+            senha=options['senha'], aviso=lambda msg: self.stdout.write(msg),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{contagem['usuarios']} usuários, {contagem['transacoes']} transações, {contagem['metas']} metas e "
+            f"{contagem['lembretes']} lembretes criados em {time.perf_counter() - inicio:.1f}s."
+        ))
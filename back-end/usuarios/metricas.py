@@ -0,0 +1,212 @@
+"""
+Contadores, tempos e histogramas acumulados do processo.
+
+Cada métrica tem um nome e rótulos opcionais (``contar('x', escopo='login')``).
+Os valores vivem na memória do processo, protegidos por um lock, e são lidos
+por ``instantaneo()`` (JSON) e ``prometheus()`` (formato texto do Prometheus).
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# limites superiores (segundos) dos baldes de latência
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUANTIS = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_contadores = {}
+_tempos = {}        # (nome, rótulos) -> (quantidade, soma em segundos)
+_histogramas = {}   # (nome, rótulos) -> [contagem por balde (+Inf no fim), soma, total]
+_baldes = {}        # nome -> limites dos baldes
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted(rotulos.items()))
+
+
+def contar(nome, n=1, **rotulos):
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + n
+
+
+def observar(nome, segundos, **rotulos):
+    chave = _chave(nome, rotulos)
+    with _lock:
+        quantidade, soma = _tempos.get(chave, (0, 0.0))
+        _tempos[chave] = (quantidade + 1, soma + segundos)
+
+
+def observar_histograma(nome, valor, baldes=BALDES_LATENCIA, **rotulos):
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _baldes.setdefault(nome, baldes)
+        hist = _histogramas.get(chave)
+        if hist is None:
+            hist = _histogramas[chave] = [[0] * (len(baldes) + 1), 0.0, 0]
+        hist[0][bisect_left(baldes, valor)] += 1
+        hist[1] += valor
+        hist[2] += 1
+
+
+def quantil(baldes, contagens, q):
+    """Estimativa do quantil ``q`` interpolando dentro do balde (como o histogram_quantile)."""
+    total = sum(contagens)
+    if not total:
+        return None
+    alvo, acumulado = q * total, 0
+    for i, n in enumerate(contagens):
+        if n and acumulado + n >= alvo:
+            if i == len(baldes):
+                return baldes[-1]
+            inferior = baldes[i - 1] if i else 0.0
+            return inferior + (baldes[i] - inferior) * (alvo - acumulado) / n
+        acumulado += n
+    return baldes[-1]
+
+
+@contextmanager
+def cronometrar(nome, **rotulos):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **rotulos)
+
+
+def _rotulado(nome, rotulos):
+    if not rotulos:
+        return nome
+    return nome + '{' + ','.join(f'{k}="{v}"' for k, v in rotulos) + '}'
+
+
+def _copiar():
+    with _lock:
+        return (
+            dict(_contadores),
+            dict(_tempos),
+            {chave: (list(contagens), soma, total) for chave, (contagens, soma, total) in _histogramas.items()},
+            dict(_baldes),
+        )
+
+
+def instantaneo():
+    """Contadores, tempos e histogramas (com p50/p95/p99) em dicts, com os rótulos no nome."""
+    contadores, tempos, histogramas, baldes = _copiar()
+    return {
+        'contadores': {_rotulado(*chave): valor for chave, valor in sorted(contadores.items())},
+        'tempos': {
+            _rotulado(*chave): {'quantidade': quantidade, 'soma_s': round(soma, 6)}
+            for chave, (quantidade, soma) in sorted(tempos.items())
+        },
+        'histogramas': {
+            _rotulado(*chave): {
+                'quantidade': total,
+                'soma_s': round(soma, 6),
+                **{f'p{round(q * 100)}': quantil(baldes[chave[0]], contagens, q) for q in QUANTIS},
+            }
+            for chave, (contagens, soma, total) in sorted(histogramas.items())
+        },
+    }
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos_prometheus(rotulos, *extras):
+    pares = list(rotulos) + list(extras)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def _por_nome(series):
+    grupos = {}
+    for (nome, rotulos), valor in sorted(series.items()):
+        grupos.setdefault(nome, []).append((rotulos, valor))
+    return grupos.items()
+
+
+def prometheus(prefixo='stonks_', extras=()):
+    """
+    Exposição no formato texto do Prometheus.
+
+    Contadores saem com sufixo ``_total``, tempos como ``summary`` (``_count``
+    e ``_sum``) e histogramas com os baldes acumulados e um gauge
+    ``_quantil`` com p50/p95/p99 já estimados. ``extras`` recebe trios
+    ``(nome, tipo, valor)`` de valores mantidos fora daqui.
+    """
+    contadores, tempos, histogramas, baldes = _copiar()
+    linhas = []
+    for nome, series in _por_nome(contadores):
+        nome = prefixo + (nome if nome.endswith('_total') else nome + '_total')
+        linhas.append(f'# TYPE {nome} counter')
+        linhas += [f'{nome}{_rotulos_prometheus(r)} {v}' for r, v in series]
+    for nome, series in _por_nome(tempos):
+        nome = prefixo + nome + '_segundos'
+        linhas.append(f'# TYPE {nome} summary')
+        for rotulos, (quantidade, soma) in series:
+            linhas.append(f'{nome}_count{_rotulos_prometheus(rotulos)} {quantidade}')
+            linhas.append(f'{nome}_sum{_rotulos_prometheus(rotulos)} {soma:.6f}')
+    for nome, series in _por_nome(histogramas):
+        limites = baldes[nome]
+        completo = prefixo + nome
+        linhas.append(f'# TYPE {completo} histogram')
+        for rotulos, (contagens, soma, total) in series:
+            acumulado = 0
+            for limite, n in zip((*limites, '+Inf'), contagens):
+                acumulado += n
+                linhas.append(f'{completo}_bucket{_rotulos_prometheus(rotulos, ("le", limite))} {acumulado}')
+            linhas.append(f'{completo}_sum{_rotulos_prometheus(rotulos)} {soma:.6f}')
+            linhas.append(f'{completo}_count{_rotulos_prometheus(rotulos)} {total}')
+        linhas.append(f'# TYPE {completo}_quantil gauge')
+        for rotulos, (contagens, _, _) in series:
+            for q in QUANTIS:
+                valor = quantil(limites, contagens, q)
+                linhas.append(f'{completo}_quantil{_rotulos_prometheus(rotulos, ("quantil", q))} {valor:.6f}')
+    for nome, tipo, valor in extras:
+        linhas.append(f'# TYPE {prefixo}{nome} {tipo}')
+        linhas.append(f'{prefixo}{nome} {valor}')
+    return '\n'.join(linhas) + '\n'
+
+
+def zerar():
+    with _lock:
+        _contadores.clear()
+        _tempos.clear()
+        _histogramas.clear()
+        _baldes.clear()
+
+
+# =========================
+# FASES DA REQUISIÇÃO ATUAL
+# =========================
+# dict de fase -> segundos da requisição instrumentada em andamento (None fora dela)
+_fases = contextvars.ContextVar('metricas_fases', default=None)
+
+
+def iniciar_fases():
+    return _fases.set({})
+
+
+def encerrar_fases(token):
+    fases = _fases.get()
+    _fases.reset(token)
+    return fases
+
+
+@contextmanager
+def fase(nome):
+    """Soma o tempo do bloco à fase ``nome`` da requisição sendo instrumentada, se houver."""
+    fases = _fases.get()
+    if fases is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases[nome] = fases.get(nome, 0.0) + time.perf_counter() - inicio
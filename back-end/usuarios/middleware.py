@@ -0,0 +1,179 @@
+"""
+Instrumentação por requisição.
+
+Para cada requisição amostrada (``INSTRUMENTACAO_AMOSTRAGEM``, de 0 a 1) mede
+o tempo total, as consultas e o tempo de banco (via
+``connection.execute_wrapper``), o tempo de serialização JSON
+(``metricas.fase('serializacao')``) e o tamanho da resposta. Devolve tudo no
+cabeçalho ``Server-Timing`` e acumula por rota em ``metricas``, de onde sai o
+``/metrics``. Requisições fora da amostra passam direto, sem custo extra.
+
+O ``EstaticosMiddleware`` serve os arquivos do ``collectstatic`` antes de
+tudo (usuarios/estaticos.py).
+
+O ``ShardMiddleware`` vincula a requisição ao banco do usuário logado
+(usuarios/shards.py) enquanto ``SHARDS_USUARIOS`` estiver preenchido.
+"""
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import estaticos, metricas, shards
+
+
+class _ContadorConsultas:
+    def __init__(self):
+        self.quantidade = 0
+        self.tempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.quantidade += 1
+            self.tempo += time.perf_counter() - inicio
+
+
+class _Medicao:
+    def __init__(self):
+        self.consultas = _ContadorConsultas()
+        self._pilha = ExitStack()
+
+    def __enter__(self):
+        for alias in connections:
+            self._pilha.enter_context(connections[alias].execute_wrapper(self.consultas))
+        self._token = metricas.iniciar_fases()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.duracao = time.perf_counter() - self.inicio
+        self.fases = metricas.encerrar_fases(self._token)
+        self._pilha.close()
+
+    def registrar(self, request, response):
+        match = request.resolver_match
+        rota = match.route if match else 'nao_encontrada'
+        bytes_ = None if response.streaming else len(response.content)
+
+        metricas.observar_histograma('http_duracao_segundos', self.duracao, rota=rota)
+        metricas.contar('http_requisicoes', rota=rota, metodo=request.method, status=response.status_code)
+        metricas.contar('db_consultas', self.consultas.quantidade, rota=rota)
+        metricas.contar('db_duracao_segundos', self.consultas.tempo, rota=rota)
+        for fase, segundos in self.fases.items():
+            metricas.contar(f'{fase}_duracao_segundos', segundos, rota=rota)
+        if bytes_ is not None:
+            metricas.contar('http_resposta_bytes', bytes_, rota=rota)
+
+        partes = [
+            f'total;dur={self.duracao * 1000:.1f}',
+            f'db;dur={self.consultas.tempo * 1000:.1f};desc="{self.consultas.quantidade} consultas"',
+        ]
+        partes += [f'{fase};dur={segundos * 1000:.1f}' for fase, segundos in self.fases.items()]
+        response['Server-Timing'] = ', '.join(partes)
+        return response
+
+
+class InstrumentacaoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.amostragem = getattr(settings, 'INSTRUMENTACAO_AMOSTRAGEM', 1.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _amostrar(self):
+        return self.amostragem >= 1 or (self.amostragem > 0 and random.random() < self.amostragem)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._amostrar():
+            return self.get_response(request)
+        with _Medicao() as medicao:
+            response = self.get_response(request)
+        return medicao.registrar(request, response)
+
+    async def __acall__(self, request):
+        if not self._amostrar():
+            return await self.get_response(request)
+        with _Medicao() as medicao:
+            response = await self.get_response(request)
+        return medicao.registrar(request, response)
+
+
+class ShardMiddleware:
+    """Depois do ``AuthenticationMiddleware``: consultas da requisição vão para o shard do usuário."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not shards.ativos():
+            return self.get_response(request)
+        usuario = request.user
+        if usuario.is_authenticated:
+            shards.carregar_seq(usuario)
+
+            async def auser():
+                # views assíncronas recebem o mesmo objeto, já com o seq do shard
+                return usuario
+
+            request.auser = auser
+        with shards.requisicao(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not shards.ativos():
+            return await self.get_response(request)
+        # o roteador roda em código síncrono; o usuário precisa estar carregado antes
+        request.user = usuario = await request.auser()
+        if usuario.is_authenticated:
+            await sync_to_async(shards.carregar_seq)(usuario)
+        with shards.requisicao(request):
+            return await self.get_response(request)
+
+
+class EstaticosMiddleware:
+    """Primeiro da lista: arquivos do ``STATIC_ROOT`` saem sem passar por sessão, usuário e medição."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.arquivos = estaticos.indice()
+        if not self.arquivos:
+            # sem collectstatic: quem serve os estáticos é o runserver
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _arquivo(self, request):
+        return self.arquivos.get(request.path) if request.method in ('GET', 'HEAD') else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        arquivo = self._arquivo(request)
+        return estaticos.responder(request, arquivo) if arquivo else self.get_response(request)
+
+    async def __acall__(self, request):
+        arquivo = self._arquivo(request)
+        return estaticos.responder(request, arquivo) if arquivo else await self.get_response(request)
+
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def preencher_resumo(apps, schema_editor):
+    Transacao = apps.get_model('usuarios', 'Transacao')
+    ResumoMensal = apps.get_model('usuarios', 'ResumoMensal')
+    agregado = (
+        Transacao.objects.annotate(mes=TruncMonth('data'))
+        .values('usuario_id', 'mes', 'tipo')
+        .annotate(soma=Sum('valor'), qtd=Count('id'))
+        .order_by()
+    )
+    ResumoMensal.objects.bulk_create(
+        [
+            ResumoMensal(usuario_id=l['usuario_id'], mes=l['mes'], tipo=l['tipo'],
+                         total=l['soma'], quantidade=l['qtd'])
+            for l in agregado.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('tipo', models.CharField(choices=[('income', 'Ganho fixo'), ('investment', 'Ganho extra'), ('expense', 'Gasto fixo'), ('extra', 'Gasto extra'), ('other', 'Outro')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal',
+                'verbose_name_plural': 'Resumos Mensais',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'mes', 'tipo'), name='resumo_usuario_mes_tipo')],
+            },
+        ),
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
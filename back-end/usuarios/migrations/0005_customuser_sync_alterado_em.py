@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0004_sync_seq_exclusao_logica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='sync_alterado_em',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0006_email_pendente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaShard',
+            fields=[
+                ('usuario_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('seq', models.BigIntegerField(default=0)),
+                ('alterado_em', models.DateTimeField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Sequência no shard',
+                'verbose_name_plural': 'Sequências nos shards',
+            },
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='shard',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='lembrete',
+            name='usuario',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='metafinanceira',
+            name='usuario',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='metas', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='resumomensal',
+            name='usuario',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='transacao',
+            name='usuario',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='transacoes', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
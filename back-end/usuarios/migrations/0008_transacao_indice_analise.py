@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0007_shards'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(condition=models.Q(('excluido', False)), fields=['usuario', 'data', 'tipo', 'valor', 'excluido'], name='transacao_usuario_dia_tipo'),
+        ),
+    ]
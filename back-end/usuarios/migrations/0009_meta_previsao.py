@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0008_transacao_indice_analise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metafinanceira',
+            name='no_prazo',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='metafinanceira',
+            name='previsao_conclusao',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:49
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+def marcar_passados(apps, schema_editor):
+    # lembretes que já passaram não viram uma enxurrada de avisos na primeira rodada do worker
+    Lembrete = apps.get_model('usuarios', 'Lembrete')
+    Lembrete.objects.using(schema_editor.connection.alias).filter(data__lt=date.today()).update(enviado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0009_meta_previsao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lembrete',
+            name='enviado',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='lembrete',
+            index=models.Index(condition=models.Q(('enviado', False), ('excluido', False)), fields=['data', 'id'], name='lembrete_pendente'),
+        ),
+        migrations.RunPython(marcar_passados, migrations.RunPython.noop, hints={'model_name': 'lembrete'}),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0010_lembrete_enviado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='metafinanceira',
+            index=models.Index(condition=models.Q(('excluido', False)), fields=['status', 'id'], name='meta_status_id'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(condition=models.Q(('excluido', False)), fields=['data', 'id'], name='transacao_data_id'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(condition=models.Q(('excluido', False)), fields=['tipo', 'data', 'id'], name='transacao_tipo_data_id'),
+        ),
+    ]
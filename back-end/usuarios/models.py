@@ -1,4 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
+from django.utils import timezone
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 
@@ -34,6 +39,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
 
+    # último número de sequência usado nas alterações deste usuário (ver usuarios/sync.py)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
+    sync_alterado_em = models.DateTimeField(null=True, editable=False)
+    # alias do banco com os dados do usuário; vazio = default (ver usuarios/shards.py)
+    shard = models.CharField(max_length=50, blank=True, default='', editable=False)
+
     objects = CustomUserManager()
 
     USERNAME_FIELD = "email"
@@ -47,11 +58,41 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+# ============================================================
+# BASE PARA SINCRONIZAÇÃO (seq + exclusão lógica)
+# ============================================================
+
+class AtivosManager(models.Manager):
+    """Esconde as linhas excluídas, que ficam guardadas só para o /sync/."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(excluido=False)
+
+
+class Sincronizavel(models.Model):
+    """
+    Linha versionada pela sequência do usuário dono. O ``seq`` é preenchido
+    no ``pre_save`` (usuarios/signals.py) e a exclusão só marca ``excluido``.
+    """
+    seq = models.BigIntegerField(default=0, editable=False)
+    excluido = models.BooleanField(default=False, editable=False)
+
+    objects = AtivosManager()
+    todos = models.Manager()
+
+    class Meta:
+        abstract = True
+
+    def excluir(self):
+        self.excluido = True
+        self.save(update_fields=["excluido", "seq"])
+
+
 # ============================================================
 # TRANSAÇÕES
 # ============================================================
 
-class Transacao(models.Model):
+class Transacao(Sincronizavel):
     TIPO_CHOICES = [
         ("income", "Ganho fixo"),
         ("investment", "Ganho extra"),
@@ -60,7 +101,9 @@ class Transacao(models.Model):
         ("other", "Outro"),
     ]
 
-    usuario = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="transacoes")
+    usuario = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="transacoes", db_constraint=False,  # pode estar noutro banco
+    )
     data = models.DateField()
     descricao = models.CharField(max_length=255)
     valor = models.DecimalField(max_digits=10, decimal_places=2)
@@ -69,23 +112,64 @@ class Transacao(models.Model):
     class Meta:
         verbose_name = "Transação"
         verbose_name_plural = "Transações"
+        indexes = [
+            # listagem paginada por (data, id) dentro de cada usuário
+            models.Index(fields=["usuario", "data", "id"], name="transacao_usuario_data_id"),
+            models.Index(fields=["usuario", "seq"], name="transacao_usuario_seq"),
+            # cobre o GROUP BY (data, tipo) da análise (usuarios/analise.py) sem ler a tabela;
+            # o SQLite só usa o índice como cobertura se ``excluido`` também estiver nele
+            models.Index(
+                fields=["usuario", "data", "tipo", "valor", "excluido"],
+                condition=models.Q(excluido=False),
+                name="transacao_usuario_dia_tipo",
+            ),
+            # listagem e filtros do admin (usuarios/admin.py), na ordem (data, id) decrescente
+            models.Index(fields=["data", "id"], condition=models.Q(excluido=False), name="transacao_data_id"),
+            models.Index(fields=["tipo", "data", "id"], condition=models.Q(excluido=False), name="transacao_tipo_data_id"),
+        ]
 
     def __str__(self):
         return f"{self.descricao} - {self.valor}"
 
 
+# ============================================================
+# RESUMO MENSAL (totais por tipo, mantido pelas views)
+# ============================================================
+
+class ResumoMensal(models.Model):
+    usuario = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="resumos", db_constraint=False,  # pode estar noutro banco
+    )
+    mes = models.DateField()                # sempre o primeiro dia do mês
+    tipo = models.CharField(max_length=20, choices=Transacao.TIPO_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Mensal"
+        verbose_name_plural = "Resumos Mensais"
+        constraints = [
+            models.UniqueConstraint(fields=["usuario", "mes", "tipo"], name="resumo_usuario_mes_tipo"),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario} {self.mes:%Y-%m} {self.tipo}: {self.total}"
+
+
 # ============================================================
 # METAS FINANCEIRAS (ajustado para funcionar com as views)
 # ============================================================
 
-class MetaFinanceira(models.Model):
+class MetaFinanceira(Sincronizavel):
     STATUS_CHOICES = [
         ("Pendente", "Pendente"),
         ("Em andamento", "Em andamento"),
         ("Concluída", "Concluída"),
     ]
 
-    usuario = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="metas")
+    usuario = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="metas", db_constraint=False,  # pode estar noutro banco
+    )
 
     nome = models.CharField(max_length=255)
     valor = models.DecimalField(max_digits=10, decimal_places=2)       # valor alvo
@@ -97,9 +181,18 @@ class MetaFinanceira(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pendente")
 
+    # calculados por usuarios/previsao.py (ao criar a meta e no comando prever_metas)
+    previsao_conclusao = models.DateField(null=True, blank=True, editable=False)
+    no_prazo = models.BooleanField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Meta Financeira"
         verbose_name_plural = "Metas Financeiras"
+        indexes = [
+            models.Index(fields=["usuario", "seq"], name="meta_usuario_seq"),
+            # filtro por status do admin, na ordem da listagem (id decrescente)
+            models.Index(fields=["status", "id"], condition=models.Q(excluido=False), name="meta_status_id"),
+        ]
 
     def __str__(self):
         return self.nome
@@ -108,36 +201,111 @@ class MetaFinanceira(models.Model):
     # FUNÇÃO QUE AS VIEWS VÃO USAR DIRETAMENTE
     # ===========================================
     def adicionar_progresso(self, valor):
-        """Adiciona progresso e atualiza status automaticamente."""
-        self.valor_atual += valor
-
-        if self.valor_atual <= 0:
-            self.valor_atual = 0
-
-        if self.valor_atual >= self.valor:
-            self.valor_atual = self.valor
-            self.status = "Concluída"
-        elif self.valor_atual > 0:
-            self.status = "Em andamento"
-        else:
-            self.status = "Pendente"
-
-        self.save()
+        """Adiciona progresso e atualiza status automaticamente (num UPDATE só, sem corrida)."""
+        from .operacoes import adicionar_progresso  # operacoes importa este módulo
+        progresso = adicionar_progresso(self.usuario_id, self.pk, valor)
+        self.valor_atual, self.status, self.seq = progresso['valor_atual'], progresso['status'], progresso['seq']
+
+    @staticmethod
+    def campos_progresso(valor):
+        """
+        Expressões de ``UPDATE`` que somam ``valor`` ao progresso.
+
+        O novo ``valor_atual`` fica entre 0 e o alvo; o status vira
+        "Concluída" ao atingir o alvo, "Em andamento" acima de zero e
+        "Pendente" em zero. Como tudo é calculado pelo banco a partir da
+        linha atual, incrementos simultâneos não se perdem.
+        """
+        if not hasattr(valor, 'resolve_expression'):
+            valor = models.Value(Decimal(valor), output_field=models.DecimalField())
+        novo = Greatest(models.F('valor_atual') + valor, models.Value(Decimal('0')))
+        return {
+            'valor_atual': Least(novo, models.F('valor')),
+            'status': models.Case(
+                models.When(GreaterThanOrEqual(novo, models.F('valor')), then=models.Value("Concluída")),
+                models.When(GreaterThan(novo, 0), then=models.Value("Em andamento")),
+                default=models.Value("Pendente"),
+            ),
+        }
 
 
 # ============================================================
 # LEMBRETES
 # ============================================================
 
-class Lembrete(models.Model):
-    usuario = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="lembretes")
+class Lembrete(Sincronizavel):
+    usuario = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="lembretes", db_constraint=False,  # pode estar noutro banco
+    )
     nome = models.CharField(max_length=255)
     descricao = models.TextField(blank=True)
     data = models.DateField()
+    # marcado pelo lembretes_worker depois que o aviso sai (usuarios/lembretes.py)
+    enviado = models.BooleanField(default=False, editable=False)
 
     class Meta:
         verbose_name = "Lembrete"
         verbose_name_plural = "Lembretes"
+        indexes = [
+            models.Index(fields=["usuario", "seq"], name="lembrete_usuario_seq"),
+            # só os avisos ainda não enviados interessam ao worker, em ordem de data
+            models.Index(
+                fields=["data", "id"],
+                condition=models.Q(enviado=False, excluido=False),
+                name="lembrete_pendente",
+            ),
+        ]
 
     def __str__(self):
         return self.nome
+
+
+# ============================================================
+# SEQUÊNCIA NOS SHARDS
+# ============================================================
+
+class SequenciaShard(models.Model):
+    """
+    ``sync_seq``/``sync_alterado_em`` de quem mora num shard (usuarios/shards.py),
+    no mesmo banco das linhas: a escrita avança o contador na própria transação
+    sem tocar no default. ``CustomUser.sync_seq`` fica só como valor inicial.
+    """
+    usuario_id = models.BigIntegerField(primary_key=True)
+    seq = models.BigIntegerField(default=0)
+    alterado_em = models.DateTimeField(null=True)
+
+    class Meta:
+        verbose_name = "Sequência no shard"
+        verbose_name_plural = "Sequências nos shards"
+
+
+# ============================================================
+# FILA DE E-MAILS (enviados pelo comando enviar_emails)
+# ============================================================
+
+class EmailPendente(models.Model):
+    destinatario = models.EmailField()
+    assunto = models.CharField(max_length=255)
+    corpo = models.TextField()
+    remetente = models.CharField(max_length=255, blank=True)    # vazio: DEFAULT_FROM_EMAIL
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    ultimo_erro = models.TextField(blank=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "E-mail pendente"
+        verbose_name_plural = "E-mails pendentes"
+        indexes = [
+            # só a fila ainda não enviada interessa ao worker
+            models.Index(
+                fields=["proxima_tentativa", "id"],
+                condition=models.Q(enviado_em__isnull=True),
+                name="email_fila",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.destinatario}: {self.assunto}"
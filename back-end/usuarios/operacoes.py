@@ -0,0 +1,102 @@
+"""
+Escritas compartilhadas pelas views síncronas, pela API assíncrona e pelo lote.
+
+Toda escrita abre uma transação no banco do usuário (``shards.atomico``):
+o seq avançado pelo ``pre_save`` e o aviso depois do commit (cache, SSE)
+só valem junto com a linha gravada. Transações mantêm o resumo mensal na
+mesma transação; o progresso das metas é somado pelo banco num ``UPDATE``
+condicional, e criar uma meta recalcula as previsões das metas do usuário.
+"""
+from django.db.models import Case, DecimalField, Value, When
+
+from . import previsao, resumo, shards
+from .models import Lembrete, MetaFinanceira, Transacao
+from .sync import proximo_seq
+
+
+def criar_transacao(usuario, data, descricao, valor, tipo):
+    with shards.atomico(usuario):
+        t = Transacao.objects.create(usuario=usuario, data=data, descricao=descricao, valor=valor, tipo=tipo)
+        resumo.registrar(usuario.id, t.data, t.tipo, t.valor)
+    return t
+
+
+def excluir_transacao(t):
+    with shards.atomico(t.usuario_id):
+        t.excluir()
+        resumo.registrar(t.usuario_id, t.data, t.tipo, -t.valor, -1)
+
+
+def criar_meta(usuario, **campos):
+    with shards.atomico(usuario):
+        meta = MetaFinanceira.objects.create(usuario=usuario, **campos)
+        # a poupança do usuário agora se divide por mais uma meta
+        for campo, valor in previsao.atualizar([usuario.id], seq=meta.seq).get(meta.id, {}).items():
+            setattr(meta, campo, valor)
+    return meta
+
+
+def excluir_meta(meta):
+    with shards.atomico(meta.usuario_id):
+        meta.excluir()
+
+
+def criar_lembrete(usuario, **campos):
+    with shards.atomico(usuario):
+        return Lembrete.objects.create(usuario=usuario, **campos)
+
+
+def excluir_lembrete(lembrete):
+    with shards.atomico(lembrete.usuario_id):
+        lembrete.excluir()
+
+
+def somar_progresso(usuario_id, itens, seq):
+    """
+    Aplica ``[(meta_id, valor), ...]`` com ``UPDATE`` condicional, dentro da transação de quem chama.
+
+    Metas distintas vão num único ``UPDATE`` (o incremento de cada uma sai de
+    um ``CASE`` por id). Uma meta repetida fica para a rodada seguinte, para
+    que o limite entre 0 e o alvo valha a cada incremento, na ordem. Retorna,
+    na ordem de ``itens``, o progresso depois de cada incremento, ou ``None``
+    quando a meta não existe ou não é do usuário.
+    """
+    metas = MetaFinanceira.objects.filter(usuario_id=usuario_id)
+    resultados = [None] * len(itens)
+    pendentes = list(enumerate(itens))
+    while pendentes:
+        rodada, adiadas = {}, []
+        for indice, (meta_id, valor) in pendentes:
+            if meta_id in rodada:
+                adiadas.append((indice, (meta_id, valor)))
+            else:
+                rodada[meta_id] = (indice, valor)
+        if len(rodada) == 1:
+            [(_, valor)] = rodada.values()
+        else:
+            valor = Case(
+                *[When(pk=meta_id, then=Value(v)) for meta_id, (_, v) in rodada.items()],
+                output_field=DecimalField(),
+            )
+        linhas = metas.filter(pk__in=rodada)
+        linhas.update(seq=seq, **MetaFinanceira.campos_progresso(valor))
+        for meta_id, valor_atual, status in linhas.values_list('id', 'valor_atual', 'status'):
+            resultados[rodada[meta_id][0]] = {'id': meta_id, 'valor_atual': valor_atual, 'status': status, 'seq': seq}
+        pendentes = adiadas
+    return resultados
+
+
+def adicionar_progresso(usuario_id, meta_id, valor):
+    """Soma ``valor`` a uma meta do usuário. Levanta ``MetaFinanceira.DoesNotExist`` (e nada é gravado)."""
+    with shards.atomico(usuario_id):
+        [progresso] = somar_progresso(usuario_id, [(meta_id, valor)], proximo_seq(usuario_id))
+        if progresso is None:
+            raise MetaFinanceira.DoesNotExist
+    return progresso
+
+
+def adicionar_progressos(usuario_id, itens):
+    """Variante em lote de ``adicionar_progresso``: ``(resultados, seq)``, com ``None`` nas metas não encontradas."""
+    with shards.atomico(usuario_id):
+        seq = proximo_seq(usuario_id)
+        return somar_progresso(usuario_id, itens, seq), seq
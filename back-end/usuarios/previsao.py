@@ -0,0 +1,134 @@
+"""
+Previsão de conclusão das metas.
+
+A poupança de cada usuário é a média diária de ganhos menos gastos nos
+últimos ``MESES`` meses fechados, lida do ``ResumoMensal`` numa consulta só
+(o histórico é percorrido uma vez por usuário, tenha ele quantas metas
+tiver). Ela é dividida igualmente entre as metas ainda abertas; cada uma
+ganha ``previsao_conclusao`` (hoje + o que falta / poupança diária) e
+``no_prazo`` (previsão até a ``data_final``). Sem poupança positiva não há
+previsão e a meta aberta fica atrasada.
+
+O cálculo é vetorizado em arrays NumPy, para as metas de um usuário (ao
+criar uma meta) ou de todos os usuários de um banco (``manage.py
+prever_metas``, para rodar toda noite). O resultado é gravado na própria
+meta, então a listagem continua sendo só uma leitura.
+"""
+from contextlib import nullcontext
+from datetime import date
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import shards
+from .models import MetaFinanceira, ResumoMensal
+from .resumo import TIPOS_GANHO
+from .sync import proximo_seq
+
+MESES = 6
+# previsões além disso viram "sem previsão" (e atrasadas)
+DIAS_MAX = 365 * 100
+
+
+def _janela(hoje):
+    """Primeiro dia do mês ``MESES`` meses atrás e o primeiro dia do mês atual (exclusivo)."""
+    fim = hoje.replace(day=1)
+    meses = fim.year * 12 + fim.month - 1 - MESES
+    return date(meses // 12, meses % 12 + 1, 1), fim
+
+
+def _poupanca_diaria(usuarios, alias, hoje, filtrar):
+    """Poupança diária média de cada id em ``usuarios`` (ordenado), a partir do resumo mensal."""
+    inicio, fim = _janela(hoje)
+    resumos = ResumoMensal.objects.using(alias).filter(mes__gte=inicio, mes__lt=fim)
+    if filtrar:
+        resumos = resumos.filter(usuario_id__in=usuarios.tolist())
+    linhas = list(resumos.values('usuario_id', 'tipo').annotate(soma=Sum('total')).order_by()
+                  .values_list('usuario_id', 'tipo', 'soma'))
+    ids, tipos, somas = zip(*linhas) if linhas else ((), (), ())
+    ids = np.array(ids, dtype=np.int64)
+    sinais = np.where(np.isin(np.array(tipos, dtype=object), TIPOS_GANHO), 1.0, -1.0)
+    # usuários com resumo mas sem metas ficam de fora do bincount
+    posicao = np.searchsorted(usuarios, ids)
+    conhecidos = (posicao < len(usuarios)) & (usuarios[np.minimum(posicao, len(usuarios) - 1)] == ids)
+    total = np.bincount(
+        posicao[conhecidos], weights=(np.array(somas, dtype=float) * sinais)[conhecidos], minlength=len(usuarios)
+    )
+    return total / (fim - inicio).days
+
+
+def calcular(metas, poupanca_diaria, hoje):
+    """
+    Previsões para ``metas`` = ``(usuario_idx, valor, valor_atual, data_final)`` em arrays.
+
+    ``usuario_idx`` indexa ``poupanca_diaria``. Retorna ``(previsao, no_prazo)``:
+    ``datetime64[D]`` com ``NaT`` onde não há previsão, e booleanos.
+    """
+    usuario_idx, valor, valor_atual, data_final = metas
+    abertas = valor_atual < valor
+    por_meta = poupanca_diaria[usuario_idx] / np.maximum(
+        np.bincount(usuario_idx, weights=abertas, minlength=len(poupanca_diaria)), 1
+    )[usuario_idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias = np.ceil((valor - valor_atual) / por_meta)
+    tem_previsao = abertas & (por_meta > 0) & (dias <= DIAS_MAX)
+    previsao = np.full(len(valor), np.datetime64('NaT'), dtype='datetime64[D]')
+    previsao[tem_previsao] = np.datetime64(hoje, 'D') + dias[tem_previsao].astype(np.int64)
+    no_prazo = ~abertas | (tem_previsao & (previsao <= data_final))
+    return previsao, no_prazo
+
+
+def atualizar(usuario_ids=None, using=None, hoje=None, seq=None):
+    """
+    Recalcula e grava as previsões das metas de ``usuario_ids`` (padrão: todas do banco).
+
+    ``using`` padrão: o banco do usuário vinculado (``shards.atomico``) ou o
+    default. Só metas cuja previsão mudou são gravadas, com seq novo; quem já
+    está numa escrita do usuário passa o ``seq`` dela. Retorna
+    ``{meta_id: campos gravados}``.
+    """
+    alias = using or shards.banco_atual()
+    hoje = hoje or timezone.localdate()
+    metas = MetaFinanceira.objects.using(alias)
+    if usuario_ids is not None:
+        metas = metas.filter(usuario_id__in=usuario_ids)
+    linhas = list(metas.order_by().values_list(
+        'id', 'usuario_id', 'valor', 'valor_atual', 'data_final', 'previsao_conclusao', 'no_prazo',
+    ))
+    if not linhas:
+        return {}
+    ids, donos, valor, valor_atual, data_final, previsao_atual, no_prazo_atual = zip(*linhas)
+    donos = np.array(donos, dtype=np.int64)
+    usuarios, usuario_idx = np.unique(donos, return_inverse=True)
+    previsao, no_prazo = calcular(
+        (usuario_idx, np.array(valor, dtype=float), np.array(valor_atual, dtype=float),
+         np.array(data_final, dtype='datetime64[D]')),
+        _poupanca_diaria(usuarios, alias, hoje, filtrar=usuario_ids is not None),
+        hoje,
+    )
+    antes = np.array(previsao_atual, dtype='datetime64[D]')  # None vira NaT
+    mesma_previsao = (previsao == antes) | (np.isnat(previsao) & np.isnat(antes))
+    mesmo_prazo = (np.array(no_prazo_atual, dtype=object) == no_prazo).astype(bool)  # None nunca é igual
+    alteradas = np.flatnonzero(~(mesma_previsao & mesmo_prazo))
+    alteradas = alteradas[np.argsort(donos[alteradas], kind='stable')]
+
+    gravadas = {}
+    for grupo in np.split(alteradas, np.flatnonzero(np.diff(donos[alteradas])) + 1):
+        if not len(grupo):
+            continue
+        # com ``seq`` a transação de quem chama já cobre a gravação
+        with nullcontext() if seq else transaction.atomic(using=alias):
+            seq_grupo = seq or proximo_seq(int(donos[grupo[0]]), alias)
+            objetos = []
+            for i in grupo.tolist():
+                campos = {
+                    'previsao_conclusao': None if np.isnat(previsao[i]) else previsao[i].item(),
+                    'no_prazo': bool(no_prazo[i]),
+                    'seq': seq_grupo,
+                }
+                objetos.append(MetaFinanceira(id=ids[i], **campos))
+                gravadas[ids[i]] = campos
+            MetaFinanceira.objects.using(alias).bulk_update(objetos, ['previsao_conclusao', 'no_prazo', 'seq'])
+    return gravadas
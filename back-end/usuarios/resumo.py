@@ -0,0 +1,140 @@
+"""
+Resumo financeiro por usuário.
+
+Os totais ficam em ``ResumoMensal`` (uma linha por usuário, mês e tipo),
+atualizados a cada transação criada ou excluída. Assim o dashboard e a API
+de resumo leem O(meses) linhas em vez de somar o histórico inteiro.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import cache_respostas, shards
+from .models import CustomUser, ResumoMensal, SequenciaShard, Transacao
+
+# Tipos que o front-end soma como "Ganhos"; o resto entra em "Gastos".
+TIPOS_GANHO = ("income", "investment")
+
+
+def registrar(usuario_id, data, tipo, valor, quantidade=1):
+    """Soma ``valor`` ao total do mês/tipo. Use valor e quantidade negativos ao excluir."""
+    mes = data.replace(day=1)
+    linhas = ResumoMensal.objects.filter(usuario_id=usuario_id, mes=mes, tipo=tipo)
+    if linhas.update(total=F('total') + valor, quantidade=F('quantidade') + quantidade):
+        return
+    try:
+        with shards.atomico(usuario_id):
+            ResumoMensal.objects.create(
+                usuario_id=usuario_id, mes=mes, tipo=tipo, total=valor, quantidade=quantidade
+            )
+    except IntegrityError:
+        # outro processo criou a linha entre o UPDATE e o INSERT
+        linhas.update(total=F('total') + valor, quantidade=F('quantidade') + quantidade)
+
+
+def registrar_lote(usuario_id, itens, sinal=1):
+    """Agrupa ``(data, tipo, valor)`` por mês/tipo e aplica um UPDATE por grupo."""
+    grupos = {}
+    for data, tipo, valor in itens:
+        chave = (data.replace(day=1), tipo)
+        total, quantidade = grupos.get(chave, (Decimal('0'), 0))
+        grupos[chave] = (total + valor, quantidade + 1)
+    for (mes, tipo), (total, quantidade) in grupos.items():
+        registrar(usuario_id, mes, tipo, sinal * total, sinal * quantidade)
+
+
+def totais_por_tipo(usuario):
+    """Retorna ``{tipo: total}`` somando todos os meses do usuário."""
+    linhas = (
+        ResumoMensal.objects.filter(usuario=usuario)
+        .values('tipo')
+        .annotate(soma=Sum('total'))
+        .values_list('tipo', 'soma')
+    )
+    return {tipo: soma or Decimal('0') for tipo, soma in linhas}
+
+
+def saldo(por_tipo):
+    """``ganhos``, ``gastos`` e ``saldo`` de ``{tipo: total}``, no formato da API."""
+    ganhos = sum((v for t, v in por_tipo.items() if t in TIPOS_GANHO), Decimal('0'))
+    gastos = sum((v for t, v in por_tipo.items() if t not in TIPOS_GANHO), Decimal('0'))
+    return {'ganhos': float(ganhos), 'gastos': float(gastos), 'saldo': float(ganhos - gastos)}
+
+
+def resumo_usuario(usuario):
+    """Totais gerais e a série mensal por tipo, no formato da API."""
+    meses = list(
+        ResumoMensal.objects.filter(usuario=usuario)
+        .order_by('mes', 'tipo')
+        .values_list('mes', 'tipo', 'total', 'quantidade')
+    )
+    por_tipo = {}
+    for _mes, tipo, total, _quantidade in meses:
+        por_tipo[tipo] = por_tipo.get(tipo, Decimal('0')) + total
+    return {
+        **saldo(por_tipo),
+        'por_tipo': {t: float(v) for t, v in por_tipo.items()},
+        'meses': [
+            {'mes': mes.strftime('%Y-%m'), 'tipo': tipo, 'total': float(total), 'quantidade': quantidade}
+            for mes, tipo, total, quantidade in meses
+        ],
+    }
+
+
+def _invalidar_cache(usuario_ids):
+    if usuario_ids is None:
+        cache_respostas.limpar()
+        return
+    for usuario_id in usuario_ids:
+        cache_respostas.invalidar(usuario_id)
+
+
+def reconstruir(usuario_ids=None):
+    """Recalcula o resumo a partir de ``Transacao``, em cada banco. Retorna quantas linhas foram gravadas."""
+    gravadas = 0
+    for alias in [DEFAULT_DB_ALIAS, *settings.SHARDS_USUARIOS]:
+        with transaction.atomic(using=alias):
+            gravadas += _reconstruir_em(alias, usuario_ids)
+    # os totais podem ter mudado: invalida as respostas versionadas desses usuários
+    # (no default; os contadores dos shards andaram em _reconstruir_em)
+    usuarios = CustomUser.objects.all() if usuario_ids is None else CustomUser.objects.filter(pk__in=usuario_ids)
+    with transaction.atomic():
+        usuarios.update(sync_seq=F('sync_seq') + 1, sync_alterado_em=timezone.now())
+        transaction.on_commit(lambda: _invalidar_cache(usuario_ids))
+    return gravadas
+
+
+def _reconstruir_em(alias, usuario_ids):
+    resumos = ResumoMensal.objects.using(alias)
+    transacoes = Transacao.objects.using(alias)
+    if usuario_ids is not None:
+        resumos = resumos.filter(usuario_id__in=usuario_ids)
+        transacoes = transacoes.filter(usuario_id__in=usuario_ids)
+    resumos.delete()
+    agregado = (
+        transacoes.annotate(mes=TruncMonth('data'))
+        .values('usuario_id', 'mes', 'tipo')
+        .annotate(soma=Sum('valor'), qtd=Count('id'))
+        .order_by()
+    )
+    novos = [
+        ResumoMensal(
+            usuario_id=linha['usuario_id'],
+            mes=linha['mes'],
+            tipo=linha['tipo'],
+            total=linha['soma'],
+            quantidade=linha['qtd'],
+        )
+        for linha in agregado.iterator()
+    ]
+    ResumoMensal.objects.using(alias).bulk_create(novos, batch_size=1000)
+    if alias != DEFAULT_DB_ALIAS:
+        contadores = SequenciaShard.objects.using(alias)
+        if usuario_ids is not None:
+            contadores = contadores.filter(usuario_id__in=usuario_ids)
+        contadores.update(seq=F('seq') + 1, alterado_em=timezone.now())
+    return len(novos)
@@ -0,0 +1,134 @@
+"""
+Dados sintéticos para medir a aplicação (``manage.py seed_stonks``).
+
+Gera usuários com um histórico parecido com o real: salário e contas fixas
+todo mês, gastos avulsos com valores log-normais, metas em vários estágios e
+lembretes em volta de hoje. Tudo sai de um ``random.Random(semente)``, então a
+mesma semente gera os mesmos dados. As linhas são gravadas com
+``bulk_create`` em lotes e o resumo mensal é reconstruído no fim.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+
+from . import resumo, shards
+from .models import CustomUser, Lembrete, MetaFinanceira, Transacao
+from .sync import proximo_seq
+
+DOMINIO = 'stonks.local'
+LOTE = 5000
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Larissa',
+         'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vanessa', 'Yuri']
+# (descrição, tipo, mínimo, máximo) lançados uma vez por mês
+FIXAS = [
+    ('Salário', 'income', 2500, 12000),
+    ('Aluguel', 'expense', 900, 3500),
+    ('Energia', 'expense', 80, 350),
+    ('Internet', 'expense', 90, 200),
+    ('Plano de saúde', 'expense', 200, 900),
+]
+# (descrição, tipo, mediana, dispersão) sorteados ao longo do período
+AVULSAS = [
+    ('Mercado', 'extra', 180, 0.6), ('Restaurante', 'extra', 70, 0.7), ('Farmácia', 'extra', 45, 0.8),
+    ('Combustível', 'extra', 200, 0.4), ('Transporte por app', 'extra', 25, 0.6), ('Cinema', 'extra', 40, 0.3),
+    ('Presente', 'extra', 120, 0.8), ('Roupas', 'extra', 150, 0.7), ('Freelance', 'investment', 800, 0.9),
+    ('Dividendos', 'investment', 150, 1.0), ('Cashback', 'other', 20, 0.6),
+]
+METAS = ['Reserva de emergência', 'Viagem', 'Carro novo', 'Notebook', 'Curso', 'Entrada do apartamento',
+         'Casamento', 'Aposentadoria']
+LEMBRETES = ['Pagar fatura do cartão', 'IPVA', 'IPTU', 'Renovar seguro', 'Declarar IR', 'Revisar orçamento',
+             'Consulta médica', 'Renovar assinatura']
+
+
+def _dinheiro(valor):
+    return Decimal(str(round(valor, 2)))
+
+
+def _transacoes(rng, quantidade, meses, hoje):
+    inicio = hoje - timedelta(days=30 * meses)
+    linhas = []
+    for mes in range(meses):
+        base = inicio + timedelta(days=30 * mes)
+        for descricao, tipo, minimo, maximo in FIXAS:
+            if len(linhas) >= quantidade:
+                return linhas
+            valor = rng.uniform(minimo, maximo)
+            linhas.append((base + timedelta(days=rng.randint(0, 4)), descricao, valor, tipo))
+    periodo = (hoje - inicio).days
+    while len(linhas) < quantidade:
+        descricao, tipo, mediana, dispersao = rng.choice(AVULSAS)
+        valor = min(rng.lognormvariate(0, dispersao) * mediana, 99999)
+        linhas.append((inicio + timedelta(days=rng.randrange(periodo)), descricao, valor, tipo))
+    return linhas
+
+
+def _metas(rng, usuario, quantidade, hoje, seq):
+    metas = []
+    for _ in range(quantidade):
+        valor = _dinheiro(rng.uniform(1000, 50000))
+        valor_atual = min(valor, _dinheiro(float(valor) * rng.choice([0, 0.1, 0.35, 0.6, 0.9, 1.0, 1.2])))
+        status = "Concluída" if valor_atual >= valor else "Em andamento" if valor_atual > 0 else "Pendente"
+        inicial = hoje - timedelta(days=rng.randint(0, 365))
+        metas.append(MetaFinanceira(
+            usuario=usuario, nome=rng.choice(METAS), valor=valor, valor_atual=valor_atual, status=status, seq=seq,
+            data_inicial=inicial, data_final=inicial + timedelta(days=rng.randint(90, 1095)),
+        ))
+    return metas
+
+
+def _lembretes(rng, usuario, quantidade, hoje, seq):
+    return [
+        Lembrete(usuario=usuario, nome=rng.choice(LEMBRETES), descricao='',
+                 data=hoje + timedelta(days=rng.randint(-30, 90)), seq=seq)
+        for _ in range(quantidade)
+    ]
+
+
+def semear(usuarios, transacoes, metas=5, lembretes=10, meses=12, semente=42, prefixo='seed',
+           senha='Senha@123', aviso=None):
+    """
+    Cria ``usuarios`` usuários ``{prefixo}{n}@stonks.local`` com ``transacoes`` transações cada.
+
+    Continua a numeração de quem já existe com o mesmo prefixo, então rodar
+    de novo acrescenta usuários em vez de falhar. ``aviso(mensagem)`` recebe o
+    progresso. Retorna as contagens gravadas.
+    """
+    rng = random.Random(semente)
+    hoje = date.today()
+    senha_hash = make_password(senha)  # um hash só: PBKDF2 por usuário dominaria o tempo
+    existentes = CustomUser.objects.filter(email__startswith=prefixo, email__endswith='@' + DOMINIO).count()
+    novos = CustomUser.objects.bulk_create([
+        CustomUser(email=f"{prefixo}{n}@{DOMINIO}", first_name=rng.choice(NOMES), password=senha_hash)
+        for n in range(existentes, existentes + usuarios)
+    ])
+    # o SQLite não devolve os ids do bulk_create em todas as versões
+    novos = list(CustomUser.objects.filter(email__in=[u.email for u in novos]).order_by('id'))
+    if shards.ativos():
+        # o bulk_create não dispara o post_save que escolhe o shard
+        for usuario in novos:
+            usuario.shard = shards.destino(usuario.pk)
+        CustomUser.objects.bulk_update(novos, ['shard'])
+
+    contagem = {'usuarios': len(novos), 'transacoes': 0, 'metas': 0, 'lembretes': 0}
+    for i, usuario in enumerate(novos, start=1):
+        with shards.atomico(usuario):
+            seq = proximo_seq(usuario.id)
+            linhas = _transacoes(rng, transacoes, meses, hoje)
+            for inicio in range(0, len(linhas), LOTE):
+                Transacao.objects.bulk_create([
+                    Transacao(usuario=usuario, data=data, descricao=descricao, valor=_dinheiro(valor),
+                              tipo=tipo, seq=seq)
+                    for data, descricao, valor, tipo in linhas[inicio:inicio + LOTE]
+                ])
+            MetaFinanceira.objects.bulk_create(_metas(rng, usuario, metas, hoje, seq))
+            Lembrete.objects.bulk_create(_lembretes(rng, usuario, lembretes, hoje, seq))
+        contagem['transacoes'] += len(linhas)
+        contagem['metas'] += metas
+        contagem['lembretes'] += lembretes
+        if aviso and (i % 10 == 0 or i == len(novos)):
+            aviso(f"{i}/{len(novos)} usuários")
+    resumo.reconstruir([u.id for u in novos])
+    return contagem
@@ -0,0 +1,120 @@
+"""
+Serialização das respostas JSON de transações, metas e lembretes.
+
+As listagens não instanciam modelos: a consulta usa ``values_list`` com os
+valores já convertidos pelo banco (datas como texto ISO, decimais como
+float, ``porcentagem`` da meta calculada na própria query) e cada tupla vira
+o dict da API direto. Os helpers ``*_dict`` montam o mesmo formato a partir
+de uma instância que acabou de ser gravada.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Case, CharField, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+
+from . import metricas
+from .models import Lembrete, MetaFinanceira, Transacao
+
+
+def _float(campo):
+    return Cast(campo, FloatField())
+
+
+def _iso(campo):
+    # o banco devolve a data já como AAAA-MM-DD, sem passar por datetime.date
+    return Cast(campo, CharField())
+
+
+PORCENTAGEM = Case(
+    When(valor__gt=0, then=Round(_float('valor_atual') * 100 / _float('valor'), 1)),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+COLUNAS_TRANSACAO = ('id', _iso('data'), 'descricao', _float('valor'), 'tipo')
+COLUNAS_META = (
+    'id', 'nome', _float('valor'), _float('valor_atual'), _iso('data_inicial'), _iso('data_final'), 'status',
+    PORCENTAGEM, _iso('previsao_conclusao'), 'no_prazo',
+)
+COLUNAS_LEMBRETE = ('id', 'nome', 'descricao', _iso('data'))
+
+
+# =========================
+# TUPLAS -> DICTS
+# =========================
+def _transacao(linha):
+    id, data, descricao, valor, tipo = linha
+    return {'id': id, 'data': data, 'descricao': descricao, 'valor': valor, 'tipo': tipo}
+
+
+def _meta(linha):
+    id, nome, valor, valor_atual, data_inicial, data_final, status, porcentagem, previsao, no_prazo = linha
+    return {
+        'id': id,
+        'nome': nome,
+        'valor': valor,
+        'valor_atual': valor_atual,
+        'data_inicial': data_inicial,
+        'data_final': data_final,
+        'status': status,
+        'porcentagem': porcentagem,
+        'previsao_conclusao': previsao,
+        'no_prazo': no_prazo,
+    }
+
+
+def _lembrete(linha):
+    id, nome, descricao, data = linha
+    return {'id': id, 'nome': nome, 'descricao': descricao, 'data': data}
+
+
+# nome na API -> (modelo, colunas, conversor); usado também pelo /sync/
+MODELOS = {
+    'transacoes': (Transacao, COLUNAS_TRANSACAO, _transacao),
+    'metas': (MetaFinanceira, COLUNAS_META, _meta),
+    'lembretes': (Lembrete, COLUNAS_LEMBRETE, _lembrete),
+}
+
+
+def listar(nome, queryset):
+    """Lista de dicts de ``queryset`` (já filtrado e ordenado) sem criar instâncias."""
+    _, colunas, converter = MODELOS[nome]
+    # iterator(): as tuplas não ficam guardadas no cache do queryset
+    return [converter(linha) for linha in queryset.values_list(*colunas).iterator(chunk_size=2000)]
+
+
+# values_list com expressões executa a consulta já ao montar o iterador, o que
+# o aiterator() do Django não suporta: a listagem inteira vai para uma thread
+alistar = sync_to_async(listar)
+
+
+# =========================
+# INSTÂNCIAS RECÉM-GRAVADAS
+# =========================
+def transacao_dict(t):
+    return _transacao((t.id, t.data.isoformat(), t.descricao, float(t.valor), t.tipo))
+
+
+def meta_dict(m):
+    porcentagem = round(float(m.valor_atual) * 100 / float(m.valor), 1) if m.valor > 0 else 0.0
+    return _meta((
+        m.id, m.nome, float(m.valor), float(m.valor_atual), m.data_inicial.isoformat(), m.data_final.isoformat(),
+        m.status, porcentagem, m.previsao_conclusao and m.previsao_conclusao.isoformat(), m.no_prazo,
+    ))
+
+
+def lembrete_dict(l):
+    return _lembrete((l.id, l.nome, l.descricao, l.data.isoformat()))
+
+
+def progresso_dict(progresso):
+    """Recebe o dict devolvido por ``operacoes.somar_progresso``."""
+    return {'id': progresso['id'], 'valor_atual': float(progresso['valor_atual']), 'status': progresso['status']}
+
+
+def json_bytes(dados):
+    """Serializa a resposta inteira de uma vez, sem espaços entre separadores."""
+    with metricas.fase('serializacao'):
+        return json.dumps(dados, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
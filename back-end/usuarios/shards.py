@@ -0,0 +1,279 @@
+"""
+Shards dos dados por usuário.
+
+Com ``SHARDS_USUARIOS`` vazio (o padrão) tudo fica no ``default``. Com uma
+lista de aliases (``STONKS_SHARDS_USUARIOS``, que settings também declara em
+``DATABASES``), cada usuário novo ganha um deles em
+``CustomUser.shard`` (escolhido pelo id) e as transações, metas, lembretes e
+o resumo mensal dele passam a morar lá. Usuários, sessões e a fila de
+e-mails continuam no ``default``. Quem tem ``shard`` vazio (criado antes de
+ligar os shards) segue no ``default`` até o ``manage.py rebalancear_shards``,
+que também redistribui os usuários quando a lista muda.
+
+O roteamento é transparente para as views: o ``ShardMiddleware`` guarda a
+requisição num contextvar e o ``RoteadorShards`` manda as consultas desses
+modelos para o banco do usuário dela. O seq de quem mora num shard fica no
+próprio shard (``SequenciaShard``), então uma escrita não grava nada no
+default; o middleware copia o contador para ``request.user`` (``carregar_seq``)
+e ETags, cache de respostas e ``seq`` das listagens seguem funcionando. Fora de uma requisição (comandos,
+workers) use ``with shards.usuario(u):``. Escritas abrem a transação com
+``shards.atomico(u)``; ``transaction.atomic`` sem ``using`` abriria no
+``default``.
+
+Cada shard tem a própria faixa de ids (``preparar``), então um usuário muda
+de shard sem trocar os ids que os clientes já guardaram.
+"""
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+from .models import CustomUser, Lembrete, MetaFinanceira, ResumoMensal, SequenciaShard, Transacao
+
+MODELOS = (Transacao, MetaFinanceira, Lembrete, ResumoMensal, SequenciaShard)
+# ids de cada shard começam em (posição na lista + 1) << FAIXA_BITS; os do default ficam abaixo
+FAIXA_BITS = 40
+_COM_ID_PUBLICO = (Transacao, MetaFinanceira, Lembrete)
+_ROTULOS = {m._meta.label_lower for m in MODELOS}
+
+_requisicao = ContextVar('shards_requisicao', default=None)
+_vinculo = ContextVar('shards_vinculo', default=None)  # (usuario_id, alias)
+
+
+class UsuarioMovido(Exception):
+    """O usuário mudou de shard no meio da escrita; a transação é desfeita e pode ser repetida."""
+
+
+def ativos():
+    return bool(settings.SHARDS_USUARIOS)
+
+
+def destino(usuario_id):
+    """Shard em que o usuário deve morar com a lista atual (``''`` = default)."""
+    lista = settings.SHARDS_USUARIOS
+    return lista[usuario_id % len(lista)] if lista else ''
+
+
+def banco(shard):
+    return shard or DEFAULT_DB_ALIAS
+
+
+# =========================
+# USUÁRIO ATUAL
+# =========================
+class _Vinculo:
+    def __init__(self, var, valor):
+        self.var, self.valor = var, valor
+
+    def __enter__(self):
+        self.token = self.var.set(self.valor)
+
+    def __exit__(self, *exc):
+        self.var.reset(self.token)
+
+
+def requisicao(request):
+    """Vincula a requisição; o usuário só é lido quando um modelo por usuário for consultado."""
+    return _Vinculo(_requisicao, request)
+
+
+def usuario(u):
+    """Roteia para o banco de ``u`` (objeto ou id) as consultas feitas dentro do bloco."""
+    usuario_id = getattr(u, 'pk', u)
+    return _Vinculo(_vinculo, (usuario_id, banco_do_usuario(u)))
+
+
+def _usuario_da_requisicao():
+    u = getattr(_requisicao.get(), 'user', None)
+    return u if u is not None and u.is_authenticated else None
+
+
+def banco_do_usuario(u):
+    """Banco dos dados de ``u`` (objeto ou id); só consulta quando recebe um id de outro usuário."""
+    if isinstance(u, CustomUser):
+        return banco(u.shard)
+    vinculo = _vinculo.get()
+    if vinculo is not None and vinculo[0] == u:
+        return vinculo[1]
+    atual = _usuario_da_requisicao()
+    if atual is not None and atual.pk == u:
+        return banco(atual.shard)
+    if not ativos():
+        return DEFAULT_DB_ALIAS
+    return banco(CustomUser.objects.filter(pk=u).values_list('shard', flat=True).first())
+
+
+def banco_atual():
+    vinculo = _vinculo.get()
+    if vinculo is not None:
+        return vinculo[1]
+    atual = _usuario_da_requisicao()
+    return banco(atual.shard) if atual is not None else DEFAULT_DB_ALIAS
+
+
+class atomico(ContextDecorator):
+    """``transaction.atomic`` no banco de ``u`` (objeto ou id), com o bloco vinculado a ele."""
+
+    def __init__(self, u):
+        self.u = u
+
+    def _recreate_cm(self):
+        # como decorador, cada chamada precisa do próprio Atomic
+        return atomico(self.u)
+
+    def __enter__(self):
+        self._vinculo = usuario(self.u)
+        self._vinculo.__enter__()
+        self._atomic = transaction.atomic(using=_vinculo.get()[1])
+        return self._atomic.__enter__()
+
+    def __exit__(self, *exc):
+        try:
+            return self._atomic.__exit__(*exc)
+        finally:
+            self._vinculo.__exit__(*exc)
+
+
+# =========================
+# ROTEADOR
+# =========================
+class RoteadorShards:
+    def _banco(self, model, **hints):
+        instancia = hints.get('instance')
+        if model._meta.label_lower not in _ROTULOS:
+            if instancia is not None and instancia._meta.label_lower in _ROTULOS:
+                # o dono de uma linha do shard (validação do FK num formulário):
+                # sem isto o Django procuraria o usuário no banco da linha
+                return DEFAULT_DB_ALIAS
+            return None
+        if isinstance(instancia, CustomUser):
+            # a partir do usuário: user.transacoes.all(), Transacao(usuario=user)
+            return banco_do_usuario(instancia)
+        if instancia is not None:
+            return instancia._state.db or banco_do_usuario(instancia.usuario_id)
+        return banco_atual()
+
+    db_for_read = _banco
+    db_for_write = _banco
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # o usuário fica no default e os dados dele no shard
+        if {obj1._meta.label_lower, obj2._meta.label_lower} & _ROTULOS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.SHARDS_USUARIOS:
+            return f'{app_label}.{model_name}' in _ROTULOS
+        if db in settings.SHARDS_ANTIGOS:
+            return False  # só está declarado para o rebalancear_shards esvaziá-lo
+        return None
+
+
+# =========================
+# PREPARAÇÃO E MUDANÇA DE SHARD
+# =========================
+def preparar(alias):
+    """Põe as tabelas com id público do shard na faixa dele (SQLite: ``sqlite_sequence``)."""
+    conexao = connections[alias]
+    if conexao.vendor != 'sqlite' or alias not in settings.SHARDS_USUARIOS:
+        return
+    piso = (settings.SHARDS_USUARIOS.index(alias) + 1) << FAIXA_BITS
+    with conexao.cursor() as cursor:
+        for modelo in _COM_ID_PUBLICO:
+            tabela = modelo._meta.db_table
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s", [piso, tabela, piso])
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+                [tabela, piso, tabela],
+            )
+
+
+def apagar_dados(usuario_id, alias):
+    """Apaga direto no banco, sem sinais: nada aponta para essas linhas e o seq não deve andar."""
+    with connections[alias].cursor() as cursor:
+        for modelo in MODELOS:
+            cursor.execute(f'DELETE FROM {modelo._meta.db_table} WHERE usuario_id = %s', [usuario_id])
+
+
+def _contador(usuario_id, alias):
+    return SequenciaShard.objects.using(alias).filter(usuario_id=usuario_id).values_list('seq', 'alterado_em').first()
+
+
+def versao_em(usuario_id, alias):
+    """``(seq, alterado_em)`` do usuário no banco ``alias``: o contador do shard ou, no default, os do usuário."""
+    if alias != DEFAULT_DB_ALIAS:
+        versao = _contador(usuario_id, alias)
+        if versao is not None:
+            return versao
+    # no default, ou num shard onde ainda não escreveu nada: vale o do usuário
+    return CustomUser.objects.filter(pk=usuario_id).values_list('sync_seq', 'sync_alterado_em').get()
+
+
+def seq_em(usuario_id, alias):
+    return versao_em(usuario_id, alias)[0]
+
+
+def carregar_seq(u):
+    """Põe em ``u.sync_seq``/``u.sync_alterado_em`` os valores do contador no shard dele."""
+    versao = _contador(u.pk, u.shard) if u.shard else None
+    if versao is not None:
+        u.sync_seq, u.sync_alterado_em = versao
+
+
+def mover(u, novo):
+    """
+    Copia os dados de ``u`` para o shard ``novo`` (``''`` = default) e apaga da origem.
+
+    A origem fica travada para escrita durante a cópia; escritas que estavam
+    esperando encontram o usuário fora dali e levantam ``UsuarioMovido``
+    (ver ``sync.avancar_seq``) em vez de gravar no shard antigo.
+    """
+    origem, alvo = banco(u.shard), banco(novo)
+    if origem == alvo:
+        return 0
+    copiadas = 0
+    with transaction.atomic(using=origem):
+        # pega o lock de escrita antes de ler (com transaction_mode IMMEDIATE já veio no BEGIN)
+        SequenciaShard.objects.using(origem).filter(usuario_id=u.pk).update(seq=F('seq'))
+        seq, alterado_em = versao_em(u.pk, origem)
+        with transaction.atomic(using=alvo):
+            apagar_dados(u.pk, alvo)  # sobra de uma mudança interrompida no meio
+            for modelo in (Transacao, MetaFinanceira, Lembrete, ResumoMensal):
+                gerenciador = getattr(modelo, 'todos', modelo.objects)
+                linhas = list(gerenciador.using(origem).filter(usuario_id=u.pk))
+                if modelo is ResumoMensal:
+                    for linha in linhas:
+                        linha.pk = None  # id interno, o shard novo numera
+                modelo.objects.using(alvo).bulk_create(linhas, batch_size=1000)
+                copiadas += len(linhas)
+            if alvo != DEFAULT_DB_ALIAS:
+                SequenciaShard.objects.using(alvo).create(usuario_id=u.pk, seq=seq, alterado_em=alterado_em)
+        CustomUser.objects.filter(pk=u.pk).update(shard=novo, sync_seq=seq, sync_alterado_em=alterado_em)
+        apagar_dados(u.pk, origem)
+    u.shard, u.sync_seq, u.sync_alterado_em = novo, seq, alterado_em
+    return copiadas
+
+
+def rebalancear(usuario_ids=None, simular=False, aviso=None):
+    """Move quem está fora do ``destino``. Retorna ``{(origem, destino): usuários}``."""
+    for alias in settings.SHARDS_USUARIOS:
+        preparar(alias)
+    usuarios = CustomUser.objects.order_by('pk')
+    if usuario_ids is not None:
+        usuarios = usuarios.filter(pk__in=usuario_ids)
+    movimentos = {}
+    for u in usuarios.iterator():
+        novo = destino(u.pk)
+        if u.shard == novo:
+            continue
+        chave = (banco(u.shard), banco(novo))
+        movimentos[chave] = movimentos.get(chave, 0) + 1
+        if not simular:
+            linhas = mover(u, novo)
+            if aviso:
+                aviso(f"{u.email}: {chave[0]} -> {chave[1]} ({linhas} linhas)")
+    return movimentos
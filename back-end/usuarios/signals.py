@@ -0,0 +1,39 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, post_save, pre_delete, pre_save
+
+from . import shards
+from .banco import configurar_sqlite
+from .models import CustomUser, Lembrete, MetaFinanceira, Transacao
+from .sync import proximo_seq
+
+SINCRONIZAVEIS = (Transacao, MetaFinanceira, Lembrete)
+
+
+def numerar_alteracao(sender, instance, using, **kwargs):
+    instance.seq = proximo_seq(instance.usuario_id, using)
+
+
+def escolher_shard(sender, instance, created, **kwargs):
+    if created and shards.ativos():
+        instance.shard = shards.destino(instance.pk)
+        CustomUser.objects.filter(pk=instance.pk).update(shard=instance.shard)
+
+
+def apagar_dados_do_shard(sender, instance, **kwargs):
+    # o CASCADE do Django só enxerga o banco do usuário; os dados no shard saem aqui
+    if instance.shard:
+        shards.apagar_dados(instance.pk, instance.shard)
+
+
+def preparar_shard(sender, using, **kwargs):
+    if sender.name == 'usuarios':
+        shards.preparar(using)
+
+
+for modelo in SINCRONIZAVEIS:
+    pre_save.connect(numerar_alteracao, sender=modelo, dispatch_uid=f'seq_{modelo.__name__}')
+
+post_save.connect(escolher_shard, sender=CustomUser, dispatch_uid='shard_usuario')
+pre_delete.connect(apagar_dados_do_shard, sender=CustomUser, dispatch_uid='shard_apagar')
+post_migrate.connect(preparar_shard, dispatch_uid='shard_preparar')
+connection_created.connect(configurar_sqlite, dispatch_uid='sqlite_pragmas')
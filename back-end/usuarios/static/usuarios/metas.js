@@ -0,0 +1,116 @@
+// Página de metas (usuarios/templates/usuarios/metas.html).
+const container = document.getElementById("container-metas");
+const form = document.getElementById("form-metas");
+
+// ===============================================================
+// CARREGAR METAS
+// ===============================================================
+let seqMetas = 0;
+
+async function carregarMetas() {
+    const resp = await fetch("/metas/listar/");
+    const data = await resp.json();
+
+    seqMetas = data.seq;
+    exibirMetas(data.metas);
+}
+
+// ===============================================================
+// EXIBIR METAS NA TELA
+// ===============================================================
+function exibirMetas(metas) {
+    container.innerHTML = "";
+
+    metas.forEach(meta => {
+        const pct = Math.min((meta.valor_atual / meta.valor) * 100, 100).toFixed(1);
+
+        const div = document.createElement("div");
+        div.classList.add("meta-card");
+
+        div.innerHTML = `
+            <h3>${meta.nome}</h3>
+
+            <p><strong>Valor alvo:</strong> R$ ${meta.valor}</p>
+            <p><strong>Data inicial:</strong> ${meta.data_inicial}</p>
+            <p><strong>Data final:</strong> ${meta.data_final}</p>
+            <p><strong>Progresso:</strong> R$ ${meta.valor_atual}</p>
+
+            <div class="progress-bar-bg">
+                <div class="progress-bar-fill" style="width:${pct}%"></div>
+            </div>
+            <small>${pct}% concluído</small>
+            <p><strong>Previsão:</strong> ${meta.previsao_conclusao ?? "sem previsão"}
+                (${meta.no_prazo ? "no prazo" : "atrasada"})</p>
+
+            <br>
+
+            <button onclick="adicionarValor(${meta.id})" class="btn-editar">Adicionar valor</button>
+            <button onclick="excluirMeta(${meta.id})" class="btn-excluir">Excluir</button>
+        `;
+
+        container.appendChild(div);
+    });
+}
+
+// ===============================================================
+// ADICIONAR NOVA META
+// ===============================================================
+form.addEventListener("submit", async (event) => {
+    event.preventDefault();
+
+    const body = {
+        nome: document.getElementById("meta-nome").value,
+        valor: document.getElementById("meta-valor").value,
+        data_inicial: document.getElementById("meta-data").value,
+        data_final: document.getElementById("meta-final").value
+    };
+
+    await fetch("/metas/adicionar/", {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify(body)
+    });
+
+    form.reset();
+    carregarMetas();
+});
+
+// ===============================================================
+// EXCLUIR META
+// ===============================================================
+async function excluirMeta(id) {
+    await fetch(`/metas/excluir/${id}/`, {
+        method: "DELETE"
+    });
+
+    carregarMetas();
+}
+
+// ===============================================================
+// ADICIONAR PROGRESSO
+// ===============================================================
+async function adicionarValor(id) {
+    const valor = Number(prompt("Valor a adicionar:"));
+
+    if (isNaN(valor) || valor <= 0) return;
+
+    await fetch(`/metas/progresso/${id}/`, {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({valor})
+    });
+
+    carregarMetas();
+}
+
+// ===============================================================
+// INICIAR
+// ===============================================================
+carregarMetas();
+
+// Mudanças feitas em outra aba ou aparelho recarregam a lista
+const eventos = new EventSource("/api/eventos/");
+eventos.addEventListener("mudanca", e => {
+    const { seq } = JSON.parse(e.data);
+    if (seq === undefined || seq > seqMetas) carregarMetas();
+});
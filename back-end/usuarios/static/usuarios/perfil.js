@@ -0,0 +1,231 @@
+// Página do perfil (usuarios/templates/usuarios/perfil.html). As rotas vêm dos
+// atributos data-* da tag <script> e os dados iniciais do json_script "bootstrap".
+const rotas = document.currentScript.dataset;
+
+// -------------------------------
+// CSRF TOKEN - Necessário p/ POST
+// -------------------------------
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== "") {
+    const cookies = document.cookie.split(";");
+    for (let i = 0; i < cookies.length; i++) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === name + "=") {
+        cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+        break;
+      }
+    }
+  }
+  return cookieValue;
+}
+const csrfToken = getCookie("csrftoken");
+
+function headers() {
+  return {
+    "Content-Type": "application/json",
+    "X-CSRFToken": csrfToken,
+    "X-Requested-With": "XMLHttpRequest"
+  };
+}
+
+// ------- TRANSACOES -------
+const formTransacoes = document.getElementById("add-transaction-form");
+const tabelaTransacoes = document.getElementById("tabela-transacoes");
+const botaoCarregarMais = document.getElementById("carregar-mais");
+let proximaPagina = null;
+
+// Busca as transações mais antigas a partir do cursor da última página
+async function carregarMaisTransacoes() {
+  if (!proximaPagina) return;
+  const params = new URLSearchParams({ before: proximaPagina });
+  const r = await fetch(`${rotas.listarTransacoes}?${params}`);
+  exibirPaginaTransacoes(await r.json());
+}
+
+function exibirPaginaTransacoes(data) {
+  data.transacoes.forEach(adicionarLinhaTransacao);
+  proximaPagina = data.proximo;
+  botaoCarregarMais.hidden = !proximaPagina;
+}
+
+botaoCarregarMais.addEventListener("click", carregarMaisTransacoes);
+
+function adicionarLinhaTransacao(t) {
+  tabelaTransacoes.appendChild(criarLinhaTransacao(t));
+}
+
+// Coloca a linha na posição certa (data desc, id desc) sem recarregar a tabela
+function inserirLinhaTransacao(t) {
+  const linha = criarLinhaTransacao(t);
+  for (const atual of tabelaTransacoes.rows) {
+    const id = Number(atual.dataset.id);
+    if (atual.dataset.data < t.data || (atual.dataset.data === t.data && id < t.id)) {
+      tabelaTransacoes.insertBefore(linha, atual);
+      return;
+    }
+  }
+  // mais antiga que tudo que já está na tela: só entra se não há mais páginas
+  if (!proximaPagina) tabelaTransacoes.appendChild(linha);
+}
+
+function removerLinhaTransacao(id) {
+  const linha = tabelaTransacoes.querySelector(`tr[data-id="${id}"]`);
+  if (linha) linha.remove();
+}
+
+function criarLinhaTransacao(t) {
+  const valor = parseFloat(t.valor);
+  const cor = ["income", "investment"].includes(t.tipo) ? "green" : "red";
+  const linha = document.createElement("tr");
+  linha.dataset.id = t.id;
+  linha.dataset.data = t.data;
+  linha.innerHTML = `
+    <td>${t.data}</td>
+    <td>${t.descricao}</td>
+    <td>${traduzirTipo(t.tipo)}</td>
+    <td style="color:${cor};font-weight:bold">
+      R$ ${valor.toFixed(2)}
+    </td>
+    <td><button onclick="excluirTransacao(${t.id})">Excluir</button></td>`;
+  return linha;
+}
+
+async function excluirTransacao(id) {
+  await fetch(rotas.excluirTransacao.replace("0", id), {
+    method: "DELETE",
+    headers: headers()
+  });
+  sincronizar();
+}
+
+formTransacoes.addEventListener("submit", async e => {
+  e.preventDefault();
+  const body = {
+    data: formTransacoes.date.value,
+    descricao: formTransacoes.description.value,
+    valor: formTransacoes.value.value,
+    tipo: formTransacoes.type.value
+  };
+  await fetch(rotas.adicionarTransacao, {
+    method: "POST",
+    headers: headers(),
+    body: JSON.stringify(body)
+  });
+  formTransacoes.reset();
+  sincronizar();
+});
+
+function traduzirTipo(tipo) {
+  const mapa = {
+    income: "Ganho fixo",
+    investment: "Ganho extra",
+    expense: "Gasto fixo",
+    extra: "Gasto extra",
+    other: "Outro"
+  };
+  return mapa[tipo] || tipo;
+}
+
+async function atualizarResumoFinanceiro() {
+  const r = await fetch(rotas.resumoFinanceiro);
+  exibirResumoFinanceiro(await r.json());
+}
+
+function exibirResumoFinanceiro({ ganhos, gastos, saldo }) {
+  document.getElementById("saldo-atual").textContent = `R$ ${saldo.toFixed(2)}`;
+  document.getElementById("total-ganhos").textContent = `R$ ${ganhos.toFixed(2)}`;
+  document.getElementById("total-gastos").textContent = `R$ ${gastos.toFixed(2)}`;
+}
+
+// ------- LEMBRETES -------
+const formLembrete = document.getElementById("form-lembrete");
+const listaLembretes = document.getElementById("lembretes-lista");
+const contadorLembretes = document.getElementById("lembrete-count");
+
+const lembretes = new Map();
+
+function exibirLembretes() {
+  const ordenados = [...lembretes.values()].sort((a, b) => a.data.localeCompare(b.data) || a.id - b.id);
+  contadorLembretes.textContent = `${ordenados.length}/2`;
+  listaLembretes.innerHTML = "";
+  ordenados.forEach(l => {
+    const hoje = new Date().toISOString().split("T")[0];
+    const div = document.createElement("div");
+    div.className = `lembrete-miniatura ${l.data === hoje ? "lembrete-hoje" : ""}`;
+    div.innerHTML = `
+      <div class="lembrete-titulo">${l.nome}</div>
+      <div class="lembrete-data">${l.data}</div>
+      <div class="lembrete-descricao">${l.descricao || ''}</div>
+      <button onclick="excluirLembrete(${l.id})">Excluir</button>`;
+    listaLembretes.appendChild(div);
+  });
+}
+
+formLembrete.addEventListener("submit", async e => {
+  e.preventDefault();
+  const body = {
+    nome: formLembrete.lembrete.value,
+    data: formLembrete["data-lembrete"].value,
+    descricao: formLembrete.descricao.value
+  };
+  await fetch(rotas.adicionarLembrete, {
+    method: "POST",
+    headers: headers(),
+    body: JSON.stringify(body)
+  });
+  formLembrete.reset();
+  sincronizar();
+});
+
+async function excluirLembrete(id) {
+  await fetch(rotas.excluirLembrete.replace("0", id), {
+    method: "DELETE",
+    headers: headers()
+  });
+  sincronizar();
+}
+
+// ------- SINCRONIZAÇÃO -------
+// Aplica só o que mudou desde o último seq visto, sem refazer as listas
+let seqAtual = 0;
+
+async function sincronizar() {
+  const r = await fetch(`${rotas.sincronizar}?since=${seqAtual}`);
+  const mudancas = await r.json();
+
+  mudancas.excluidos.transacoes.forEach(removerLinhaTransacao);
+  mudancas.transacoes.forEach(t => {
+    removerLinhaTransacao(t.id);
+    inserirLinhaTransacao(t);
+  });
+  if (mudancas.transacoes.length || mudancas.excluidos.transacoes.length) {
+    atualizarResumoFinanceiro();
+  }
+
+  mudancas.excluidos.lembretes.forEach(id => lembretes.delete(id));
+  mudancas.lembretes.forEach(l => lembretes.set(l.id, l));
+  if (mudancas.lembretes.length || mudancas.excluidos.lembretes.length) {
+    exibirLembretes();
+  }
+
+  seqAtual = Math.max(seqAtual, mudancas.seq);
+}
+
+// ------- INICIALIZAÇÃO -------
+// A página já vem com os dados: monta tudo sem buscar nada
+document.addEventListener("DOMContentLoaded", () => {
+  const inicial = JSON.parse(document.getElementById("bootstrap").textContent);
+  exibirPaginaTransacoes(inicial);
+  exibirResumoFinanceiro(inicial.resumo);
+  inicial.lembretes.forEach(l => lembretes.set(l.id, l));
+  exibirLembretes();
+  seqAtual = inicial.seq;
+
+  // Outra aba ou aparelho mudou algo: o servidor avisa e a página sincroniza
+  const eventos = new EventSource(rotas.eventos);
+  eventos.addEventListener("mudanca", e => {
+    const { seq } = JSON.parse(e.data);
+    if (seq === undefined || seq > seqAtual) sincronizar();
+  });
+});
@@ -0,0 +1,17 @@
+// Mostrar/ocultar senha (usuarios/templates/usuarios/reset_password_form.html).
+const campos = [
+  { input: 'novaSenha', icon: 'toggleNovaSenha' },
+  { input: 'confirmarSenha', icon: 'toggleConfirmarSenha' }
+];
+
+campos.forEach(campo => {
+  const input = document.getElementById(campo.input);
+  const icone = document.getElementById(campo.icon);
+
+  icone.addEventListener('click', () => {
+    const isPassword = input.type === 'password';
+    input.type = isPassword ? 'text' : 'password';
+    icone.classList.toggle('fa-eye');
+    icone.classList.toggle('fa-eye-slash');
+  });
+});
@@ -0,0 +1,94 @@
+"""
+Sequência de alterações por usuário.
+
+Cada gravação em ``Transacao``, ``MetaFinanceira`` ou ``Lembrete`` recebe o
+próximo número de ``CustomUser.sync_seq``; exclusões viram tombstones
+(``excluido=True``) com seq novo. O cliente guarda o último seq que viu e
+pede ao ``/sync/`` só o que mudou depois dele. Depois do commit o avanço é
+avisado às conexões SSE do usuário (usuarios/eventos.py).
+
+Para quem mora num shard (usuarios/shards.py) o contador é a
+``SequenciaShard`` do próprio shard, que avança na transação da escrita sem
+gravar nada no default; o ``ShardMiddleware`` o copia para ``request.user``.
+"""
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache_respostas, eventos, shards
+from .models import CustomUser, SequenciaShard
+from .serializacao import MODELOS
+
+
+def avancar_seq(usuario_id, using=None):
+    """Marca que os dados do usuário mudaram (invalida ETags) sem ler o novo valor."""
+    alias = using or shards.banco_do_usuario(usuario_id)
+    if alias == DEFAULT_DB_ALIAS:
+        usuario = CustomUser.objects.filter(pk=usuario_id)
+        if shards.ativos():
+            # quem foi movido para um shard no meio da escrita não grava mais aqui
+            usuario = usuario.filter(shard='')
+        if not usuario.update(sync_seq=F('sync_seq') + 1, sync_alterado_em=timezone.now()) and shards.ativos():
+            raise shards.UsuarioMovido(usuario_id)
+        # views, lotes, importação, o pre_save e as exclusões do admin passam todos por aqui
+        transaction.on_commit(lambda: _confirmado(usuario_id), using=alias)
+        return
+    agora = timezone.now()
+    contador = SequenciaShard.objects.using(alias).filter(usuario_id=usuario_id)
+    if not contador.update(seq=F('seq') + 1, alterado_em=agora):
+        _criar_contador(usuario_id, alias, agora)
+    transaction.on_commit(lambda: _confirmado(usuario_id), using=alias)
+
+
+def _confirmado(usuario_id):
+    cache_respostas.invalidar(usuario_id)
+    eventos.publicar(usuario_id)
+
+
+def _criar_contador(usuario_id, alias, agora):
+    # primeira escrita no shard: o contador continua de onde o usuário estava;
+    # sem contador aqui também é o sinal de que o usuário acabou de ser movido
+    shard, inicial = CustomUser.objects.filter(pk=usuario_id).values_list('shard', 'sync_seq').get()
+    if shards.banco(shard) != alias:
+        raise shards.UsuarioMovido(usuario_id)
+    try:
+        with transaction.atomic(using=alias):
+            SequenciaShard.objects.using(alias).create(usuario_id=usuario_id, seq=inicial + 1, alterado_em=agora)
+    except IntegrityError:
+        # outra escrita criou o contador entre o UPDATE e o INSERT
+        SequenciaShard.objects.using(alias).filter(usuario_id=usuario_id).update(seq=F('seq') + 1, alterado_em=agora)
+
+
+def proximo_seq(usuario_id, using=None):
+    """Incrementa e retorna a sequência do usuário (chamar dentro da transação da escrita)."""
+    alias = using or shards.banco_do_usuario(usuario_id)
+    avancar_seq(usuario_id, alias)
+    return seq_atual(usuario_id, alias)
+
+
+def seq_atual(usuario_id, using=None):
+    return shards.seq_em(usuario_id, using or shards.banco_do_usuario(usuario_id))
+
+
+def mudancas_desde(usuario_id, since):
+    """Linhas criadas/alteradas e ids excluídos com ``seq > since``."""
+    alias = shards.banco_do_usuario(usuario_id)
+    # lê o seq antes das linhas: o que for gravado no meio reaparece na próxima
+    # chamada (reaplicar é idempotente no cliente), mas nada se perde
+    atual = seq_atual(usuario_id, alias)
+    resposta = {'seq': atual, 'excluidos': {}}
+    for nome, (modelo, colunas, converter) in MODELOS.items():
+        linhas = (
+            modelo.todos.using(alias).filter(usuario_id=usuario_id, seq__gt=since)
+            .order_by('seq')
+            .values_list(*colunas, 'excluido', 'seq')
+        )
+        resposta[nome] = []
+        resposta['excluidos'][nome] = []
+        for *campos, excluido, seq in linhas:
+            if excluido:
+                resposta['excluidos'][nome].append(campos[0])
+            else:
+                resposta[nome].append(converter(campos))
+            resposta['seq'] = max(resposta['seq'], seq)
+    return resposta
@@ -1,3 +1,1475 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import tempfile
+import threading
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    admin as admin_usuarios, banco, benchmark, cache_respostas, emails, estaticos, eventos, importacao, lembretes,
+    limites, metricas, operacoes, previsao, resumo, sementes, serializacao, shards, sync,
+)
+from .middleware import EstaticosMiddleware
+from .models import CustomUser, EmailPendente, Lembrete, MetaFinanceira, ResumoMensal, SequenciaShard, Transacao
+
+
+@override_settings(PBKDF2_ITERACOES=1000)
+class BaseUsuarioTestCase(TestCase):
+    def setUp(self):
+        caches[cache_respostas.ALIAS].clear()
+        limites.limpar()
+        self.user = CustomUser.objects.create_user(
+            email="ana@example.com", password="Senha@123", first_name="Ana"
+        )
+        self.client.force_login(self.user)
+
+    def post_json(self, nome, body, *args):
+        return self.client.post(reverse(nome, args=args), json.dumps(body), content_type="application/json")
+
+
+class ResumoMensalTests(BaseUsuarioTestCase):
+    def test_adicionar_e_excluir_atualizam_resumo(self):
+        r = self.post_json('adicionar_transacao', {
+            'data': '2025-03-10', 'descricao': 'Salário', 'valor': '1000.50', 'tipo': 'income'
+        })
+        self.assertEqual(r.status_code, 200)
+        self.post_json('adicionar_transacao', {
+            'data': '2025-03-20', 'descricao': 'Mercado', 'valor': 200, 'tipo': 'extra'
+        })
+        linha = ResumoMensal.objects.get(usuario=self.user, tipo='income')
+        self.assertEqual(linha.mes, date(2025, 3, 1))
+        self.assertEqual(linha.total, Decimal('1000.50'))
+
+        dados = self.client.get(reverse('resumo_financeiro')).json()
+        self.assertEqual(dados['ganhos'], 1000.5)
+        self.assertEqual(dados['gastos'], 200)
+        self.assertEqual(dados['saldo'], 800.5)
+
+        t = Transacao.objects.get(tipo='extra')
+        self.client.delete(reverse('excluir_transacao', args=[t.id]))
+        linha = ResumoMensal.objects.get(usuario=self.user, tipo='extra')
+        self.assertEqual((linha.total, linha.quantidade), (Decimal('0'), 0))
+
+    def test_reconstruir_bate_com_transacoes(self):
+        for dia, valor, tipo in [(1, '10', 'income'), (2, '5', 'income'), (40, '3', 'expense')]:
+            Transacao.objects.create(
+                usuario=self.user, data=date.fromordinal(date(2025, 1, 1).toordinal() + dia),
+                descricao='x', valor=Decimal(valor), tipo=tipo,
+            )
+        self.assertEqual(resumo.reconstruir(), 2)
+        self.assertEqual(resumo.totais_por_tipo(self.user), {
+            'income': Decimal('15'), 'expense': Decimal('3'),
+        })
+
+
+class AnaliseTests(BaseUsuarioTestCase):
+    def lancar(self, *itens):
+        for dia, valor, tipo in itens:
+            operacoes.criar_transacao(self.user, dia, 'x', Decimal(valor), tipo)
+
+    def test_series_batem_com_calculo_direto(self):
+        self.lancar(
+            (date(2025, 1, 20), '1000', 'income'),      # mês fechado antes do período
+            (date(2025, 3, 2), '50', 'expense'),        # mês inicial, antes do primeiro dia
+            (date(2025, 3, 10), '200', 'investment'),
+            (date(2025, 3, 10), '30.50', 'extra'),
+            (date(2025, 4, 1), '80', 'other'),
+            (date(2025, 4, 30), '10', 'expense'),
+            (date(2025, 5, 1), '999', 'income'),        # depois do período
+        )
+        r = self.client.get(reverse('analise_financeira'), {'date_from': '2025-03-05', 'date_to': '2025-04-30'})
+        dados = r.json()
+        self.assertEqual(len(dados['dias']), 57)
+        self.assertEqual((dados['dias'][0], dados['dias'][-1]), ('2025-03-05', '2025-04-30'))
+        # saldo antes do período: 1000 - 50
+        saldo = {d: 950 for d in dados['dias']}
+        for i, dia in enumerate(dados['dias']):
+            saldo[dia] = (saldo[dados['dias'][i - 1]] if i else 950) + {
+                '2025-03-10': 200 - 30.5, '2025-04-01': -80, '2025-04-30': -10,
+            }.get(dia, 0)
+        self.assertEqual(dados['saldo'], [round(saldo[d], 2) for d in dados['dias']])
+        serie = dados['saldo']
+        self.assertEqual(dados['media_movel']['30'][-1], round(sum(serie[-30:]) / 30, 2))
+        self.assertEqual(dados['media_movel']['90'][-1], round(sum(serie) / len(serie), 2))  # janela incompleta
+        self.assertEqual(dados['meses'], ['2025-03', '2025-04'])
+        self.assertEqual(dados['por_tipo']['investment'], [200, 0])
+        self.assertEqual(dados['por_tipo']['other'], [0, 80])
+        self.assertEqual(dados['ganhos'], [200, 0])
+        self.assertEqual(dados['gastos'], [30.5, 90])
+
+    def test_periodo_sem_transacoes_e_periodo_invalido(self):
+        dados = self.client.get(reverse('analise_financeira')).json()
+        self.assertEqual(len(dados['dias']), 365)
+        self.assertEqual(set(dados['saldo']), {0})
+        for params in ({'date_from': 'ontem'}, {'date_from': '2025-02-01', 'date_to': '2025-01-01'},
+                       {'date_from': '2000-01-01', 'date_to': '2025-01-01'}):
+            self.assertEqual(self.client.get(reverse('analise_financeira'), params).status_code, 400, params)
+
+    def test_cache_por_periodo(self):
+        self.lancar((date(2025, 3, 10), '10', 'income'))
+        periodos = [{'date_from': '2025-03-01', 'date_to': '2025-03-31'}, {'date_from': '2025-01-01'}]
+        primeiras = [self.client.get(reverse('analise_financeira'), p).content for p in periodos]
+        for periodo, corpo in zip(periodos, primeiras):
+            with self.assertNumQueries(2):  # sessão e usuário
+                self.assertEqual(self.client.get(reverse('analise_financeira'), periodo).content, corpo)
+        self.lancar((date(2025, 3, 11), '5', 'income'))
+        self.assertEqual(self.client.get(reverse('analise_financeira'), periodos[0]).json()['saldo'][-1], 15)
+
+    def test_periodo_padrao_revalida_no_dia_seguinte(self):
+        url = reverse('analise_financeira')
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2025, 3, 10)):
+            r = self.client.get(url)
+            self.assertNotIn('Last-Modified', r)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=r['ETag']).status_code, 304)
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2025, 3, 11)):
+            r = self.client.get(url, HTTP_IF_NONE_MATCH=r['ETag'])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['dias'][-1], '2025-03-11')
+        # com date_to o período não depende do dia: vale o Last-Modified
+        self.lancar((date(2025, 3, 10), '10', 'income'))
+        self.assertIn('Last-Modified', self.client.get(url, {'date_to': '2025-03-31'}))
+
+    def test_agrupamento_le_so_o_indice(self):
+        consulta = Transacao.objects.filter(usuario=self.user, data__gte=date(2025, 1, 1)).values('data', 'tipo')
+        sql, params = consulta.annotate(soma=Sum('valor')).order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plano = ' '.join(linha[-1] for linha in cursor.fetchall())
+        self.assertIn('COVERING INDEX transacao_usuario_dia_tipo', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+
+
+class PrevisaoMetasTests(BaseUsuarioTestCase):
+    hoje = date(2025, 7, 15)  # janela: 2025-01-01 a 2025-06-30, 181 dias
+
+    def meta(self, usuario, valor, valor_atual, data_final):
+        return MetaFinanceira.objects.create(
+            usuario=usuario, nome='m', valor=Decimal(valor), valor_atual=Decimal(valor_atual),
+            data_inicial=date(2025, 1, 1), data_final=data_final,
+        )
+
+    def test_poupanca_dividida_entre_metas_abertas(self):
+        operacoes.criar_transacao(self.user, date(2025, 2, 10), 'Salário', Decimal('2000'), 'income')
+        operacoes.criar_transacao(self.user, date(2025, 3, 10), 'Mercado', Decimal('190'), 'extra')
+        operacoes.criar_transacao(self.user, date(2025, 7, 1), 'Fora da janela', Decimal('5000'), 'income')
+        folgada = self.meta(self.user, '100', '0', date(2025, 12, 31))
+        apertada = self.meta(self.user, '300', '100', date(2025, 8, 1))
+        concluida = self.meta(self.user, '50', '50', date(2025, 1, 31))
+        previsao.atualizar([self.user.id], hoje=self.hoje)
+        # (2000 - 190) / 181 = 10 por dia, 5 para cada meta aberta
+        esperado = {
+            folgada.id: (date(2025, 8, 4), True),     # 100 / 5 = 20 dias
+            apertada.id: (date(2025, 8, 24), False),  # 200 / 5 = 40 dias, depois da data final
+            concluida.id: (None, True),
+        }
+        for meta in MetaFinanceira.objects.filter(usuario=self.user):
+            self.assertEqual((meta.previsao_conclusao, meta.no_prazo), esperado[meta.id])
+
+    def test_sem_poupanca_nao_ha_previsao(self):
+        operacoes.criar_transacao(self.user, date(2025, 2, 10), 'Aluguel', Decimal('900'), 'expense')
+        meta = self.meta(self.user, '100', '0', date(2030, 1, 1))
+        previsao.atualizar([self.user.id], hoje=self.hoje)
+        meta.refresh_from_db()
+        self.assertEqual((meta.previsao_conclusao, meta.no_prazo), (None, False))
+
+    def test_so_grava_o_que_mudou_com_seq_novo(self):
+        operacoes.criar_transacao(self.user, date(2025, 2, 10), 'Salário', Decimal('1810'), 'income')
+        meta = self.meta(self.user, '100', '0', date(2025, 12, 31))
+        self.assertEqual(list(previsao.atualizar([self.user.id], hoje=self.hoje)), [meta.id])
+        meta.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(meta.seq, self.user.sync_seq)
+        self.assertEqual(previsao.atualizar([self.user.id], hoje=self.hoje), {})
+
+    def test_comando_recalcula_todos_com_uma_leitura_do_resumo(self):
+        outros = [CustomUser.objects.create_user(email=f"u{n}@example.com", password="x", first_name="U") for n in range(3)]
+        for usuario in [self.user, *outros]:
+            operacoes.criar_transacao(usuario, date.today() - timedelta(days=60), 'x', Decimal('3000'), 'income')
+            self.meta(usuario, '1000', '0', date.today() + timedelta(days=3650))
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('prever_metas', stdout=io.StringIO())
+        self.assertEqual(sum('usuarios_resumomensal' in q['sql'] for q in consultas.captured_queries), 1)
+        self.assertFalse(MetaFinanceira.objects.filter(previsao_conclusao__isnull=True).exists())
+        saida = io.StringIO()
+        call_command('prever_metas', stdout=saida)
+        self.assertIn('0 metas alteradas', saida.getvalue())
+
+    def test_criar_meta_devolve_e_lista_a_previsao(self):
+        operacoes.criar_transacao(self.user, date.today() - timedelta(days=60), 'x', Decimal('3000'), 'income')
+        r = self.post_json('adicionar_meta', {'nome': 'Viagem', 'valor': 100, 'data_inicial': '2025-01-01',
+                                              'data_final': (date.today() + timedelta(days=365)).isoformat()})
+        criada = r.json()['meta']
+        self.assertIsNotNone(criada['previsao_conclusao'])
+        self.assertIs(criada['no_prazo'], True)
+        listada = self.client.get(reverse('listar_metas_json')).json()['metas'][0]
+        self.assertEqual(listada['previsao_conclusao'], criada['previsao_conclusao'])
+
+
+class ListarTransacoesTests(BaseUsuarioTestCase):
+    def setUp(self):
+        super().setUp()
+        # duas transações por dia para exercitar o desempate por id
+        for dia in range(1, 6):
+            for tipo in ('income', 'expense'):
+                Transacao.objects.create(
+                    usuario=self.user, data=date(2025, 1, dia), descricao=f'{tipo} {dia}',
+                    valor=Decimal('1'), tipo=tipo,
+                )
+
+    def test_paginas_por_cursor_cobrem_tudo_sem_repetir(self):
+        vistos, cursor = [], None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['before'] = cursor
+            dados = self.client.get(reverse('listar_transacoes'), params).json()
+            vistos += [(t['data'], t['id']) for t in dados['transacoes']]
+            cursor = dados['proximo']
+            if not cursor:
+                break
+        self.assertEqual(len(vistos), 10)
+        self.assertEqual(vistos, sorted(vistos, reverse=True))
+
+    def test_filtros_de_data_e_tipo(self):
+        dados = self.client.get(reverse('listar_transacoes'), {
+            'date_from': '2025-01-02', 'date_to': '2025-01-03', 'tipo': 'income',
+        }).json()
+        self.assertEqual([t['data'] for t in dados['transacoes']], ['2025-01-03', '2025-01-02'])
+        self.assertIsNone(dados['proximo'])
+
+    def test_cursor_invalido(self):
+        r = self.client.get(reverse('listar_transacoes'), {'before': 'ontem'})
+        self.assertEqual(r.status_code, 400)
+
+
+class SincronizacaoTests(BaseUsuarioTestCase):
+    def test_sync_devolve_so_o_que_mudou(self):
+        r = self.post_json('adicionar_transacao', {
+            'data': '2025-05-01', 'descricao': 'Aluguel', 'valor': 900, 'tipo': 'expense'
+        }).json()
+        seq_inicial = r['seq']
+        self.assertEqual(self.client.get(reverse('listar_transacoes')).json()['seq'], seq_inicial)
+
+        lembrete = self.post_json('adicionar_lembrete', {'nome': 'Pagar luz', 'data': '2025-05-10'}).json()
+        excluida = self.client.delete(reverse('excluir_transacao', args=[r['transacao']['id']])).json()
+        self.assertGreater(excluida['seq'], lembrete['seq'])
+
+        dados = self.client.get(reverse('sincronizar'), {'since': seq_inicial}).json()
+        self.assertEqual(dados['seq'], excluida['seq'])
+        self.assertEqual(dados['transacoes'], [])
+        self.assertEqual(dados['excluidos']['transacoes'], [r['transacao']['id']])
+        self.assertEqual([l['nome'] for l in dados['lembretes']], ['Pagar luz'])
+
+        vazio = self.client.get(reverse('sincronizar'), {'since': dados['seq']}).json()
+        self.assertEqual(vazio['lembretes'] + vazio['transacoes'] + vazio['metas'], [])
+
+    def test_exclusao_logica_some_das_listagens(self):
+        l = Lembrete.objects.create(usuario=self.user, nome='x', data=date(2025, 1, 1))
+        l.excluir()
+        self.assertFalse(Lembrete.objects.exists())
+        self.assertTrue(Lembrete.todos.filter(pk=l.pk, excluido=True).exists())
+        self.assertEqual(self.client.get(reverse('listar_lembretes')).json()['lembretes'], [])
+
+
+class ExportarTransacoesTests(BaseUsuarioTestCase):
+    def inserir_sinteticas(self, quantidade):
+        """Gera transações direto no SQLite, sem passar pelo ORM."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+                INSERT INTO {Transacao._meta.db_table}
+                    (usuario_id, data, descricao, valor, tipo, seq, excluido)
+                SELECT %s, date('2020-01-01', '+' || (i % 2000) || ' days'),
+                       'Compra ' || i, (i % 1000) + 0.25, 'expense', 0, 0
+                FROM n
+                """,
+                [quantidade, self.user.id],
+            )
+
+    def test_csv_e_ndjson_com_filtro_de_data(self):
+        Transacao.objects.create(usuario=self.user, data=date(2025, 1, 1), descricao='Café, pão',
+                                 valor=Decimal('7.50'), tipo='extra')
+        Transacao.objects.create(usuario=self.user, data=date(2025, 2, 1), descricao='Fora',
+                                 valor=Decimal('1'), tipo='extra')
+        params = {'date_to': '2025-01-31'}
+
+        r = self.client.get(reverse('exportar_transacoes'), params)
+        self.assertEqual(r['Content-Type'], 'text/csv; charset=utf-8')
+        csv_texto = b''.join(r.streaming_content).decode()
+        self.assertEqual(csv_texto.splitlines(), ['data,descricao,valor,tipo', '2025-01-01,"Café, pão",7.50,extra'])
+
+        r = self.client.get(reverse('exportar_transacoes'), {**params, 'formato': 'ndjson'})
+        linhas = [json.loads(l) for l in b''.join(r.streaming_content).splitlines()]
+        self.assertEqual(linhas, [{'data': '2025-01-01', 'descricao': 'Café, pão', 'valor': '7.50', 'tipo': 'extra'}])
+
+    @tag('lento')
+    def test_um_milhao_de_linhas_com_memoria_constante(self):
+        total = 1_000_000
+        self.inserir_sinteticas(total)
+        r = self.client.get(reverse('exportar_transacoes'), {'formato': 'csv'})
+
+        tracemalloc.start()
+        try:
+            linhas = sum(bloco.count(b'\n') for bloco in r.streaming_content)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(linhas, total + 1)
+        self.assertLess(pico, 16 * 1024 * 1024, f"pico de {pico / 2**20:.1f} MiB")
+
+
+class ImportarTransacoesTests(BaseUsuarioTestCase):
+    def enviar(self, nome, conteudo):
+        arquivo = SimpleUploadedFile(nome, conteudo.encode())
+        return self.client.post(reverse('importar_transacoes'), {'arquivo': arquivo}).json()
+
+    def test_csv_importa_validas_e_reporta_erros(self):
+        dados = self.enviar('extrato.csv', (
+            "Data;Descrição;Valor;Tipo\n"
+            "05/03/2025;Salário;1.500,00;Ganho fixo\n"
+            "2025-03-06;Padaria;-12,30;\n"
+            "2025-03-07;Sem valor;abc;extra\n"
+            "31/02/2025;Data ruim;10;extra\n"
+        ))
+        self.assertEqual(dados['importadas'], 2)
+        self.assertEqual([e['linha'] for e in dados['erros']], [4, 5])
+        self.assertEqual(
+            sorted(Transacao.objects.values_list('descricao', 'valor', 'tipo')),
+            [('Padaria', Decimal('12.30'), 'expense'), ('Salário', Decimal('1500.00'), 'income')],
+        )
+        self.assertEqual(resumo.totais_por_tipo(self.user)['income'], Decimal('1500.00'))
+        self.assertEqual(Transacao.objects.first().seq, dados['seq'])
+
+    def test_valor_usa_o_ultimo_separador_como_decimal(self):
+        self.assertEqual(importacao._valor('1,500.00'), Decimal('1500.00'))
+        self.assertEqual(importacao._valor('1.500,00'), Decimal('1500.00'))
+        self.assertEqual(importacao._valor('1,5'), Decimal('1.50'))
+        self.assertEqual(importacao._valor('-1.234.567'), Decimal('-1234567.00'))
+        self.assertEqual(importacao._valor('R$ 12.30'), Decimal('12.30'))
+        for texto in ('1,500', '1,50.00', '1.5,00'):
+            with self.subTest(texto), self.assertRaises(ValueError):
+                importacao._valor(texto)
+
+        dados = self.enviar('statement.csv', (
+            "date,description,amount\n"
+            '2025-03-05,Salary,"1,500.00"\n'
+            '2025-03-06,Ambiguous,"-1,500"\n'
+        ))
+        self.assertEqual((dados['importadas'], [e['linha'] for e in dados['erros']]), (1, [3]))
+        self.assertEqual(Transacao.objects.get().valor, Decimal('1500.00'))
+
+    def test_ofx(self):
+        dados = self.enviar('extrato.ofx', (
+            "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+            "<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20250110120000[-3:BRT]\n"
+            "<TRNAMT>-45.90\n<NAME>Farmácia\n</STMTTRN>\n"
+            "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250115<TRNAMT>300.00<MEMO>Pix recebido</STMTTRN>\n"
+            "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+        ))
+        self.assertEqual((dados['importadas'], dados['erros']), (2, []))
+        self.assertEqual(
+            list(Transacao.objects.order_by('data').values_list('data', 'descricao', 'tipo')),
+            [(date(2025, 1, 10), 'Farmácia', 'expense'), (date(2025, 1, 15), 'Pix recebido', 'income')],
+        )
+
+
+class LoteOperacoesTests(BaseUsuarioTestCase):
+    def test_aplica_operacoes_agrupadas_em_ordem(self):
+        meta = MetaFinanceira.objects.create(usuario=self.user, nome='Viagem', valor=Decimal('100'),
+                                             data_inicial=date(2025, 1, 1), data_final=date(2025, 12, 31))
+        antiga = Transacao.objects.create(usuario=self.user, data=date(2025, 1, 1), descricao='Velha',
+                                          valor=Decimal('5'), tipo='extra')
+        resumo.reconstruir()
+        r = self.post_json('aplicar_lote', {'operacoes': [
+            {'op': 'criar', 'modelo': 'transacao',
+             'dados': {'data': '2025-02-01', 'descricao': 'A', 'valor': 10, 'tipo': 'income'}},
+            {'op': 'criar', 'modelo': 'transacao',
+             'dados': {'data': '2025-02-02', 'descricao': 'B', 'valor': '2.5', 'tipo': 'expense'}},
+            {'op': 'excluir', 'modelo': 'transacao', 'id': antiga.id},
+            {'op': 'progresso', 'id': meta.id, 'valor': 60},
+            {'op': 'progresso', 'id': meta.id, 'valor': 60},
+            {'op': 'criar', 'modelo': 'lembrete', 'dados': {'nome': 'Boleto', 'data': '2025-02-10'}},
+        ]})
+        self.assertEqual(r.status_code, 200)
+        dados = r.json()
+        self.assertEqual([res['indice'] for res in dados['resultados']], list(range(6)))
+        self.assertEqual(dados['resultados'][4]['nova_meta']['status'], 'Concluída')
+        self.assertEqual(sorted(Transacao.objects.values_list('descricao', flat=True)), ['A', 'B'])
+        self.assertEqual(Lembrete.objects.get().seq, dados['seq'])
+        self.assertEqual(resumo.totais_por_tipo(self.user),
+                         {'income': Decimal('10'), 'expense': Decimal('2.5'), 'extra': Decimal('0')})
+
+    def test_qualquer_erro_desfaz_o_lote(self):
+        r = self.post_json('aplicar_lote', {'operacoes': [
+            {'op': 'criar', 'modelo': 'lembrete', 'dados': {'nome': 'Boleto', 'data': '2025-02-10'}},
+            {'op': 'excluir', 'modelo': 'meta', 'id': 999},
+        ]})
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(r.json()['resultados'][0]['indice'], 1)
+        self.assertFalse(Lembrete.objects.exists())
+
+        r = self.post_json('aplicar_lote', {'operacoes': [{'op': 'criar', 'modelo': 'transacao', 'dados': {}}]})
+        self.assertEqual(r.status_code, 400)
+
+
+class ProgressoMetaTests(BaseUsuarioTestCase):
+    def test_update_condicional_limita_e_muda_status(self):
+        meta = MetaFinanceira.objects.create(usuario=self.user, nome='Reserva', valor=Decimal('100'),
+                                             data_inicial=date(2025, 1, 1), data_final=date(2025, 12, 31))
+        outro = CustomUser.objects.create_user(email="bia@example.com", password="Senha@123", first_name="Bia")
+        r = self.post_json('adicionar_progresso_meta', {'valor': 30}, meta.id)
+        self.assertEqual(r.json()['nova_meta'], {'id': meta.id, 'valor_atual': 30.0, 'status': 'Em andamento'})
+
+        resultados, seq = operacoes.adicionar_progressos(self.user.id, [(meta.id, Decimal('90')), (meta.id, Decimal('-500'))])
+        self.assertEqual([(p['valor_atual'], p['status']) for p in resultados],
+                         [(Decimal('100'), 'Concluída'), (Decimal('0'), 'Pendente')])
+        self.assertEqual(MetaFinanceira.objects.get().seq, seq)
+
+        with self.assertRaises(MetaFinanceira.DoesNotExist):
+            operacoes.adicionar_progresso(outro.id, meta.id, Decimal('1'))
+        self.assertEqual(self.post_json('adicionar_progresso_meta', {'valor': 1}, 999).status_code, 404)
+
+
+class ProgressoConcorrenteTests(TransactionTestCase):
+    def test_incrementos_simultaneos_nao_se_perdem(self):
+        usuario = CustomUser.objects.create_user(email="ana@example.com", password="Senha@123", first_name="Ana")
+        meta = MetaFinanceira.objects.create(usuario=usuario, nome='Reserva', valor=Decimal('100000'),
+                                             data_inicial=date(2025, 1, 1), data_final=date(2025, 12, 31))
+        threads, incrementos, erros = 8, 25, []
+
+        def trabalhar():
+            try:
+                for _ in range(incrementos):
+                    operacoes.adicionar_progresso(usuario.id, meta.id, Decimal('1'))
+            except Exception as e:  # o assert abaixo mostra o erro da thread
+                erros.append(e)
+            finally:
+                connections.close_all()
+
+        grupo = [threading.Thread(target=trabalhar) for _ in range(threads)]
+        for t in grupo:
+            t.start()
+        for t in grupo:
+            t.join()
+        self.assertEqual(erros, [])
+        meta.refresh_from_db()
+        self.assertEqual(meta.valor_atual, threads * incrementos)
+        self.assertEqual(meta.status, 'Em andamento')
+
+
+@override_settings(PBKDF2_ITERACOES=1000)
+class ConfirmacaoDepoisDoCommitTests(TransactionTestCase):
+    """O aviso de mudança (cache, SSE) só sai depois do commit da linha, em todas as rotas de escrita."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="ana@example.com", password="Senha@123", first_name="Ana")
+        self.client.force_login(self.user)
+
+    def confirmar(self, requisitar, estado):
+        vistos = []
+        with mock.patch.object(sync, '_confirmado', side_effect=lambda usuario_id: vistos.append(estado())):
+            r = requisitar()
+        self.assertEqual(r.status_code, 200)
+        return vistos
+
+    def test_aviso_ve_a_linha_gravada(self):
+        lembretes = Lembrete.objects.filter(usuario=self.user)
+        for prefixo in ('', 'api_'):
+            with self.subTest(prefixo):
+                corpo = json.dumps({'nome': 'IPVA', 'data': '2025-03-01'})
+                antes = lembretes.count()
+                vistos = self.confirmar(
+                    lambda: self.client.post(reverse(prefixo + 'adicionar_lembrete'), corpo,
+                                             content_type="application/json"),
+                    lembretes.count,
+                )
+                self.assertEqual(vistos, [antes + 1])
+
+                lembrete = lembretes.latest('id')
+                vistos = self.confirmar(
+                    lambda: self.client.delete(reverse(prefixo + 'excluir_lembrete', args=[lembrete.id])),
+                    lambda: Lembrete.todos.get(pk=lembrete.pk).excluido,
+                )
+                self.assertEqual(vistos, [True])
+
+        for prefixo in ('', 'api_'):
+            meta = MetaFinanceira.objects.create(usuario=self.user, nome='Reserva', valor=Decimal('100'),
+                                                 data_inicial=date(2025, 1, 1), data_final=date(2025, 12, 31))
+            vistos = self.confirmar(
+                lambda: self.client.delete(reverse(prefixo + 'excluir_meta', args=[meta.id])),
+                lambda: MetaFinanceira.todos.get(pk=meta.pk).excluido,
+            )
+            self.assertEqual(vistos, [True], prefixo)
+
+
+@override_settings(PBKDF2_ITERACOES=1000)
+class SementesBenchTests(TransactionTestCase):
+    def test_semear_e_medir_todas_as_rotas(self):
+        contagem = sementes.semear(2, 80, metas=2, lembretes=3, meses=3)
+        self.assertEqual(contagem, {'usuarios': 2, 'transacoes': 160, 'metas': 4, 'lembretes': 6})
+        self.assertEqual(sementes.semear(1, 5)['usuarios'], 1)  # continua a numeração
+        self.assertTrue(CustomUser.objects.filter(email='seed2@stonks.local').exists())
+        usuario = CustomUser.objects.get(email='seed0@stonks.local')
+        self.assertEqual(Transacao.objects.filter(usuario=usuario).count(), 80)
+        self.assertTrue(ResumoMensal.objects.filter(usuario=usuario).exists())
+
+        relatorio = benchmark.executar(usuario, concorrencia=2, requisicoes=4, aquecimento=1)
+        self.assertEqual(relatorio['rotas_sem_cenario'], [])
+        for nome, rota in relatorio['rotas'].items():
+            self.assertEqual(rota['erros'], 0, (nome, rota['status']))
+        self.assertEqual(relatorio['rotas']['perfil']['requisicoes'], 4)
+        self.assertIsNotNone(relatorio['rotas']['perfil']['consultas_por_req'])
+        comparacao = benchmark.comparar(relatorio, relatorio)
+        self.assertEqual(comparacao['perfil']['req_por_s_pct'], 0.0)
+
+
+class RespostasVersionadasTests(BaseUsuarioTestCase):
+    def test_if_none_match_responde_304_sem_consultar_listagem(self):
+        url = reverse('listar_lembretes')
+        r = self.client.get(url)
+        etag = r['ETag']
+        self.assertIn('no-cache', r['Cache-Control'])
+
+        # só a sessão e o usuário, carregados pelos middlewares
+        with self.assertNumQueries(2):
+            r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+
+        self.post_json('adicionar_lembrete', {'nome': 'Novo', 'data': '2025-01-01'})
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], etag)
+
+    def test_etag_depende_da_query_string(self):
+        url = reverse('listar_transacoes')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, {'limit': 5}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PerfilBootstrapTests(BaseUsuarioTestCase):
+    def bootstrap(self, nome='perfil'):
+        html = self.client.get(reverse(nome)).content.decode()
+        inicio = html.index('<script id="bootstrap" type="application/json">')
+        return json.loads(html[html.index('>', inicio) + 1:html.index('</script>', inicio)])
+
+    def test_mesmos_dados_das_views_json(self):
+        operacoes.criar_transacao(self.user, date(2025, 3, 1), 'Salário', Decimal('3000'), 'income')
+        operacoes.criar_transacao(self.user, date(2025, 3, 2), '</script><b>', Decimal('120.50'), 'extra')
+        self.post_json('adicionar_lembrete', {'nome': 'IPVA', 'data': '2025-04-10'})
+        dados = self.bootstrap()
+        transacoes = self.client.get(reverse('listar_transacoes')).json()
+        self.assertEqual(dados['transacoes'], transacoes['transacoes'])
+        self.assertEqual(dados['proximo'], transacoes['proximo'])
+        resumo_json = self.client.get(reverse('resumo_financeiro')).json()
+        self.assertEqual(dados['resumo'], {k: resumo_json[k] for k in ('ganhos', 'gastos', 'saldo')})
+        self.assertEqual(dados['lembretes'], self.client.get(reverse('listar_lembretes')).json()['lembretes'])
+        self.user.refresh_from_db()
+        self.assertEqual(dados['seq'], self.user.sync_seq)
+        self.assertEqual(self.bootstrap('dashboard'), dados)
+
+    def test_render_seguinte_vem_do_cache(self):
+        self.bootstrap()
+        with self.assertNumQueries(2):  # sessão e usuário
+            self.bootstrap()
+        with self.captureOnCommitCallbacks(execute=True):
+            operacoes.criar_transacao(self.user, date(2025, 3, 1), 'Salário', Decimal('10'), 'income')
+        self.assertEqual(self.bootstrap()['resumo']['saldo'], 10)
+
+
+class CacheRespostasTests(BaseUsuarioTestCase):
+    def setUp(self):
+        super().setUp()
+        cache_respostas.zerar_estatisticas()
+
+    def test_hit_e_invalidacao_na_escrita(self):
+        url = reverse('listar_lembretes')
+        self.client.get(url)
+        with self.assertNumQueries(2):  # sessão e usuário; a listagem vem do cache
+            r = self.client.get(url)
+        self.assertEqual(r.json()['lembretes'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_json('adicionar_lembrete', {'nome': 'Boleto', 'data': '2025-01-01'})
+        self.assertIsNone(caches[cache_respostas.ALIAS].get(f'u{self.user.pk}:lembretes'))
+        self.assertEqual([l['nome'] for l in self.client.get(url).json()['lembretes']], ['Boleto'])
+
+        stats = cache_respostas.estatisticas()
+        self.assertEqual((stats['hits'], stats['misses'], stats['invalidations']), (1, 2, 1))
+
+    def test_versao_antiga_nunca_e_servida(self):
+        url = reverse('listar_lembretes')
+        self.client.get(url)
+        # escrita sem passar pelo on_commit (como num teste): o seq novo já basta
+        Lembrete.objects.create(usuario=self.user, nome='Direto', data=date(2025, 1, 1))
+        self.assertEqual(len(self.client.get(url).json()['lembretes']), 1)
+
+    def test_limite_de_entradas_conta_descartes(self):
+        with override_settings(CACHES={cache_respostas.ALIAS: {
+            'BACKEND': 'usuarios.cache_respostas.LocMemCacheContado',
+            'LOCATION': 'teste-limite',
+            'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2},
+        }}):
+            for n in range(10):
+                caches[cache_respostas.ALIAS].set(f'k{n}', n)
+            self.assertGreater(cache_respostas.estatisticas()['evictions'], 0)
+
+    def test_backend_em_arquivo(self):
+        with tempfile.TemporaryDirectory() as pasta, override_settings(CACHES={cache_respostas.ALIAS: {
+            'BACKEND': 'usuarios.cache_respostas.FileBasedCacheContado',
+            'LOCATION': pasta,
+        }}):
+            url = reverse('resumo_financeiro')
+            self.assertEqual(self.client.get(url).json(), self.client.get(url).json())
+            self.assertEqual(cache_respostas.estatisticas()['hits'], 1)
+
+    def test_estatisticas_so_para_staff(self):
+        self.assertEqual(self.client.get(reverse('estatisticas_cache')).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIn('hit_ratio', self.client.get(reverse('estatisticas_cache')).json())
+
+
+class ApiAssincronaTests(BaseUsuarioTestCase):
+    async def test_fluxo_de_transacao_e_lembrete(self):
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.post(
+            reverse('api_adicionar_transacao'),
+            {'data': '2025-04-01', 'descricao': 'Salário', 'valor': '3000', 'tipo': 'income'},
+            content_type='application/json',
+        )
+        self.assertEqual(r.status_code, 200)
+        transacao = r.json()['transacao']
+
+        r = await self.async_client.get(reverse('api_listar_transacoes'))
+        self.assertEqual(r.json()['transacoes'], [transacao])
+        r = await self.async_client.get(reverse('api_listar_transacoes'), headers={'if-none-match': r['ETag']})
+        self.assertEqual(r.status_code, 304)
+
+        await self.async_client.delete(reverse('api_excluir_transacao', args=[transacao['id']]))
+        self.assertEqual((await self.async_client.get(reverse('api_listar_transacoes'))).json()['transacoes'], [])
+        self.assertEqual(await ResumoMensal.objects.filter(total=0).acount(), 1)
+
+        r = await self.async_client.post(reverse('api_adicionar_lembrete'), {'nome': 'IPVA', 'data': '2025-04-10'},
+                                         content_type='application/json')
+        lembrete, seq = r.json()['lembrete'], r.json()['seq']
+        r = await self.async_client.delete(reverse('api_excluir_lembrete', args=[lembrete['id']]))
+        self.assertGreater(r.json()['seq'], seq)
+        r = await self.async_client.delete(reverse('api_excluir_lembrete', args=[999]))
+        self.assertEqual(r.status_code, 404)
+
+    async def test_progresso_de_meta(self):
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.post(reverse('api_adicionar_meta'), {
+            'nome': 'Reserva', 'valor': 100, 'data_inicial': '2025-01-01', 'data_final': '2025-12-31',
+        }, content_type='application/json')
+        meta = r.json()['meta']
+        r = await self.async_client.post(reverse('api_adicionar_progresso_meta', args=[meta['id']]),
+                                         {'valor': 150}, content_type='application/json')
+        self.assertEqual(r.json()['nova_meta'], {'id': meta['id'], 'valor_atual': 100.0, 'status': 'Concluída'})
+
+    def test_exige_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_listar_lembretes')).status_code, 302)
+
+
+class BrokerRegistrado(eventos.BrokerLocal):
+    publicados = []
+
+    def publicar(self, usuario_id):
+        self.publicados.append(usuario_id)
+        super().publicar(usuario_id)
+
+
+class EventosTests(BaseUsuarioTestCase):
+    async def test_fluxo_funde_avisos_e_manda_heartbeat(self):
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.get(reverse('api_eventos'))
+        self.assertEqual(r['Content-Type'], 'text/event-stream')
+        corpo = aiter(r.streaming_content)
+        self.assertIn(b'data: {"seq": 0}', await anext(corpo))
+        self.assertEqual(eventos.broker().conexoes(self.user.id), 1)
+        # avisos de outra thread (a do commit) enquanto a conexão não lê
+        for _ in range(50):
+            await sync_to_async(eventos.publicar, thread_sensitive=False)(self.user.id)
+        self.assertEqual(await anext(corpo), b'event: mudanca\ndata: {}\n\n')
+        with mock.patch.object(eventos, 'HEARTBEAT', 0.01):
+            self.assertEqual(await anext(corpo), b': ping\n\n')
+
+    async def test_conexao_encerrada_sai_do_broker(self):
+        fluxo = eventos.fluxo(self.user.id, 3)
+        self.assertIn('"seq": 3', await anext(fluxo))
+        await fluxo.aclose()
+        self.assertEqual(eventos.broker().conexoes(self.user.id), 0)
+
+    async def test_limite_de_conexoes_por_usuario(self):
+        await self.async_client.aforce_login(self.user)
+        assinaturas = [eventos.broker().assinar(self.user.id) for _ in range(eventos.MAX_CONEXOES)]
+        try:
+            self.assertEqual((await self.async_client.get(reverse('api_eventos'))).status_code, 429)
+        finally:
+            for assinatura in assinaturas:
+                eventos.broker().cancelar(assinatura)
+
+    @override_settings(EVENTOS_BROKER='usuarios.tests.BrokerRegistrado')
+    def test_escritas_publicam_depois_do_commit(self):
+        eventos.broker.cache_clear()
+        self.addCleanup(eventos.broker.cache_clear)
+        BrokerRegistrado.publicados = []
+        with self.captureOnCommitCallbacks(execute=True):
+            operacoes.criar_transacao(self.user, date(2025, 1, 1), 'x', Decimal('1'), 'income')
+            self.post_json('adicionar_lembrete', {'nome': 'IPVA', 'data': '2025-04-10'})
+            self.assertEqual(BrokerRegistrado.publicados, [])
+        self.assertEqual(BrokerRegistrado.publicados, [self.user.id, self.user.id])
+
+
+class SerializacaoTests(BaseUsuarioTestCase):
+    def test_listagem_igual_ao_dict_da_instancia(self):
+        meta = MetaFinanceira.objects.create(
+            usuario=self.user, nome='Viagem', valor=Decimal('300'), valor_atual=Decimal('100'),
+            data_inicial=date(2025, 1, 1), data_final=date(2025, 6, 30),
+        )
+        zerada = MetaFinanceira.objects.create(
+            usuario=self.user, nome='Sem alvo', valor=0, data_inicial=date(2025, 1, 1), data_final=date(2025, 1, 2),
+        )
+        t = Transacao.objects.create(usuario=self.user, data=date(2025, 2, 3), descricao='Café', valor=Decimal('4.50'),
+                                     tipo='extra')
+        l = Lembrete.objects.create(usuario=self.user, nome='Aluguel', data=date(2025, 2, 5))
+
+        metas = {m['id']: m for m in serializacao.listar('metas', MetaFinanceira.objects.all())}
+        self.assertEqual(metas[meta.id], serializacao.meta_dict(meta))
+        self.assertEqual(metas[meta.id]['porcentagem'], 33.3)
+        self.assertEqual(metas[zerada.id]['porcentagem'], 0)
+        self.assertEqual(serializacao.listar('transacoes', Transacao.objects.all()), [serializacao.transacao_dict(t)])
+        self.assertEqual(serializacao.listar('lembretes', Lembrete.objects.all()), [serializacao.lembrete_dict(l)])
+        self.assertEqual(self.client.get(reverse('listar_metas_json')).json()['metas'][0]['data_final'], '2025-01-02')
+
+
+class BackendContado(LocMemEmailBackend):
+    conexoes = 0
+
+    def open(self):
+        BackendContado.conexoes += 1
+        return super().open()
+
+
+class BackendForaDoAr(LocMemEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("SMTP indisponível")
+
+
+class FilaEmailsTests(BaseUsuarioTestCase):
+    def test_recuperar_senha_so_enfileira(self):
+        r = self.client.post(reverse('recuperar'), {'email': self.user.email})
+        self.assertRedirects(r, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(mail.outbox, [])
+        pendente = EmailPendente.objects.get()
+        self.assertIn('/reset/', pendente.corpo)
+
+        call_command('enviar_emails', stdout=io.StringIO())
+        self.assertEqual([m.to for m in mail.outbox], [[self.user.email]])
+        pendente.refresh_from_db()
+        self.assertIsNotNone(pendente.enviado_em)
+
+    @override_settings(EMAIL_BACKEND='usuarios.tests.BackendContado')
+    def test_lotes_reusam_uma_conexao(self):
+        for i in range(5):
+            emails.enfileirar(f"u{i}@example.com", "Oi", "Corpo")
+        BackendContado.conexoes = 0
+        self.assertEqual(emails.drenar(limite=2), (5, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(BackendContado.conexoes, 1)
+        self.assertEqual(emails.drenar(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='usuarios.tests.BackendForaDoAr')
+    def test_falha_reagenda_com_espera_crescente(self):
+        pendente = emails.enfileirar("x@example.com", "Oi", "Corpo")
+        with self.assertLogs('usuarios.emails', 'WARNING'):
+            self.assertEqual(emails.drenar(), (0, 1))
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.tentativas, 1)
+        self.assertIn('SMTP indisponível', pendente.ultimo_erro)
+        self.assertGreater(pendente.proxima_tentativa, timezone.now())
+        # ainda não venceu: nada a fazer
+        self.assertEqual(emails.drenar(), (0, 0))
+        self.assertEqual([emails.espera(n).total_seconds() for n in (1, 2, 3, 20)], [30, 60, 120, 3600])
+
+        EmailPendente.objects.update(proxima_tentativa=timezone.now(), tentativas=emails.MAX_TENTATIVAS)
+        self.assertEqual(emails.drenar(), (0, 0))
+
+
+class LembretesWorkerTests(BaseUsuarioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.avisados = []
+        self.hoje = timezone.localdate()
+
+    def destino(self, avisos):
+        self.avisados += [(l.nome, l.usuario.email) for l in avisos]
+
+    def lembrete(self, nome, dias):
+        return Lembrete.objects.create(usuario=self.user, nome=nome, data=self.hoje + timedelta(days=dias))
+
+    def test_envia_vencidos_e_dorme_ate_o_proximo(self):
+        self.lembrete('Ontem', -1)
+        self.lembrete('Hoje', 0)
+        futuro = self.lembrete('Semana que vem', 7)
+        self.lembrete('Excluído', -2).excluir()
+        agenda = lembretes.Agenda()
+        agora = lembretes.vencimento(self.hoje)
+        self.assertEqual(lembretes.rodada(agenda, self.destino, agora), (2, 0))
+        self.assertEqual(self.avisados, [('Ontem', self.user.email), ('Hoje', self.user.email)])
+        self.assertEqual(agenda.proximo(), lembretes.vencimento(futuro.data))
+        self.assertEqual(lembretes.rodada(agenda, self.destino, agora), (0, 0))
+        self.assertEqual(set(Lembrete.objects.filter(enviado=True).values_list('nome', flat=True)), {'Ontem', 'Hoje'})
+        # um worker novo não reenvia o que já foi marcado
+        self.assertEqual(lembretes.rodada(lembretes.Agenda(), self.destino, agora), (0, 0))
+
+    def test_falha_no_destino_reagenda_sem_marcar(self):
+        self.lembrete('Hoje', 0)
+        agenda = lembretes.Agenda()
+        agora = lembretes.vencimento(self.hoje)
+
+        def fora_do_ar(avisos):
+            raise ConnectionError("fora do ar")
+        with self.assertLogs('usuarios.lembretes', 'WARNING'):
+            self.assertEqual(lembretes.rodada(agenda, fora_do_ar, agora), (0, 1))
+        self.assertFalse(Lembrete.objects.filter(enviado=True).exists())
+        self.assertEqual(lembretes.rodada(agenda, self.destino, agora), (0, 0))
+        self.assertEqual(lembretes.rodada(agenda, self.destino, agora + lembretes.ESPERA_FALHA), (1, 0))
+
+    def test_le_em_paginas_de_datas_inteiras_e_revisa_os_novos(self):
+        for dias in (-3, -3, -3, 1, 2, 2):
+            self.lembrete(f'd{dias}', dias)
+        agenda = lembretes.Agenda(carga=2)
+        # a primeira data tem mais lembretes que a carga: vem inteira
+        self.assertEqual(len(agenda.heap), 3)
+        novo = self.lembrete('Criado depois', -1)
+        agenda.revisar()
+        with CaptureQueriesContext(connection) as consultas:
+            enviados, _ = lembretes.rodada(agenda, self.destino, lembretes.vencimento(self.hoje + timedelta(days=5)),
+                                           lote=2)
+        self.assertEqual(enviados, 7)
+        self.assertEqual([nome for nome, _ in self.avisados][:4], ['d-3', 'd-3', 'd-3', novo.nome])
+        self.assertLessEqual(len(consultas), 20)
+        self.assertIsNone(agenda.proximo())
+
+    def test_consultas_do_worker_usam_indices(self):
+        planos = {
+            'lembrete_pendente': lembretes.pendentes('default').filter(data__gt=self.hoje)
+            .order_by('data', 'id').values_list('data', 'id')[:100],
+            'INTEGER PRIMARY KEY': lembretes.pendentes('default').filter(id__gt=10).values_list('data', 'id'),
+        }
+        for indice, consulta in planos.items():
+            sql, params = consulta.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plano = ' '.join(linha[-1] for linha in cursor.fetchall())
+            self.assertIn(indice, plano)
+            self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_comando_poe_os_avisos_na_fila_de_emails(self):
+        self.lembrete('Pagar fatura', -1)
+        self.lembrete('Depois', 30)
+        saida = io.StringIO()
+        call_command('lembretes_worker', '--uma-vez', stdout=saida)
+        self.assertIn('1 lembretes avisados', saida.getvalue())
+        pendente = EmailPendente.objects.get()
+        self.assertEqual((pendente.destinatario, pendente.assunto), (self.user.email, 'Lembrete: Pagar fatura'))
+
+
+@override_settings(PBKDF2_ITERACOES=1000)
+class LimiteAutenticacaoTests(TestCase):
+    def setUp(self):
+        limites.limpar()
+        metricas.zerar()
+        self.user = CustomUser.objects.create_user(email="ana@example.com", password="Senha@123", first_name="Ana")
+
+    def hashes(self):
+        return metricas.instantaneo()['tempos'].get('senha_hash', {}).get('quantidade', 0)
+
+    @override_settings(LIMITES_AUTENTICACAO={'login': {'capacidade': 2, 'por_minuto': 1}})
+    def test_recusa_antes_de_calcular_hash(self):
+        for _ in range(2):
+            r = self.client.post(reverse('login'), {'email': 'ana@example.com', 'password': 'errada'})
+            self.assertEqual(r.status_code, 200)
+        antes = self.hashes()
+        r = self.client.post(reverse('login'), {'email': 'ana@example.com', 'password': 'Senha@123'})
+        self.assertEqual(r.status_code, 429)
+        self.assertEqual(r['Retry-After'], '60')
+        self.assertEqual(self.hashes(), antes)
+        # mesmo IP, outro e-mail: o balde do IP também está vazio
+        r = self.client.post(reverse('login'), {'email': 'bia@example.com', 'password': 'x'})
+        self.assertEqual(r.status_code, 429)
+        self.assertEqual(metricas.instantaneo()['contadores']['autenticacao_recusada{escopo="login"}'], 2)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    @override_settings(LIMITES_AUTENTICACAO_CACHE='default',
+                       LIMITES_AUTENTICACAO={'recuperar': {'capacidade': 1, 'por_minuto': 6}})
+    def test_baldes_no_cache(self):
+        caches['default'].clear()
+        self.assertEqual(limites.tentar('recuperar', ['ip:1']), 0)
+        self.assertAlmostEqual(limites.tentar('recuperar', ['ip:1']), 10, delta=0.1)
+        self.assertEqual(limites.tentar('recuperar', ['ip:2']), 0)
+
+    def test_hash_refeito_no_login_quando_custo_muda(self):
+        self.assertIn('$1000$', self.user.password)
+        with self.settings(PBKDF2_ITERACOES=1500):
+            r = self.client.post(reverse('login'), {'email': 'ana@example.com', 'password': 'Senha@123'})
+        self.assertRedirects(r, reverse('perfil'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1500$'))
+
+
+class InstrumentacaoTests(BaseUsuarioTestCase):
+    def setUp(self):
+        super().setUp()
+        metricas.zerar()
+
+    def test_server_timing_e_metrics(self):
+        Transacao.objects.create(usuario=self.user, data=date(2025, 1, 1), descricao='x', valor=1, tipo='income')
+        r = self.client.get(reverse('listar_transacoes'))
+        partes = dict(p.split(';', 1) for p in r['Server-Timing'].split(', '))
+        self.assertEqual(set(partes), {'total', 'db', 'serializacao'})
+        self.assertRegex(partes['db'], r'desc="[1-9]\d* consultas"')
+
+        self.assertEqual(self.client.get(reverse('metricas_prometheus')).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        texto = self.client.get(reverse('metricas_prometheus')).content.decode()
+        self.assertIn('# TYPE stonks_http_duracao_segundos histogram', texto)
+        self.assertIn('stonks_http_duracao_segundos_count{rota="transacoes/"} 1', texto)
+        self.assertIn('stonks_http_duracao_segundos_quantil{rota="transacoes/",quantil="0.99"}', texto)
+        self.assertIn('stonks_http_requisicoes_total{metodo="GET",rota="transacoes/",status="200"} 1', texto)
+        self.assertIn('# TYPE stonks_cache_respostas_misses_total counter', texto)
+
+    async def test_views_assincronas(self):
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.get(reverse('api_listar_lembretes'))
+        self.assertIn('total;dur=', r['Server-Timing'])
+        self.assertEqual(metricas.instantaneo()['histogramas']['http_duracao_segundos{rota="api/lembretes/"}']['quantidade'], 1)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=0)
+    def test_fora_da_amostra_nao_mede(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('listar_lembretes')))
+        self.assertEqual(metricas.instantaneo()['histogramas'], {})
+
+
+class OrcamentoConsultasTests(BaseUsuarioTestCase):
+    """
+    Consultas por rota com um histórico grande: um N+1 ou uma consulta a mais
+    quebra o teste, e o ``assertNumQueries`` mostra o SQL executado.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        sementes.semear(2, 1500, metas=20, lembretes=30)
+        cls.seed = CustomUser.objects.get(email='seed0@stonks.local')
+        cls.staff = CustomUser.objects.create_user(
+            email="staff@example.com", password="Senha@123", first_name="Staff", is_staff=True,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.seed)
+
+    def cenarios(self):
+        """``(rota, método, caminho, corpo, consultas)`` na ordem em que são medidos."""
+        # dia com linha no ResumoMensal: o registro vira um UPDATE só
+        dia = (date.today() - timedelta(days=60)).isoformat()
+        transacao = Transacao.objects.create(usuario=self.seed, data=date.fromisoformat(dia), descricao='x',
+                                             valor=Decimal('1'), tipo='extra')
+        meta = MetaFinanceira.objects.filter(usuario=self.seed).first()
+        lembretes = list(Lembrete.objects.filter(usuario=self.seed).values_list('id', flat=True)[:2])
+        metas = list(MetaFinanceira.objects.filter(usuario=self.seed).values_list('id', flat=True)[1:3])
+        transacoes = list(Transacao.objects.filter(usuario=self.seed).values_list('id', flat=True)[:2])
+        nova_transacao = {'data': dia, 'descricao': 'Mercado', 'valor': '12.50', 'tipo': 'extra'}
+        nova_meta = {'nome': 'Viagem', 'valor': 1000, 'data_inicial': dia, 'data_final': dia}
+        novo_lembrete = {'nome': 'IPVA', 'data': dia}
+        csv = f"data;descricao;valor\n{dia};Padaria;-8,50\n{dia};Feira;-30,00\n"
+        return [
+            ('login', 'GET', reverse('login'), None, 0),
+            ('cadastro', 'GET', reverse('cadastro'), None, 0),
+            ('recuperar', 'GET', reverse('recuperar'), None, 0),
+            ('password_reset_confirm', 'GET', reverse('password_reset_confirm', args=['MQ', 'x']), None, 1),
+            ('perfil', 'GET', reverse('perfil'), None, 5),
+            ('dashboard', 'GET', reverse('dashboard'), None, 2),  # dados iniciais do cache do perfil
+            ('resumo_financeiro', 'GET', reverse('resumo_financeiro'), None, 3),
+            ('analise_financeira', 'GET', reverse('analise_financeira'), None, 5),
+            ('listar_transacoes', 'GET', reverse('listar_transacoes') + '?limit=200', None, 3),
+            ('adicionar_transacao', 'POST', reverse('adicionar_transacao'), nova_transacao, 8),
+            ('excluir_transacao', 'DELETE', reverse('excluir_transacao', args=[transacao.id]), None, 9),
+            ('exportar_transacoes', 'GET', reverse('exportar_transacoes') + '?formato=ndjson', None, 3),
+            ('importar_transacoes', 'POST', reverse('importar_transacoes'), {'arquivo': csv}, 8),
+            ('listar_metas', 'GET', reverse('listar_metas'), None, 2),
+            ('listar_metas_json', 'GET', reverse('listar_metas_json'), None, 3),
+            ('adicionar_meta', 'POST', reverse('adicionar_meta'), nova_meta, 10),
+            ('adicionar_progresso_meta', 'POST', reverse('adicionar_progresso_meta', args=[meta.id]),
+             {'valor': 10}, 8),
+            ('excluir_meta', 'DELETE', reverse('excluir_meta', args=[metas[0]]), None, 8),
+            ('listar_lembretes', 'GET', reverse('listar_lembretes'), None, 3),
+            ('adicionar_lembrete', 'POST', reverse('adicionar_lembrete'), novo_lembrete, 7),
+            ('excluir_lembrete', 'DELETE', reverse('excluir_lembrete', args=[lembretes[0]]), None, 8),
+            ('aplicar_lote', 'POST', reverse('aplicar_lote'),
+             {'operacoes': [{'op': 'criar', 'modelo': 'lembrete', 'dados': novo_lembrete}] * 20}, 7),
+            ('sincronizar', 'GET', reverse('sincronizar') + '?since=0', None, 6),
+            ('api_listar_transacoes', 'GET', reverse('api_listar_transacoes') + '?limit=200', None, 3),
+            ('api_adicionar_transacao', 'POST', reverse('api_adicionar_transacao'), nova_transacao, 8),
+            ('api_excluir_transacao', 'DELETE', reverse('api_excluir_transacao', args=[transacoes[0]]), None, 9),
+            ('api_listar_metas', 'GET', reverse('api_listar_metas'), None, 3),
+            ('api_adicionar_meta', 'POST', reverse('api_adicionar_meta'), nova_meta, 10),
+            ('api_adicionar_progresso_meta', 'POST', reverse('api_adicionar_progresso_meta', args=[meta.id]),
+             {'valor': 10}, 8),
+            ('api_excluir_meta', 'DELETE', reverse('api_excluir_meta', args=[metas[1]]), None, 8),
+            ('api_listar_lembretes', 'GET', reverse('api_listar_lembretes'), None, 3),
+            ('api_adicionar_lembrete', 'POST', reverse('api_adicionar_lembrete'), novo_lembrete, 7),
+            ('api_excluir_lembrete', 'DELETE', reverse('api_excluir_lembrete', args=[lembretes[1]]), None, 8),
+            ('estatisticas_cache', 'GET', reverse('estatisticas_cache'), None, 2),
+            ('metricas_processo', 'GET', reverse('metricas_processo'), None, 2),
+            ('metricas_prometheus', 'GET', reverse('metricas_prometheus'), None, 2),
+            ('api_eventos', 'GET', reverse('api_eventos'), None, 2),
+            ('sair', 'GET', reverse('sair'), None, 4),
+        ]
+
+    def requisitar(self, metodo, caminho, corpo):
+        if metodo == 'GET':
+            r = self.client.get(caminho)
+        elif metodo == 'DELETE':
+            r = self.client.delete(caminho)
+        elif 'arquivo' in corpo:
+            r = self.client.post(caminho, {'arquivo': SimpleUploadedFile('extrato.csv', corpo['arquivo'].encode())})
+        else:
+            r = self.client.post(caminho, json.dumps(corpo), content_type="application/json")
+        # a conexão SSE não termina: EventosTests lê os eventos
+        if r.streaming and r['Content-Type'] != 'text/event-stream':
+            b''.join(r.streaming_content)
+        return r
+
+    def test_consultas_por_rota(self):
+        cenarios = self.cenarios()
+        from .urls import urlpatterns
+        self.assertEqual({nome for nome, *_ in cenarios}, {p.name for p in urlpatterns},
+                         "toda rota de usuarios/urls.py precisa de um orçamento aqui")
+        for nome, metodo, caminho, corpo, consultas in cenarios:
+            if nome in ('login', 'cadastro', 'recuperar', 'password_reset_confirm'):
+                self.client.logout()
+            elif nome in ('estatisticas_cache', 'metricas_processo', 'metricas_prometheus', 'sair'):
+                self.client.force_login(self.staff)
+            else:
+                self.client.force_login(self.seed)
+            with self.subTest(nome), self.assertNumQueries(consultas):
+                r = self.requisitar(metodo, caminho, corpo)
+            self.assertLess(r.status_code, 400, nome)
+
+    def test_cache_quente_nao_consulta_o_banco(self):
+        self.client.get(reverse('listar_transacoes'))
+        with self.assertNumQueries(2):  # sessão e usuário
+            self.client.get(reverse('listar_transacoes'))
+
+    def test_listagens_usam_indices(self):
+        """Nenhuma consulta das listagens, do dashboard, da análise, da exportação e do sync varre uma tabela inteira."""
+        dia = date.today() - timedelta(days=90)
+        caminhos = [
+            reverse('dashboard'),
+            reverse('resumo_financeiro'),
+            reverse('analise_financeira') + f'?date_from={dia + timedelta(days=10)}',
+            reverse('listar_transacoes'),
+            reverse('listar_transacoes') + f'?date_from={dia}&tipo=extra',
+            reverse('listar_transacoes') + f'?before={dia}_1000',
+            reverse('exportar_transacoes') + f'?date_from={dia}',
+            reverse('sincronizar') + '?since=1',
+            reverse('listar_metas_json'),
+            reverse('listar_lembretes'),
+            reverse('api_listar_transacoes'),
+        ]
+        for caminho in caminhos:
+            caches[cache_respostas.ALIAS].clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                self.requisitar('GET', caminho, None)
+            for consulta in capturadas.captured_queries:
+                sql = consulta['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plano = [linha[-1] for linha in cursor.fetchall()]
+                with self.subTest(caminho, sql=sql):
+                    self.assertFalse([p for p in plano if p.startswith('SCAN')],
+                                     f"varredura completa em {caminho}:\n{sql}\n{plano}")
+                    if 'usuarios_transacao' in sql and 'ORDER BY' in sql:
+                        # a paginação por (data, id) depende da ordem do índice, sem ordenar em memória
+                        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plano, f"{caminho}:\n{sql}")
+
+
+class AdminTests(BaseUsuarioTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sementes.semear(2, 300, metas=5, lembretes=10)
+        cls.seed = CustomUser.objects.get(email='seed0@stonks.local')
+        cls.admin = CustomUser.objects.create_superuser("admin@example.com", "Senha@123", "Admin")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def filtradas(self):
+        return [
+            reverse('admin:usuarios_transacao_changelist'),
+            reverse('admin:usuarios_transacao_changelist') + '?tipo__exact=extra',
+            reverse('admin:usuarios_transacao_changelist') + f'?data__gte={date.today() - timedelta(days=30)}',
+            reverse('admin:usuarios_transacao_changelist') + f'?usuario__id__exact={self.seed.pk}',
+            reverse('admin:usuarios_metafinanceira_changelist') + '?status__exact=Em+andamento',
+            reverse('admin:usuarios_lembrete_changelist'),
+            reverse('admin:usuarios_customuser_changelist'),
+        ]
+
+    def test_listagens_com_orcamento_de_consultas(self):
+        # sessão, usuário, contagem limitada, página e o lote do ``completar``
+        for caminho in self.filtradas():
+            with self.subTest(caminho), self.assertNumQueries(5):
+                r = self.client.get(caminho)
+            self.assertEqual(r.status_code, 200)
+        r = self.client.get(reverse('admin:usuarios_transacao_changelist'))
+        self.assertContains(r, f'?usuario__id__exact={self.seed.pk}">seed0@stonks.local</a>')
+
+    def test_contagem_para_no_limite(self):
+        with mock.patch.object(admin_usuarios, 'LIMITE_CONTAGEM', 120):
+            cl = self.client.get(reverse('admin:usuarios_transacao_changelist')).context['cl']
+        self.assertEqual(cl.result_count, 120)
+        self.assertIsNone(cl.full_result_count)
+        self.assertEqual(cl.paginator.num_pages, 3)
+
+    def test_filtros_e_ordem_seguem_indices(self):
+        for caminho in self.filtradas():
+            with CaptureQueriesContext(connection) as capturadas:
+                self.client.get(caminho)
+            for consulta in capturadas.captured_queries:
+                sql = consulta['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plano = [linha[-1] for linha in cursor.fetchall()]
+                with self.subTest(caminho, sql=sql):
+                    self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plano)
+                    if '?' in caminho:
+                        # sem filtro, um SCAN na ordem da chave primária para no LIMIT da página
+                        self.assertFalse([p for p in plano if p.startswith('SCAN usuarios_') and 'INDEX' not in p],
+                                         plano)
+
+    def totais(self, usuario):
+        r = self.client.get(reverse('admin:usuarios_customuser_changelist'))
+        return next(u for u in r.context['cl'].result_list if u.pk == usuario.pk).totais
+
+    def test_totais_por_usuario(self):
+        self.assertEqual(self.totais(self.seed), {**resumo.saldo(resumo.totais_por_tipo(self.seed)), 'transacoes': 300})
+        self.assertEqual(self.totais(self.admin)['transacoes'], 0)
+        # edições e exclusões feitas no próprio admin aparecem nos totais
+        transacao = Transacao.objects.filter(usuario=self.seed, tipo='income').first()
+        saldo = self.totais(self.seed)['saldo']
+        self.client.post(reverse('admin:usuarios_transacao_change', args=[transacao.pk]), {
+            'usuario': self.seed.pk, 'data': transacao.data, 'descricao': 'x',
+            'valor': transacao.valor + 100, 'tipo': 'income',
+        })
+        self.assertAlmostEqual(self.totais(self.seed)['saldo'], saldo + 100, places=2)
+        self.client.post(reverse('admin:usuarios_transacao_delete', args=[transacao.pk]), {'post': 'yes'})
+        self.assertEqual(self.totais(self.seed)['transacoes'], 299)
+        self.assertAlmostEqual(self.totais(self.seed)['saldo'], saldo - float(transacao.valor), places=2)
+
+
+    def excluidos_desde(self, seq):
+        self.client.force_login(self.seed)
+        excluidos = self.client.get(reverse('sincronizar'), {'since': seq}).json()['excluidos']
+        self.client.force_login(self.admin)
+        return {nome: sorted(ids) for nome, ids in excluidos.items()}
+
+    def test_exclusao_deixa_tombstone_com_um_seq_por_usuario(self):
+        ids = sorted(Transacao.objects.filter(usuario=self.seed).values_list('id', flat=True)[:30])
+        seq = self.seed.sync_seq
+        r = self.client.post(reverse('admin:usuarios_transacao_changelist'),
+                             {'action': 'delete_selected', '_selected_action': ids, 'post': 'yes'})
+        self.assertEqual(r.status_code, 302)
+        self.assertFalse(Transacao.objects.filter(id__in=ids).exists())
+        self.seed.refresh_from_db()
+        self.assertEqual(self.seed.sync_seq, seq + 1)
+        self.assertEqual(self.excluidos_desde(seq), {'transacoes': ids, 'metas': [], 'lembretes': []})
+
+        meta = MetaFinanceira.objects.filter(usuario=self.seed).first()
+        self.client.post(reverse('admin:usuarios_metafinanceira_delete', args=[meta.pk]), {'post': 'yes'})
+        self.assertFalse(MetaFinanceira.objects.filter(pk=meta.pk).exists())
+        self.seed.refresh_from_db()
+        self.assertEqual(self.seed.sync_seq, seq + 2)
+        self.assertEqual(self.excluidos_desde(seq + 1), {'transacoes': [], 'metas': [meta.pk], 'lembretes': []})
+
+    def assertResumoConfere(self, usuario):
+        esperado = {
+            tipo: float(soma) for tipo, soma in
+            Transacao.objects.filter(usuario=usuario).values('tipo').annotate(soma=Sum('valor'))
+            .order_by().values_list('tipo', 'soma')
+        }
+        self.client.force_login(usuario)
+        por_tipo = self.client.get(reverse('resumo_financeiro')).json()['por_tipo']
+        self.assertEqual({t: v for t, v in por_tipo.items() if v}, esperado)
+        self.client.force_login(self.admin)
+
+    def test_edicao_e_exclusao_atualizam_o_resumo(self):
+        self.assertResumoConfere(self.seed)
+        transacao = Transacao.objects.filter(usuario=self.seed, tipo='extra').first()
+        r = self.client.post(reverse('admin:usuarios_transacao_change', args=[transacao.pk]), {
+            'usuario': self.seed.pk, 'data': '2020-01-15', 'descricao': 'Editada', 'valor': '1234.56',
+            'tipo': 'income',
+        })
+        self.assertEqual(r.status_code, 302)
+        self.assertResumoConfere(self.seed)
+
+        self.client.post(reverse('admin:usuarios_transacao_add'), {
+            'usuario': self.seed.pk, 'data': '2020-02-01', 'descricao': 'Nova', 'valor': '10', 'tipo': 'other',
+        })
+        self.client.post(reverse('admin:usuarios_transacao_delete', args=[transacao.pk]), {'post': 'yes'})
+        self.assertResumoConfere(self.seed)
+
+        ids = list(Transacao.objects.filter(usuario=self.seed).values_list('id', flat=True)[:40])
+        self.client.post(reverse('admin:usuarios_transacao_changelist'),
+                         {'action': 'delete_selected', '_selected_action': ids, 'post': 'yes'})
+        self.assertResumoConfere(self.seed)
+
+    def test_excluir_usuario_apaga_os_dados_em_lote(self):
+        seed1 = CustomUser.objects.get(email='seed1@stonks.local')
+        with CaptureQueriesContext(connection) as capturadas:
+            seed1.delete()
+        self.assertFalse(Transacao.todos.filter(usuario_id=seed1.pk).exists())
+        # um DELETE por tabela, sem carregar as 300 transações
+        self.assertLess(len(capturadas), 20)
+
+
+class EstaticosTests(BaseUsuarioTestCase):
+    def coletar(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        configuracao = override_settings(STATIC_ROOT=pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        return EstaticosMiddleware(lambda request: HttpResponse(status=404))
+
+    def test_sem_collectstatic_fica_de_fora(self):
+        with tempfile.TemporaryDirectory() as pasta, override_settings(STATIC_ROOT=pasta):
+            with self.assertRaises(MiddlewareNotUsed):
+                EstaticosMiddleware(lambda request: None)
+            # e os templates apontam para os nomes originais
+            self.assertContains(self.client.get(reverse('perfil')), '/static/usuarios/perfil.js"')
+
+    def test_collectstatic_gera_hash_e_versoes_comprimidas(self):
+        self.coletar()
+        nome = staticfiles_storage.stored_name('usuarios/perfil.js')
+        self.assertRegex(nome, r'^usuarios/perfil\.[0-9a-f]{12}\.js$')
+        with staticfiles_storage.open(nome) as original, staticfiles_storage.open(nome + '.gz') as comprimido:
+            self.assertEqual(gzip.decompress(comprimido.read()), original.read())
+        # imagem já comprimida não ganha .gz
+        imagem = staticfiles_storage.stored_name('usuarios/imagens/cofrinho.png')
+        self.assertFalse(staticfiles_storage.exists(imagem + '.gz'))
+        html = self.client.get(reverse('perfil')).content.decode()
+        self.assertIn(f'/static/{nome}"', html)
+        self.assertNotIn('<script>', html)
+
+    def test_serve_imutavel_na_codificacao_aceita(self):
+        middleware = self.coletar()
+        fabrica = RequestFactory()
+        url = '/static/' + staticfiles_storage.stored_name('usuarios/perfil.js')
+        with staticfiles_storage.open('usuarios/perfil.js') as f:
+            original = f.read()
+
+        r = middleware(fabrica.get(url, headers={'accept-encoding': 'gzip, deflate, br;q=0'}))
+        self.assertEqual((r['Content-Encoding'], r['Cache-Control'], r['Vary']),
+                         ('gzip', estaticos.IMUTAVEL, 'Accept-Encoding'))
+        self.assertEqual(gzip.decompress(r.content), original)
+        self.assertIn('javascript', r['Content-Type'])
+        r = middleware(fabrica.get(url))
+        self.assertFalse(r.has_header('Content-Encoding'))
+        self.assertEqual(r.content, original)
+        self.assertEqual(middleware(fabrica.head(url)).content, b'')
+
+        # nome sem hash revalida pelo ETag
+        r = middleware(fabrica.get('/static/usuarios/perfil.js'))
+        self.assertEqual(r['Cache-Control'], estaticos.REVALIDAR)
+        r = middleware(fabrica.get('/static/usuarios/perfil.js', headers={'if-none-match': r['ETag']}))
+        self.assertEqual(r.status_code, 304)
+        # o resto segue para a aplicação
+        self.assertEqual(middleware(fabrica.post(url)).status_code, 404)
+        self.assertEqual(middleware(fabrica.get('/static/nao-existe.js')).status_code, 404)
+
+
+class ConexaoSqliteTests(TestCase):
+    def test_pragmas_de_producao(self):
+        self.assertEqual(banco.pragmas(connection), {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024, 'cache_size': -32000, 'temp_store': 2,
+        })
+        # o modo de transação vem do ambiente (STONKS_SQLITE_TRANSACTION_MODE)
+        modo = settings.DATABASES['default']['OPTIONS'].get('transaction_mode')
+        self.assertEqual(connection.transaction_mode, modo and modo.upper())
+
+
+@override_settings(PBKDF2_ITERACOES=1000, SHARDS_USUARIOS=['shard_0', 'shard_1'])
+class ShardTests(TransactionTestCase):
+    # os shards só entram em DATABASES quando ligados no ambiente (settings);
+    # aqui cada um ganha um banco de teste, migrado como em produção
+    SHARDS = ('shard_0', 'shard_1')
+
+    @classmethod
+    def setUpClass(cls):
+        padrao = connections.settings['default']
+        for alias in cls.SHARDS:
+            nome = settings.BASE_DIR / f'test_db_{alias}.sqlite3'
+            connections.settings[alias] = {**padrao, 'TEST': {**padrao['TEST'], 'NAME': nome}}
+        cls.databases = {'default', *cls.SHARDS}
+        super().setUpClass()
+        for alias in cls.SHARDS:
+            connections[alias].creation.create_test_db(verbosity=0, autoclobber=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.SHARDS:
+            connections[alias].creation.destroy_test_db(verbosity=0)
+            del connections[alias]
+            del connections.settings[alias]
+
+    def setUp(self):
+        caches[cache_respostas.ALIAS].clear()
+        limites.limpar()
+        for alias in settings.SHARDS_USUARIOS:
+            shards.preparar(alias)
+        self.user = CustomUser.objects.create_user(email="ana@example.com", password="Senha@123", first_name="Ana")
+        self.client.force_login(self.user)
+
+    def post_json(self, nome, body, *args):
+        return self.client.post(reverse(nome, args=args), json.dumps(body), content_type="application/json")
+
+    def adicionar(self, valor='10.00'):
+        r = self.post_json('adicionar_transacao', {'data': '2025-06-10', 'descricao': 'Mercado', 'valor': valor,
+                                                   'tipo': 'extra'})
+        self.assertEqual(r.status_code, 200)
+        return r.json()['transacao']['id']
+
+    def test_views_gravam_e_leem_no_shard_do_usuario(self):
+        self.user.refresh_from_db()
+        alias = shards.destino(self.user.pk)
+        self.assertEqual(self.user.shard, alias)
+        transacao_id = self.adicionar()
+        piso = (settings.SHARDS_USUARIOS.index(alias) + 1) << shards.FAIXA_BITS
+        self.assertGreater(transacao_id, piso)
+        self.assertTrue(Transacao.objects.using(alias).filter(pk=transacao_id).exists())
+        self.assertFalse(Transacao.objects.using('default').exists())
+        self.assertEqual(ResumoMensal.objects.using(alias).get(usuario=self.user).quantidade, 1)
+
+        # o seq anda só no shard; as respostas usam o dele
+        seq = SequenciaShard.objects.using(alias).get(usuario_id=self.user.pk).seq
+        self.assertGreater(seq, CustomUser.objects.get(pk=self.user.pk).sync_seq)
+        for nome in ('listar_transacoes', 'api_listar_transacoes'):
+            dados = self.client.get(reverse(nome)).json()
+            self.assertEqual(([t['id'] for t in dados['transacoes']], dados['seq']), ([transacao_id], seq), nome)
+        self.assertEqual(self.client.get(reverse('sincronizar'), {'since': 0}).json()['seq'], seq)
+        etag = self.client.get(reverse('listar_transacoes'))['ETag']
+        self.adicionar()
+        self.assertNotEqual(self.client.get(reverse('listar_transacoes'))['ETag'], etag)
+
+        r = self.post_json('adicionar_meta', {'nome': 'Reserva', 'valor': 100, 'data_inicial': '2025-01-01',
+                                              'data_final': '2025-12-31'})
+        self.assertTrue(MetaFinanceira.objects.using(alias).filter(pk=r.json()['meta']['id']).exists())
+        relatorio = benchmark.executar(self.user, concorrencia=1, requisicoes=2, aquecimento=0)
+        for nome, rota in relatorio['rotas'].items():
+            self.assertEqual(rota['erros'], 0, (nome, rota['status']))
+        self.assertFalse(MetaFinanceira.objects.using('default').exists())
+
+    def test_rebalancear_mantem_ids_e_seq(self):
+        transacao_id = self.adicionar()
+        origem = shards.destino(self.user.pk)
+        novo = 'shard_1' if origem == 'shard_0' else 'shard_0'
+        antes = self.client.get(reverse('sincronizar'), {'since': 0}).json()
+
+        with override_settings(SHARDS_USUARIOS=[novo]):
+            saida = io.StringIO()
+            call_command('rebalancear_shards', stdout=saida)
+            self.assertIn(f"{origem} -> {novo}: 1 usuários", saida.getvalue())
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.shard, novo)
+            self.assertFalse(Transacao.objects.using(origem).exists())
+            self.assertEqual(self.client.get(reverse('sincronizar'), {'since': 0}).json(), antes)
+            self.adicionar()
+            depois = self.client.get(reverse('sincronizar'), {'since': antes['seq']}).json()
+            self.assertEqual(depois['seq'], antes['seq'] + 1)
+            self.assertEqual(Transacao.objects.using(novo).filter(pk=transacao_id).count(), 1)
+
+    def test_migracoes_so_nos_shards_ativos(self):
+        roteador = shards.RoteadorShards()
+        with override_settings(SHARDS_USUARIOS=['shard_0'], SHARDS_ANTIGOS=['shard_1']):
+            self.assertTrue(roteador.allow_migrate('shard_0', 'usuarios', 'transacao'))
+            self.assertFalse(roteador.allow_migrate('shard_0', 'usuarios', 'customuser'))
+            self.assertFalse(roteador.allow_migrate('shard_1', 'usuarios', 'transacao'))
+            self.assertIsNone(roteador.allow_migrate('default', 'usuarios', 'transacao'))
+
+    def test_usuario_anterior_aos_shards_continua_no_default_ate_rebalancear(self):
+        with override_settings(SHARDS_USUARIOS=[]):
+            antigo = CustomUser.objects.create_user(email="bia@example.com", password="Senha@123", first_name="Bia")
+            operacoes.criar_transacao(antigo, date(2025, 6, 1), 'Aluguel', Decimal('900'), 'expense')
+        self.assertEqual(antigo.shard, '')
+        operacoes.criar_transacao(antigo, date(2025, 6, 2), 'Energia', Decimal('90'), 'expense')
+        self.assertEqual(Transacao.objects.using('default').filter(usuario=antigo).count(), 2)
+
+        self.assertEqual(shards.rebalancear(simular=True), {('default', shards.destino(antigo.pk)): 1})
+        shards.rebalancear()
+        antigo.refresh_from_db()
+        self.assertEqual(Transacao.objects.using(antigo.shard).filter(usuario=antigo).count(), 2)
+        with shards.usuario(antigo):
+            self.assertEqual(resumo.totais_por_tipo(antigo), {'expense': Decimal('990')})
+
+    def test_admin_le_o_banco_escolhido(self):
+        transacao_id = self.adicionar()
+        alias = shards.destino(self.user.pk)
+        admin = CustomUser.objects.create_superuser("admin@example.com", "Senha@123", "Admin")
+        self.client.force_login(admin)
+        lista = reverse('admin:usuarios_transacao_changelist')
+        self.assertEqual(self.client.get(lista).context['cl'].result_count, 0)  # o default
+        r = self.client.get(lista, {'banco': alias})
+        self.assertEqual([t.pk for t in r.context['cl'].result_list], [transacao_id])
+        self.assertContains(r, f'banco={alias}')
+        alterar = (reverse('admin:usuarios_transacao_change', args=[transacao_id])
+                   + f'?_changelist_filters=banco%3D{alias}')
+        self.assertEqual(self.client.get(alterar).status_code, 200)
+        r = self.client.post(alterar, {'usuario': self.user.pk, 'data': '2025-06-10', 'descricao': 'Mercado',
+                                       'valor': '25.00', 'tipo': 'extra'})
+        self.assertEqual(r.status_code, 302)
+        self.assertFalse(ResumoMensal.objects.using('default').exists())
+        r = self.client.get(reverse('admin:usuarios_customuser_changelist'))
+        ana = next(u for u in r.context['cl'].result_list if u.pk == self.user.pk)
+        # o saldo da listagem acompanha a edição feita pelo próprio admin
+        self.assertEqual((ana.totais['transacoes'], ana.totais['gastos']), (1, 25.0))
+
+    def test_excluir_usuario_apaga_dados_do_shard(self):
+        self.adicionar()
+        alias = shards.destino(self.user.pk)
+        self.user.delete()
+        self.assertFalse(Transacao.todos.using(alias).exists())
+        self.assertFalse(SequenciaShard.objects.using(alias).exists())
 
-# Create your tests here.
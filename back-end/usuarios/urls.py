@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 from django.contrib.auth import views as auth_views
 
 urlpatterns = [
@@ -17,6 +17,8 @@ urlpatterns = [
 
     # Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('resumo/', views.resumo_financeiro, name='resumo_financeiro'),
+    path('analytics/', views.analise_financeira, name='analise_financeira'),
 
     # ================================
     # TRANSACOES
@@ -24,6 +26,8 @@ urlpatterns = [
     path('transacoes/', views.listar_transacoes, name='listar_transacoes'),
     path('transacoes/adicionar/', views.adicionar_transacao, name='adicionar_transacao'),
     path('transacoes/excluir/<int:transacao_id>/', views.excluir_transacao, name='excluir_transacao'),
+    path('transacoes/exportar/', views.exportar_transacoes, name='exportar_transacoes'),
+    path('transacoes/importar/', views.importar_transacoes, name='importar_transacoes'),
 
     # ================================
     # METAS FINANCEIRAS
@@ -53,4 +57,40 @@ urlpatterns = [
     path('lembretes/', views.listar_lembretes, name='listar_lembretes'),
     path('lembretes/adicionar/', views.adicionar_lembrete, name='adicionar_lembrete'),
     path('lembretes/excluir/<int:lembrete_id>/', views.excluir_lembrete, name='excluir_lembrete'),
+
+    # ================================
+    # LOTE DE OPERAÇÕES
+    # ================================
+    path('batch/', views.aplicar_lote, name='aplicar_lote'),
+
+    # ================================
+    # SINCRONIZAÇÃO
+    # ================================
+    path('sync/', views.sincronizar, name='sincronizar'),
+
+    # ================================
+    # CACHE
+    # ================================
+    path('cache/estatisticas/', views.estatisticas_cache, name='estatisticas_cache'),
+
+    # ================================
+    # MÉTRICAS
+    # ================================
+    path('metricas/', views.metricas_processo, name='metricas_processo'),
+    path('metrics', views.metricas_prometheus, name='metricas_prometheus'),
+
+    # ================================
+    # API ASSÍNCRONA (servir via StonksView.asgi)
+    # ================================
+    path('api/transacoes/', api.listar_transacoes, name='api_listar_transacoes'),
+    path('api/transacoes/adicionar/', api.adicionar_transacao, name='api_adicionar_transacao'),
+    path('api/transacoes/excluir/<int:transacao_id>/', api.excluir_transacao, name='api_excluir_transacao'),
+    path('api/metas/', api.listar_metas, name='api_listar_metas'),
+    path('api/metas/adicionar/', api.adicionar_meta, name='api_adicionar_meta'),
+    path('api/metas/progresso/<int:meta_id>/', api.adicionar_progresso_meta, name='api_adicionar_progresso_meta'),
+    path('api/metas/excluir/<int:meta_id>/', api.excluir_meta, name='api_excluir_meta'),
+    path('api/lembretes/', api.listar_lembretes, name='api_listar_lembretes'),
+    path('api/lembretes/adicionar/', api.adicionar_lembrete, name='api_adicionar_lembrete'),
+    path('api/lembretes/excluir/<int:lembrete_id>/', api.excluir_lembrete, name='api_excluir_lembrete'),
+    path('api/eventos/', api.eventos_usuario, name='api_eventos'),
 ]
@@ -1,26 +1,35 @@
 from django.contrib.auth import get_user_model, authenticate, login, logout
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.urls import reverse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.core.exceptions import ValidationError
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.password_validation import validate_password
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.dateparse import parse_date
+import csv
+import io
 import json
 from decimal import Decimal, InvalidOperation
 
+from . import (
+    analise, cache_respostas, consultas, emails, importacao, lote, metricas, operacoes, resumo, serializacao, shards, sync,
+)
+from .decorators import versionado_por_usuario
 from .forms import LoginForm
+from .limites import limitar
 from .models import CustomUser, Transacao, MetaFinanceira, Lembrete
 
 
 # =========================
 # AUTENTICAÇÃO
 # =========================
+@limitar('login')
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(request.POST)
@@ -37,6 +46,7 @@ def login_view(request):
     return render(request, 'usuarios/index.html', {'form': form})
 
 
+@limitar('cadastro')
 def cadastro(request):
     errors = []
     if request.method == 'POST':
@@ -57,6 +67,7 @@ def cadastro(request):
     return render(request, 'usuarios/cadastro.html', {'errors': errors})
 
 
+@limitar('recuperar')
 def recuperar_senha(request):
     if request.method == "POST":
         email = request.POST.get('email')
@@ -76,7 +87,8 @@ def recuperar_senha(request):
             f"Clique para redefinir sua senha:\n{reset_url}\n\n"
             f"Se você não solicitou isso, ignore este e-mail."
         )
-        send_mail(assunto, mensagem, None, [email], fail_silently=False)
+        # o envio fica com o worker (manage.py enviar_emails)
+        emails.enfileirar(email, assunto, mensagem)
         messages.success(request, "Um link foi enviado ao seu email.")
         return redirect('login')
     return render(request, 'usuarios/recuperar.html')
@@ -118,40 +130,72 @@ def sair_view(request):
 
 @login_required
 def perfil(request):
-    return render(request, 'usuarios/perfil.html')
+    return render(request, 'usuarios/perfil.html', {'bootstrap': _bootstrap_perfil(request)})
 
 
 @login_required
 def dashboard(request):
-    transacoes = Transacao.objects.filter(usuario=request.user)
-    ganhos = sum([t.valor for t in transacoes if t.tipo == 'income'])
-    gastos = sum([t.valor for t in transacoes if t.tipo == 'expense'])
-    saldo = ganhos - gastos
-    return render(request, 'usuarios/perfil.html', {
-        'ganhos': ganhos,
-        'gastos': gastos,
-        'saldo': saldo,
-        'transacoes': transacoes,
-    })
+    return perfil(request)
+
+
+def _bootstrap_perfil(request):
+    """
+    O que a página mostra ao abrir, no formato das views JSON: primeira página
+    de transações, totais e lembretes. Vai no HTML por ``json_script``, então
+    a página fica pronta sem outra requisição.
+    """
+    def gerar():
+        transacoes, limite = consultas.consulta_pagina({}, request.user)
+        pagina, proximo = consultas.fechar_pagina(serializacao.listar('transacoes', transacoes), limite)
+        lembretes = Lembrete.objects.filter(usuario=request.user).order_by('data')
+        return {
+            'transacoes': pagina,
+            'proximo': proximo,
+            'resumo': resumo.saldo(resumo.totais_por_tipo(request.user)),
+            'lembretes': serializacao.listar('lembretes', lembretes),
+            'seq': request.user.sync_seq,
+        }
+    return cache_respostas.obter(request.user, 'perfil', gerar)
+
+
+@login_required
+@versionado_por_usuario
+def resumo_financeiro(request):
+    return cache_respostas.resposta_json(request, 'resumo', lambda: resumo.resumo_usuario(request.user))
+
+
+@login_required
+@versionado_por_usuario(variante=analise.variante)
+def analise_financeira(request):
+    """Séries dos gráficos (saldo diário, médias móveis, meses por tipo) entre ``date_from`` e ``date_to``."""
+    try:
+        inicio, fim = analise.periodo(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    corpo = cache_respostas.obter_variante(
+        request.user, 'analise', f'{inicio}:{fim}',
+        lambda: serializacao.json_bytes(analise.series(request.user, inicio, fim)),
+    )
+    return HttpResponse(corpo, content_type='application/json')
 
 
 # =========================
 # TRANSAÇÕES
 # =========================
 @login_required
+@versionado_por_usuario
 def listar_transacoes(request):
-    transacoes = Transacao.objects.filter(usuario=request.user).order_by('-data')
-    data = [
-        {
-            'id': t.id,
-            'data': t.data.strftime('%Y-%m-%d'),
-            'descricao': t.descricao,
-            'valor': float(t.valor),
-            'tipo': t.tipo,
-        }
-        for t in transacoes
-    ]
-    return JsonResponse({'transacoes': data})
+    """Página de transações, da mais recente para a mais antiga (keyset em ``(data, id)``)."""
+    try:
+        return cache_respostas.resposta_json(request, 'transacoes', lambda: _pagina_transacoes(request))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+def _pagina_transacoes(request):
+    transacoes, limite = consultas.consulta_pagina(request.GET, request.user)
+    pagina, proximo = consultas.fechar_pagina(serializacao.listar('transacoes', transacoes), limite)
+    return {'transacoes': pagina, 'proximo': proximo, 'seq': request.user.sync_seq}
 
 
 @csrf_exempt
@@ -161,22 +205,18 @@ def adicionar_transacao(request):
         return JsonResponse({'error': "Método inválido"}, status=405)
     try:
         body = json.loads(request.body)
-        t = Transacao.objects.create(
-            usuario=request.user,
-            data=body['data'],
-            descricao=body['descricao'],
-            valor=body['valor'],
-            tipo=body['tipo']
-        )
+        data = parse_date(body['data'])
+        if data is None:
+            return JsonResponse({'error': "Data inválida"}, status=400)
+        try:
+            valor = Decimal(str(body['valor'])).quantize(Decimal('0.01'))
+        except (InvalidOperation, TypeError, ValueError):
+            return JsonResponse({'error': "Valor inválido"}, status=400)
+        t = operacoes.criar_transacao(request.user, data, body['descricao'], valor, body['tipo'])
         return JsonResponse({
             'status': 'ok',
-            'transacao': {
-                'id': t.id,
-                'data': t.data.strftime('%Y-%m-%d'),
-                'descricao': t.descricao,
-                'valor': float(t.valor),
-                'tipo': t.tipo,
-            }
+            'transacao': serializacao.transacao_dict(t),
+            'seq': t.seq,
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -188,8 +228,95 @@ def excluir_transacao(request, transacao_id):
     if request.method != "DELETE":
         return JsonResponse({'error': "Método inválido"}, status=405)
     transacao = get_object_or_404(Transacao, id=transacao_id, usuario=request.user)
-    transacao.delete()
-    return JsonResponse({'status': 'ok'})
+    operacoes.excluir_transacao(transacao)
+    return JsonResponse({'status': 'ok', 'seq': transacao.seq})
+
+
+EXPORTACAO_CHUNK = 2000
+EXPORTACAO_COLUNAS = ('data', 'descricao', 'valor', 'tipo')
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _linhas_csv(linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(EXPORTACAO_COLUNAS)
+    bloco = []
+    for data, descricao, valor, tipo in linhas:
+        bloco.append(escritor.writerow((data.isoformat(), descricao, valor, tipo)))
+        if len(bloco) == EXPORTACAO_CHUNK:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def _linhas_ndjson(linhas):
+    bloco = []
+    for data, descricao, valor, tipo in linhas:
+        bloco.append(json.dumps({
+            'data': data.isoformat(),
+            'descricao': descricao,
+            'valor': str(valor),
+            'tipo': tipo,
+        }, ensure_ascii=False) + '\n')
+        if len(bloco) == EXPORTACAO_CHUNK:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+@login_required
+def exportar_transacoes(request):
+    """Exporta o histórico em CSV ou NDJSON sem carregar tudo em memória."""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in ('csv', 'ndjson'):
+        return JsonResponse({'error': "Formato inválido"}, status=400)
+    try:
+        # o banco fica fixo: o corpo é gerado depois que o ShardMiddleware já saiu
+        transacoes = consultas.filtrar_transacoes(
+            request.GET, Transacao.objects.using(shards.banco_do_usuario(request.user)).filter(usuario=request.user)
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    linhas = (
+        transacoes.order_by('data', 'id')
+        .values_list(*EXPORTACAO_COLUNAS)
+        .iterator(chunk_size=EXPORTACAO_CHUNK)
+    )
+    if formato == 'csv':
+        resposta = StreamingHttpResponse(_linhas_csv(linhas), content_type='text/csv; charset=utf-8')
+    else:
+        resposta = StreamingHttpResponse(_linhas_ndjson(linhas), content_type='application/x-ndjson')
+    resposta['Content-Disposition'] = f'attachment; filename="transacoes.{formato}"'
+    return resposta
+
+
+@csrf_exempt
+@login_required
+def importar_transacoes(request):
+    """Recebe um extrato CSV/OFX em ``arquivo`` (multipart) e importa em lotes."""
+    if request.method != "POST":
+        return JsonResponse({'error': "Método inválido"}, status=405)
+    arquivo = request.FILES.get('arquivo')
+    if arquivo is None:
+        return JsonResponse({'error': "Envie o extrato no campo 'arquivo'"}, status=400)
+    formato = request.POST.get('formato') or importacao.detectar_formato(arquivo.name)
+    if formato not in importacao.LEITORES:
+        return JsonResponse({'error': "Formato inválido"}, status=400)
+    try:
+        texto = io.TextIOWrapper(arquivo.file, encoding=request.POST.get('encoding', 'utf-8-sig'), newline='')
+        resultado = importacao.importar(request.user, texto, formato)
+    except (LookupError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'status': 'ok', **resultado.como_dict()})
 
 
 # =========================
@@ -201,22 +328,12 @@ def listar_metas(request):
 
 
 @login_required
+@versionado_por_usuario
 def listar_metas_json(request):
-    metas = MetaFinanceira.objects.filter(usuario=request.user).order_by('-data_criacao')
-    data = [
-        {
-            'id': m.id,
-            'nome': m.nome,
-            'valor': float(m.valor),
-            'valor_atual': float(m.valor_atual),
-            'data_inicial': m.data_inicial.strftime('%Y-%m-%d'),
-            'data_final': m.data_final.strftime('%Y-%m-%d'),
-            'status': m.status,
-            'porcentagem': round((m.valor_atual / m.valor) * 100, 1) if m.valor > 0 else 0
-        }
-        for m in metas
-    ]
-    return JsonResponse({'metas': data})
+    def gerar():
+        metas = MetaFinanceira.objects.filter(usuario=request.user).order_by('-data_criacao')
+        return {'metas': serializacao.listar('metas', metas), 'seq': request.user.sync_seq}
+    return cache_respostas.resposta_json(request, 'metas', gerar)
 
 
 @csrf_exempt
@@ -229,8 +346,8 @@ def adicionar_meta(request):
         body = json.loads(request.body)
         nome = body.get('nome')
         valor = body.get('valor')
-        data_inicial = body.get('data_inicial')
-        data_final = body.get('data_final')
+        data_inicial = parse_date(body.get('data_inicial') or '')
+        data_final = parse_date(body.get('data_final') or '')
 
         if not nome or valor is None or not data_inicial or not data_final:
             return JsonResponse({'error': 'Dados incompletos'}, status=400)
@@ -240,8 +357,8 @@ def adicionar_meta(request):
         except (InvalidOperation, TypeError, ValueError):
             return JsonResponse({'error': 'Valor inválido'}, status=400)
 
-        meta = MetaFinanceira.objects.create(
-            usuario=request.user,
+        meta = operacoes.criar_meta(
+            request.user,
             nome=nome,
             valor=valor,
             data_inicial=data_inicial,
@@ -250,15 +367,8 @@ def adicionar_meta(request):
 
         return JsonResponse({
             'status': 'ok',
-            'meta': {
-                'id': meta.id,
-                'nome': meta.nome,
-                'valor': float(meta.valor),
-                'valor_atual': float(meta.valor_atual),
-                'data_inicial': meta.data_inicial.strftime('%Y-%m-%d'),
-                'data_final': meta.data_final.strftime('%Y-%m-%d'),
-                'status': meta.status,
-            }
+            'meta': serializacao.meta_dict(meta),
+            'seq': meta.seq,
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -283,16 +393,15 @@ def adicionar_progresso_meta(request, meta_id):
         if valor_add <= 0:
             return JsonResponse({'error': "Valor inválido"}, status=400)
 
-        meta = get_object_or_404(MetaFinanceira, id=meta_id, usuario=request.user)
-        meta.adicionar_progresso(valor_add)  # salva no banco
+        try:
+            progresso = operacoes.adicionar_progresso(request.user.id, meta_id, valor_add)
+        except MetaFinanceira.DoesNotExist:
+            return JsonResponse({'error': "Meta não encontrada"}, status=404)
 
         return JsonResponse({
             'status': 'ok',
-            'nova_meta': {
-                'id': meta.id,
-                'valor_atual': float(meta.valor_atual),
-                'status': meta.status,
-            }
+            'nova_meta': serializacao.progresso_dict(progresso),
+            'seq': progresso['seq'],
         })
 
     except Exception as e:
@@ -305,26 +414,20 @@ def excluir_meta(request, meta_id):
     if request.method != "DELETE":
         return JsonResponse({'error': "Método inválido"}, status=405)
     meta = get_object_or_404(MetaFinanceira, id=meta_id, usuario=request.user)
-    meta.delete()
-    return JsonResponse({'status': 'ok'})
+    operacoes.excluir_meta(meta)
+    return JsonResponse({'status': 'ok', 'seq': meta.seq})
 
 
 # =========================
 # LEMBRETES
 # =========================
 @login_required
+@versionado_por_usuario
 def listar_lembretes(request):
-    lembretes = Lembrete.objects.filter(usuario=request.user).order_by('data')
-    data = [
-        {
-            'id': l.id,
-            'nome': l.nome,
-            'descricao': l.descricao,
-            'data': l.data.strftime('%Y-%m-%d'),
-        }
-        for l in lembretes
-    ]
-    return JsonResponse({'lembretes': data})
+    def gerar():
+        lembretes = Lembrete.objects.filter(usuario=request.user).order_by('data')
+        return {'lembretes': serializacao.listar('lembretes', lembretes), 'seq': request.user.sync_seq}
+    return cache_respostas.resposta_json(request, 'lembretes', gerar)
 
 
 @csrf_exempt
@@ -334,20 +437,19 @@ def adicionar_lembrete(request):
         return JsonResponse({'error': "Método inválido"}, status=405)
     try:
         body = json.loads(request.body)
-        l = Lembrete.objects.create(
-            usuario=request.user,
+        data = parse_date(body['data'])
+        if data is None:
+            return JsonResponse({'error': "Data inválida"}, status=400)
+        l = operacoes.criar_lembrete(
+            request.user,
             nome=body['nome'],
             descricao=body.get('descricao', ''),
-            data=body['data'],
+            data=data,
         )
         return JsonResponse({
             'status': 'ok',
-            'lembrete': {
-                'id': l.id,
-                'nome': l.nome,
-                'descricao': l.descricao,
-                'data': l.data.strftime('%Y-%m-%d'),
-            }
+            'lembrete': serializacao.lembrete_dict(l),
+            'seq': l.seq,
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -359,5 +461,64 @@ def excluir_lembrete(request, lembrete_id):
     if request.method != "DELETE":
         return JsonResponse({'error': "Método inválido"}, status=405)
     lembrete = get_object_or_404(Lembrete, id=lembrete_id, usuario=request.user)
-    lembrete.delete()
-    return JsonResponse({'status': 'ok'})
+    operacoes.excluir_lembrete(lembrete)
+    return JsonResponse({'status': 'ok', 'seq': lembrete.seq})
+
+
+# =========================
+# LOTE DE OPERAÇÕES
+# =========================
+@csrf_exempt
+@login_required
+def aplicar_lote(request):
+    """Aplica ``{"operacoes": [...]}`` numa transação só; ou todas entram, ou nenhuma."""
+    if request.method != "POST":
+        return JsonResponse({'error': "Método inválido"}, status=405)
+    try:
+        operacoes, erros = lote.validar(json.loads(request.body).get('operacoes'))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if erros:
+        return JsonResponse({'error': "Operações inválidas", 'resultados': erros}, status=400)
+    try:
+        resultados, seq = lote.aplicar(request.user, operacoes)
+    except lote.ErroOperacao as e:
+        return JsonResponse({
+            'error': str(e),
+            'resultados': [{'indice': e.indice, 'status': 'erro', 'error': str(e)}],
+        }, status=e.status)
+    return JsonResponse({'status': 'ok', 'resultados': resultados, 'seq': seq})
+
+
+# =========================
+# SINCRONIZAÇÃO
+# =========================
+@login_required
+def sincronizar(request):
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'error': "since inválido"}, status=400)
+    return JsonResponse(sync.mudancas_desde(request.user.id, since))
+
+
+# =========================
+# CACHE
+# =========================
+@staff_member_required
+def estatisticas_cache(request):
+    return JsonResponse(cache_respostas.estatisticas())
+
+
+@staff_member_required
+def metricas_processo(request):
+    return JsonResponse(metricas.instantaneo())
+
+
+@staff_member_required
+def metricas_prometheus(request):
+    """Métricas do processo no formato texto do Prometheus, com os totais do cache de respostas."""
+    cache = cache_respostas.estatisticas()
+    extras = [(f'cache_respostas_{nome}_total', 'counter', cache[nome])
+              for nome in ('hits', 'misses', 'evictions', 'expirations', 'invalidations')]
+    return HttpResponse(metricas.prometheus(extras=extras), content_type='text/plain; version=0.0.4; charset=utf-8')